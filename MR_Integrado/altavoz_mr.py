@@ -0,0 +1,203 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import io
+import itertools
+import queue
+import threading
+
+import pygame
+
+# ==========================================
+# SALIDA DE AUDIO PERSISTENTE
+# Un hilo es dueño del mixer de pygame: lo inicia una vez y reproduce,
+# uno tras otro, los clips (MP3 en memoria, sin archivos temporales) de
+# una cola con prioridad (menor = antes; a igual prioridad, en orden de
+# llegada). Quien habla recibe un Clip y puede esperar a que termine.
+# Barge-in: interrumpir() corta el clip que suena, descarta la cola y
+# abre un "turno" nuevo; los clips pedidos con un turno anterior ya no
+# suenan (así una descripción que sigue llegando de Gemini no vuelve a
+# hablar encima del comando nuevo).
+# ==========================================
+
+PRIORIDAD_AVISO = 0     # avisos del sistema ("Un momento, estoy mirando.")
+PRIORIDAD_NORMAL = 1
+INTERVALO_S = 0.02      # cada cuánto se revisa si el clip terminó o se cortó
+
+
+class Clip:
+    def __init__(self, datos: bytes, prioridad: int, formato: str, turno: int):
+        self.datos = datos
+        self.prioridad = prioridad
+        self.formato = formato
+        self.turno = turno
+        self.interrumpido = False
+        self.error = None
+        self._fin = threading.Event()
+
+    def terminar(self, interrumpido: bool = False, error=None) -> None:
+        self.interrumpido = interrumpido
+        self.error = error
+        self._fin.set()
+
+    def terminado(self) -> bool:
+        """
+        True si el clip ya acabó (completo, cortado o con error).
+        """
+        return self._fin.is_set()
+
+    def esperar(self, timeout: float | None = None) -> bool:
+        """
+        Espera a que el clip acabe. True si sonó completo (False también si
+        se acabó el tiempo: ver terminado()).
+        """
+        self._fin.wait(timeout)
+        return self._fin.is_set() and not self.interrumpido and self.error is None
+
+
+class ServicioAudio:
+    def __init__(self):
+        self._cola = queue.PriorityQueue()   # (prioridad, orden, clip)
+        self._orden = itertools.count()
+        self._turno = 0
+        self._cortar = threading.Event()
+        self._lock = threading.Lock()
+        self._actual = None
+        self._hilo = None
+
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self) -> None:
+        with self._lock:
+            if self.activo():
+                return
+            self._hilo = threading.Thread(target=self._run, name="Altavoz", daemon=True)
+            self._hilo.start()
+
+    def turno(self) -> int:
+        """
+        Turno actual: pasarlo a reproducir() hace que el clip se descarte
+        si hubo un barge-in desde entonces.
+        """
+        return self._turno
+
+    def reproducir(self, datos: bytes, prioridad: int = PRIORIDAD_NORMAL,
+                   formato: str = "mp3", turno: int | None = None) -> Clip:
+        """
+        Encola un clip y lo devuelve (clip.esperar() bloquea hasta que suene).
+        """
+        self.iniciar()
+        with self._lock:
+            clip = Clip(datos, prioridad, formato, self._turno if turno is None else turno)
+            if clip.turno != self._turno:
+                clip.terminar(interrumpido=True)
+            else:
+                self._cola.put((prioridad, next(self._orden), clip))
+        return clip
+
+    def interrumpir(self) -> None:
+        """
+        Barge-in: corta lo que suena, descarta la cola y empieza un turno nuevo.
+        """
+        with self._lock:
+            self._turno += 1
+            self._cortar.set()
+            while True:
+                try:
+                    _, _, clip = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                clip.terminar(interrumpido=True)
+
+    def ocupado(self) -> bool:
+        return self._actual is not None or not self._cola.empty()
+
+    def cerrar(self) -> None:
+        self.interrumpir()
+        if self.activo():
+            self._cola.put((-1, -1, None))
+            self._hilo.join(timeout=2.0)
+        self._hilo = None
+
+    def _run(self):
+        while True:
+            _, _, clip = self._cola.get()
+            if clip is None:
+                break
+            with self._lock:
+                if clip.turno != self._turno:
+                    clip.terminar(interrumpido=True)
+                    continue
+                self._cortar.clear()
+                self._actual = clip
+            try:
+                clip.terminar(interrumpido=not self._sonar(clip))
+            except Exception as e:
+                print(f"[ERROR AUDIO] No se pudo reproducir el audio. Error: {e}")
+                clip.terminar(error=e)
+            finally:
+                self._actual = None
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
+
+    def _sonar(self, clip: Clip) -> bool:
+        """
+        Reproduce el clip; False si se cortó antes de terminar.
+        """
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.music.load(io.BytesIO(clip.datos), clip.formato)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            if self._cortar.wait(INTERVALO_S):
+                pygame.mixer.music.stop()
+                return False
+        return True
+
+
+_servicio = None
+_lock = threading.Lock()
+
+
+def servicio() -> ServicioAudio:
+    """
+    ServicioAudio compartido; se arranca la primera vez.
+    """
+    global _servicio
+    with _lock:
+        if _servicio is None:
+            _servicio = ServicioAudio()
+            _servicio.iniciar()
+        return _servicio
+
+
+def callar() -> None:
+    """
+    Barge-in sobre el servicio compartido (no lo arranca si no existe).
+    """
+    with _lock:
+        if _servicio is not None:
+            _servicio.interrumpir()
+
+
+def cerrar() -> None:
+    global _servicio
+    with _lock:
+        if _servicio is not None:
+            _servicio.cerrar()
+            _servicio = None
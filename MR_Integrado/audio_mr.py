@@ -0,0 +1,412 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import math
+import os
+import subprocess
+import threading
+import time
+import wave
+
+import numpy as np
+
+# ==========================================
+# CAPTURA DE AUDIO EN MEMORIA + DETECCIÓN DE VOZ
+# Un solo `parec` queda abierto mandando PCM s16le mono a 16 kHz por
+# stdout; un hilo lo copia a un buffer circular en memoria. Para cada
+# comando se revisan los frames de 30 ms que van llegando:
+#   - la frase empieza cuando hay voz en INICIO_MS seguidos,
+#   - termina tras SILENCIO_FIN_MS de silencio (o a MAX_FRASE_S),
+#   - se agregan PREROLL_MS de antes del inicio para no cortar la
+#     primera sílaba.
+# La voz se detecta por energía contra un piso de ruido que se adapta
+# mientras no hay voz. El resultado es un arreglo float32 que Whisper
+# recibe directo, sin WAV en disco.
+# ==========================================
+
+FRECUENCIA = 16000
+MUESTRAS_FRAME = FRECUENCIA * 30 // 1000      # 30 ms
+BYTES_FRAME = MUESTRAS_FRAME * 2
+SEGUNDOS_BUFFER = 30
+
+PREROLL_MS = 300
+INICIO_MS = 90
+SILENCIO_FIN_MS = int(os.environ.get("MR_VAD_SILENCIO_MS", "700"))
+MAX_FRASE_S = float(os.environ.get("MR_VAD_MAX_S", "6"))
+ESPERA_MAX_S = float(os.environ.get("MR_VAD_ESPERA_S", "8"))
+
+# Voz = energía del frame al menos MARGEN_DB sobre el piso de ruido y
+# por encima de UMBRAL_MIN_DBFS (para no disparar con silencio digital).
+# El piso se estima con los primeros CALIBRACION_MS de audio y luego
+# sigue al ruido: baja de inmediato, sube despacio (solo sin voz).
+MARGEN_DB = float(os.environ.get("MR_VAD_MARGEN_DB", "10"))
+UMBRAL_MIN_DBFS = -50.0
+CALIBRACION_MS = 300
+ADAPTACION_PISO = 0.05
+
+# Decodificación parcial (mic_mr.escuchar_y_detectar): cada PASO_PARCIAL_S
+# de frase se pasa la ventana de los últimos VENTANA_PARCIAL_S a `parcial`
+PASO_PARCIAL_S = float(os.environ.get("MR_PARCIAL_PASO_S", "0.6"))
+VENTANA_PARCIAL_S = 4.0
+
+# Front-end antes de Whisper (preparar): quitar DC, normalizar el pico a
+# NIVEL_PICO sin subir más de GANANCIA_MAX_DB (para no inflar el silencio)
+# y, con MR_AUDIO_COMPUERTA=1, compuerta espectral de ruido.
+NORMALIZAR = os.environ.get("MR_AUDIO_NORMALIZAR", "1") == "1"
+COMPUERTA = os.environ.get("MR_AUDIO_COMPUERTA", "0") == "1"
+NIVEL_PICO = 0.9
+GANANCIA_MAX_DB = 20.0
+
+# Compuerta espectral: STFT de 32 ms con salto de 8 ms; el perfil de ruido
+# es media + K*desviación por banda en el PERCENTIL_RUIDO % de frames más
+# silenciosos, y lo que quede por debajo se atenúa ATENUACION_DB.
+N_FFT = 512
+SALTO_FFT = 128
+K_COMPUERTA = 1.5
+PERCENTIL_RUIDO = 20
+ATENUACION_DB = -20.0
+
+COMANDO_PAREC = [
+    "parec", "--raw", "--format=s16le", f"--rate={FRECUENCIA}",
+    "--channels=1", "--latency-msec=30",
+]
+
+
+def energia_dbfs(frame) -> float:
+    """
+    Energía RMS de un frame int16 en dBFS.
+    """
+    f = frame.astype(np.float32)
+    rms = math.sqrt(float(np.dot(f, f)) / max(1, len(f)))
+    return 20.0 * math.log10(max(rms, 1.0) / 32768.0)
+
+
+class CapturaAudio:
+    def __init__(self, comando=COMANDO_PAREC, segundos_buffer=SEGUNDOS_BUFFER):
+        self.comando = comando
+        self.capacidad = FRECUENCIA * segundos_buffer
+        self.buffer = np.zeros(self.capacidad, dtype=np.int16)
+        self.escritas = 0          # muestras escritas desde el inicio (no da la vuelta)
+        self._cond = threading.Condition()
+        self._proc = None
+        self._hilo = None
+        self.error = None
+
+    def activa(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self) -> None:
+        if self.activa():
+            return
+        self._proc = subprocess.Popen(self.comando, stdout=subprocess.PIPE, bufsize=0)
+        self._hilo = threading.Thread(target=self._run, name="CapturaAudio", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+            self._proc = None
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+
+    def _run(self):
+        salida = self._proc.stdout
+        pendiente = b""
+        while True:
+            datos = salida.read(BYTES_FRAME)
+            if not datos:
+                self.error = "parec terminó"
+                break
+            datos = pendiente + datos
+            utiles = len(datos) - len(datos) % 2
+            pendiente = datos[utiles:]
+            muestras = np.frombuffer(datos[:utiles], dtype=np.int16)
+            with self._cond:
+                inicio = self.escritas % self.capacidad
+                fin = inicio + len(muestras)
+                if fin <= self.capacidad:
+                    self.buffer[inicio:fin] = muestras
+                else:
+                    corte = self.capacidad - inicio
+                    self.buffer[inicio:] = muestras[:corte]
+                    self.buffer[:fin - self.capacidad] = muestras[corte:]
+                self.escritas += len(muestras)
+                self._cond.notify_all()
+        with self._cond:
+            self._cond.notify_all()
+
+    def esperar(self, hasta: int, timeout: float) -> bool:
+        """
+        Espera a que haya al menos `hasta` muestras escritas.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.escritas >= hasta or not self.activa(), timeout)
+            return self.escritas >= hasta
+
+    def leer(self, desde: int, hasta: int):
+        """
+        Copia de las muestras [desde, hasta) (contadas desde el inicio).
+        """
+        with self._cond:
+            desde = max(desde, self.escritas - self.capacidad, 0)
+            n = hasta - desde
+            inicio = desde % self.capacidad
+            if inicio + n <= self.capacidad:
+                return self.buffer[inicio:inicio + n].copy()
+            corte = self.capacidad - inicio
+            return np.concatenate((self.buffer[inicio:], self.buffer[:n - corte]))
+
+
+class DetectorVoz:
+    """
+    Máquina de estados por frame: esperando -> en frase -> terminada.
+    """
+
+    def __init__(self, margen_db=MARGEN_DB, silencio_fin_ms=SILENCIO_FIN_MS):
+        self.margen_db = margen_db
+        self.frames_inicio = max(1, INICIO_MS // 30)
+        self.frames_fin = max(1, silencio_fin_ms // 30)
+        self.piso_dbfs = None
+        self._calibracion = []
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        self.en_frase = False
+        self.terminada = False
+        self.frames_voz = 0
+        self.frames_silencio = 0
+        self.frame_inicio = None   # índice del primer frame con voz
+
+    def es_voz(self, dbfs: float) -> bool:
+        return dbfs >= UMBRAL_MIN_DBFS and dbfs >= self.piso_dbfs + self.margen_db
+
+    def procesar(self, indice: int, frame) -> None:
+        dbfs = energia_dbfs(frame)
+        if self.piso_dbfs is None:
+            self._calibracion.append(dbfs)
+            if len(self._calibracion) >= CALIBRACION_MS // 30:
+                self._calibracion.sort()
+                self.piso_dbfs = self._calibracion[len(self._calibracion) // 5]
+            return
+        voz = self.es_voz(dbfs)
+        if not self.en_frase:
+            if voz:
+                self.frames_voz += 1
+                if self.frames_voz >= self.frames_inicio:
+                    self.en_frase = True
+                    self.frame_inicio = indice - self.frames_voz + 1
+            else:
+                self.frames_voz = 0
+                if dbfs < self.piso_dbfs:
+                    self.piso_dbfs = dbfs
+                else:
+                    self.piso_dbfs += (dbfs - self.piso_dbfs) * ADAPTACION_PISO
+            return
+        if voz:
+            self.frames_silencio = 0
+        else:
+            self.frames_silencio += 1
+            if self.frames_silencio >= self.frames_fin:
+                self.terminada = True
+
+
+_captura = None
+_detector = DetectorVoz()   # compartido: conserva el piso de ruido entre comandos
+_lock = threading.Lock()
+
+
+def captura() -> CapturaAudio:
+    """
+    CapturaAudio compartida; se arranca la primera vez.
+    """
+    global _captura
+    with _lock:
+        if _captura is None or not _captura.activa():
+            _captura = CapturaAudio()
+            _captura.iniciar()
+        return _captura
+
+
+def _a_float(muestras):
+    return muestras.astype(np.float32) / 32768.0
+
+
+def escuchar_frase(fuente=None, detector=None, max_frase_s=MAX_FRASE_S, espera_max_s=ESPERA_MAX_S,
+                   parcial=None, paso_parcial_s=PASO_PARCIAL_S):
+    """
+    Espera una frase y la devuelve como float32 en [-1, 1] a 16 kHz.
+    Devuelve None si no se habló en `espera_max_s` o si la captura falló.
+    Con `parcial`, mientras se habla se le pasa cada `paso_parcial_s` el
+    audio reciente (ventanas que se traslapan); si devuelve True se deja
+    de escuchar y se devuelve lo capturado hasta ese momento.
+    """
+    fuente = fuente or captura()
+    detector = detector or _detector
+    detector.reiniciar()
+
+    # Empezar en el frame actual (lo anterior ya no es de este comando)
+    cursor = fuente.escritas - fuente.escritas % MUESTRAS_FRAME
+    limite_espera = time.monotonic() + espera_max_s
+    limite_frase = None
+    desde = None
+    siguiente_parcial = None
+    while True:
+        if not fuente.esperar(cursor + MUESTRAS_FRAME, timeout=0.5):
+            if not fuente.activa():
+                print(f"[AUDIO] Captura detenida: {fuente.error}")
+                return None
+        else:
+            frame = fuente.leer(cursor, cursor + MUESTRAS_FRAME)
+            detector.procesar(cursor // MUESTRAS_FRAME, frame)
+            cursor += MUESTRAS_FRAME
+            if detector.en_frase and limite_frase is None:
+                desde = detector.frame_inicio * MUESTRAS_FRAME - FRECUENCIA * PREROLL_MS // 1000
+                limite_frase = cursor + int(max_frase_s * FRECUENCIA)
+                siguiente_parcial = cursor + int(paso_parcial_s * FRECUENCIA)
+            if detector.terminada or (limite_frase is not None and cursor >= limite_frase):
+                break
+            if parcial is not None and siguiente_parcial is not None and cursor >= siguiente_parcial:
+                inicio_ventana = max(desde, cursor - int(VENTANA_PARCIAL_S * FRECUENCIA))
+                if parcial(_a_float(fuente.leer(inicio_ventana, cursor))):
+                    return _a_float(fuente.leer(desde, cursor))
+                # Lo que llegó mientras se decodificaba ya está en el buffer
+                siguiente_parcial = max(cursor, fuente.escritas) + int(paso_parcial_s * FRECUENCIA)
+        if limite_frase is None and time.monotonic() >= limite_espera:
+            return None
+
+    # Sin el silencio final completo (dejamos 200 ms)
+    hasta = cursor - max(0, detector.frames_silencio * MUESTRAS_FRAME - FRECUENCIA // 5)
+    return _a_float(fuente.leer(desde, hasta))
+
+
+# ==========================================
+# FRONT-END: WAV O ARREGLO -> float32 MONO A 16 kHz
+# Whisper recibe siempre un arreglo: con una ruta, openai-whisper lanza
+# un ffmpeg por comando para decodificar y remuestrear (y faster-whisper
+# abre el archivo con PyAV). Aquí el WAV se lee con `wave` y todo lo demás
+# son operaciones de NumPy sobre el arreglo completo.
+# ==========================================
+
+def cargar_wav(path):
+    """
+    WAV PCM (8, 16, 24 o 32 bits, cualquier número de canales) ->
+    (float32 mono en [-1, 1], frecuencia).
+    """
+    with wave.open(path, "rb") as w:
+        canales, ancho, frecuencia = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        datos = w.readframes(w.getnframes())
+    if ancho == 1:
+        audio = (np.frombuffer(datos, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif ancho == 2:
+        audio = np.frombuffer(datos, dtype="<i2").astype(np.float32) / 32768.0
+    elif ancho == 3:
+        b = np.frombuffer(datos, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        enteros = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        enteros = np.where(enteros >= 1 << 23, enteros - (1 << 24), enteros)
+        audio = enteros.astype(np.float32) / float(1 << 23)
+    elif ancho == 4:
+        audio = np.frombuffer(datos, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"{path}: WAV de {ancho * 8} bits no soportado")
+    if canales > 1:
+        audio = audio.reshape(-1, canales).mean(axis=1)
+    return audio, frecuencia
+
+
+def remuestrear(audio, origen: int, destino: int = FRECUENCIA):
+    """
+    Cambio de frecuencia por FFT: recorta (o rellena) el espectro, lo que
+    ya filtra lo que estaría arriba del nuevo Nyquist.
+    """
+    if origen == destino or len(audio) == 0:
+        return audio
+    n = len(audio)
+    n_salida = max(1, int(round(n * destino / origen)))
+    espectro = np.fft.rfft(audio)
+    bins = n_salida // 2 + 1
+    if bins <= len(espectro):
+        espectro = espectro[:bins]
+    else:
+        espectro = np.concatenate((espectro, np.zeros(bins - len(espectro), dtype=espectro.dtype)))
+    return (np.fft.irfft(espectro, n_salida) * (n_salida / n)).astype(np.float32)
+
+
+def compuerta_espectral(audio):
+    """
+    Atenúa las bandas que no superan el perfil de ruido del propio clip.
+    """
+    if len(audio) < N_FFT * 4:
+        return audio
+    ventana = np.hanning(N_FFT).astype(np.float32)
+    relleno = np.pad(audio, (N_FFT // 2, N_FFT // 2 + SALTO_FFT))
+    frames = np.lib.stride_tricks.sliding_window_view(relleno, N_FFT)[::SALTO_FFT]
+    espectro = np.fft.rfft(frames * ventana, axis=1)
+    magnitud = np.abs(espectro)
+
+    energia = (magnitud * magnitud).sum(axis=1)
+    ruido = magnitud[energia <= np.percentile(energia, PERCENTIL_RUIDO)]
+    umbral = ruido.mean(axis=0) + K_COMPUERTA * ruido.std(axis=0)
+
+    # Máscara suavizada en tiempo y frecuencia (promedio 3x3) para no dejar "ruido musical"
+    mascara = np.pad((magnitud > umbral).astype(np.float32), 1, mode="edge")
+    mascara = sum(
+        mascara[1 + dt:mascara.shape[0] - 1 + dt, 1 + df:mascara.shape[1] - 1 + df]
+        for dt in (-1, 0, 1) for df in (-1, 0, 1)
+    ) / 9.0
+    piso = 10.0 ** (ATENUACION_DB / 20.0)
+    frames = np.fft.irfft(espectro * (piso + (1.0 - piso) * mascara), N_FFT, axis=1) * ventana
+
+    # Traslape y suma (N_FFT / SALTO_FFT sumas de bloques contiguos),
+    # normalizando por la suma de ventanas al cuadrado
+    largo = len(frames) * SALTO_FFT
+    salida = np.zeros(len(relleno) + N_FFT, dtype=np.float32)
+    pesos = np.zeros(len(relleno) + N_FFT, dtype=np.float32)
+    cuadrado = np.tile((ventana * ventana).reshape(-1, SALTO_FFT), (1, len(frames)))
+    for r in range(N_FFT // SALTO_FFT):
+        trozo = slice(r * SALTO_FFT, (r + 1) * SALTO_FFT)
+        salida[r * SALTO_FFT:r * SALTO_FFT + largo] += frames[:, trozo].reshape(-1)
+        pesos[r * SALTO_FFT:r * SALTO_FFT + largo] += cuadrado[r]
+    salida = salida / np.maximum(pesos, 1e-3)
+    return salida[N_FFT // 2:N_FFT // 2 + len(audio)].astype(np.float32)
+
+
+def preparar(audio, frecuencia: int = FRECUENCIA, normalizar=NORMALIZAR, compuerta=COMPUERTA):
+    """
+    Ruta de WAV o arreglo -> float32 contiguo a 16 kHz, sin DC, normalizado
+    y (opcional) con compuerta de ruido, listo para model.transcribe().
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        audio, frecuencia = cargar_wav(audio)
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    audio = remuestrear(audio, frecuencia)
+    if len(audio) == 0:
+        return np.ascontiguousarray(audio)
+    audio = audio - audio.mean()
+    if compuerta:
+        audio = compuerta_espectral(audio)
+    if normalizar:
+        pico = float(np.abs(audio).max())
+        if pico > 0.0:
+            audio = audio * min(NIVEL_PICO / pico, 10.0 ** (GANANCIA_MAX_DB / 20.0))
+    return np.ascontiguousarray(audio, dtype=np.float32)
@@ -0,0 +1,1161 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import base64
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import wave
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# BENCHMARK DE LATENCIA POR ETAPA
+# Mide p50/p95/p99 y operaciones por segundo de cada etapa del rover y
+# de los dos caminos completos:
+#   voz -> primer comando a motores
+#   describir -> primer audio
+# Sin hardware ni red se usan sustitutos locales:
+#   - WAV de prueba (tono + ruido, o uno grabado con MR_BENCH_WAV) y un
+#     "parec" falso que lo copia,
+#   - cámara falsa con frames sintéticos,
+#   - servidor HTTP local que responde como Gemini y como gTTS,
+#   - MPU y ESP32 de sim_mr.py (con MR_BENCH_HARDWARE=1 se usan el bus
+#     I2C y los puertos reales; solo se manda PWM 0).
+# Una etapa cuyo módulo no se puede importar (whisper, cv2, genai...)
+# se reporta como omitida.
+#
+# Uso:  python bench_mr.py [filtro ...] [--guardar]
+#       python bench_mr.py --whisper   (compara motores/modelos de Whisper)
+#       python bench_mr.py --intenciones   (detector de destinos con ruido)
+#       python bench_mr.py --imagen   (tamaño de imagen vs latencia y calidad)
+#   --guardar guarda los resultados como línea base (MR_BENCH_BASE,
+#   default ~/.cache/mr_bench_base.json: es de cada máquina, no va al repo).
+#   Si hay línea base, se compara el p95 y se sale con código 1 si
+#   alguna etapa empeoró más de MR_BENCH_TOLERANCIA (0.25 = 25 %).
+# ==========================================
+
+DIR_MR = os.path.dirname(os.path.abspath(__file__))
+
+REPETICIONES = int(os.environ.get("MR_BENCH_N", "200"))
+REPETICIONES_LENTAS = int(os.environ.get("MR_BENCH_N_LENTO", "3"))
+ARCHIVO_BASE = os.environ.get("MR_BENCH_BASE", os.path.join(os.path.expanduser("~"), ".cache", "mr_bench_base.json"))
+TOLERANCIA = float(os.environ.get("MR_BENCH_TOLERANCIA", "0.25"))
+MINIMO_REGRESION_MS = 0.05   # diferencias menores se consideran ruido
+HARDWARE = os.environ.get("MR_BENCH_HARDWARE", "0") == "1"
+WAV_GRABADO = os.environ.get("MR_BENCH_WAV")
+
+# Comparación de motores Whisper (--whisper): carpeta con WAVs grabados y
+# un comandos.tsv "archivo.wav<TAB>texto esperado" por línea
+DIR_COMANDOS = os.environ.get("MR_BENCH_COMANDOS", os.path.join(DIR_MR, "bench_comandos"))
+CONFIGS_WHISPER = os.environ.get(
+    "MR_BENCH_WHISPER", "whisper:base,faster:tiny:int8,faster:base:int8,faster:small:int8"
+)
+
+# Retardos del servidor simulado (ms) para imitar la red, y velocidad de
+# subida (kbit/s, 0 = sin límite) con la que "recibe" los cuerpos
+RETARDO_GEMINI_MS = float(os.environ.get("MR_BENCH_GEMINI_MS", "0"))
+RETARDO_TTS_MS = float(os.environ.get("MR_BENCH_TTS_MS", "0"))
+# En streaming, MR_BENCH_GEMINI_MS es hasta el primer pedazo y este entre pedazos
+RETARDO_PEDAZO_MS = float(os.environ.get("MR_BENCH_GEMINI_PEDAZO_MS", "0"))
+PALABRAS_POR_PEDAZO = 6
+SUBIDA_KBPS = float(os.environ.get("MR_BENCH_SUBIDA_KBPS", "0"))
+
+# Comparación de tamaños de imagen (--imagen): "lado:formato:bytes" como
+# MR_VISION_LADO/FORMATO/BYTES; MR_BENCH_IMAGEN = foto real a usar (el
+# frame sintético comprime mucho mejor que una escena real) y con
+# MR_BENCH_GEMINI_REAL=1 se consulta a Gemini de verdad para comparar
+# las descripciones.
+IMAGEN_BENCH = os.environ.get("MR_BENCH_IMAGEN")
+CONFIGS_IMAGEN = os.environ.get(
+    "MR_BENCH_IMAGEN_CONFIGS",
+    "0:jpeg:0,1280:jpeg:150000,768:jpeg:60000,768:webp:40000,512:jpeg:30000,384:jpeg:15000",
+)
+SUBIDA_KBPS_IMAGEN = 2000.0   # Wi-Fi débil, si no se da MR_BENCH_SUBIDA_KBPS
+GEMINI_REAL = os.environ.get("MR_BENCH_GEMINI_REAL", "0") == "1"
+
+FRASES = (
+    "quiero ir a los sanitarios",
+    "llévame a la torre por favor",
+    "necesito un doctor",
+    "vamos al servicio médico",
+    "a la rampa",
+    "describe lo que ves",
+    "hola cómo estás",
+)
+
+DESCRIPCION_SIMULADA = (
+    "Estás en un pasillo amplio y bien iluminado. A tu izquierda hay una puerta "
+    "de madera y a la derecha una banca. Al fondo se ve una rampa con barandal. "
+    "El piso está despejado, puedes avanzar con tranquilidad."
+)
+
+LINEA_TELEMETRIA = b"A pwm:1000 vel:0.14 cnt:123456   |   B pwm:1000 vel:0.14 cnt:123460\r\n"
+
+
+class Omitida(Exception):
+    """
+    La etapa no se puede medir aquí (falta un módulo o hardware).
+    Cualquier otra excepción de una etapa cuenta como falla.
+    """
+
+
+# ==========================================
+# ESTADÍSTICAS
+# ==========================================
+
+def percentil(ordenadas, p: float) -> float:
+    n = len(ordenadas)
+    if n == 0:
+        return 0.0
+    return ordenadas[min(n - 1, int(p / 100.0 * n))]
+
+
+def resumir(muestras) -> dict:
+    """
+    Latencias en segundos -> {n, p50_ms, p95_ms, p99_ms, max_ms, ops_s}.
+    """
+    ordenadas = sorted(muestras)
+    total = sum(ordenadas)
+    return {
+        "n": len(ordenadas),
+        "p50_ms": percentil(ordenadas, 50) * 1000.0,
+        "p95_ms": percentil(ordenadas, 95) * 1000.0,
+        "p99_ms": percentil(ordenadas, 99) * 1000.0,
+        "max_ms": ordenadas[-1] * 1000.0 if ordenadas else 0.0,
+        "ops_s": len(ordenadas) / total if total > 0 else 0.0,
+    }
+
+
+def cronometrar(funcion, n: int, calentamiento: int = 1):
+    """
+    Llama `funcion(i)` n veces y devuelve la latencia de cada llamada (s).
+    """
+    for i in range(calentamiento):
+        funcion(i)
+    muestras = array("d")
+    for i in range(n):
+        t0 = time.perf_counter()
+        funcion(i)
+        muestras.append(time.perf_counter() - t0)
+    return muestras
+
+
+def _importar(nombre: str):
+    try:
+        return importlib.import_module(nombre)
+    except ImportError as e:
+        raise Omitida(f"no se pudo importar {nombre}: {e}")
+
+
+# ==========================================
+# SUSTITUTOS LOCALES
+# ==========================================
+
+def escribir_wav(path, segundos=6.0, frecuencia=16000, tono_hz=220.0, voz=None):
+    """
+    WAV mono de 16 bits con ruido de fondo y un tono en el intervalo
+    `voz` (s); todo el archivo si es None. No es voz: para medir la
+    transcripción con texto real, grabar uno y pasarlo en MR_BENCH_WAV.
+    """
+    n = int(segundos * frecuencia)
+    muestras = array("h", bytes(2 * n))
+    inicio, fin = (0, n) if voz is None else (int(voz[0] * frecuencia), int(voz[1] * frecuencia))
+    semilla = 12345
+    for i in range(n):
+        semilla = (semilla * 1103515245 + 12345) & 0x7FFFFFFF
+        ruido = (semilla >> 16) % 201 - 100
+        tono = 6000 * math.sin(2 * math.pi * tono_hz * i / frecuencia) if inicio <= i < fin else 0.0
+        muestras[i] = int(tono) + ruido
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(frecuencia)
+        w.writeframes(muestras.tobytes())
+
+
+# Intervalo (s) del tono dentro del WAV de 6 s: la captura en streaming
+# debería cortar ~SILENCIO_FIN_MS después del final.
+DURACION_VOZ_FIXTURE = (0.5, 2.0)
+
+PAREC_FALSO = """#!{python}
+import os, sys, time
+WAV = {wav!r}
+with open(WAV, "rb") as f:
+    datos = f.read()[44:]
+if "--raw" not in sys.argv:
+    # Modo archivo: copia el WAV y espera el SIGINT
+    with open(sys.argv[-1], "wb") as f:
+        f.write(open(WAV, "rb").read())
+    try:
+        time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+# Modo streaming: PCM a stdout a ritmo real, luego solo el ruido final
+salida = sys.stdout.buffer
+bloque = 960
+fondo = datos[-16000:]
+i, t0 = 0, time.monotonic()
+try:
+    while True:
+        if i < len(datos):
+            pedazo = datos[i:i + bloque]
+        else:
+            j = (i - len(datos)) % len(fondo)
+            pedazo = (fondo[j:] + fondo)[:bloque]
+        salida.write(pedazo)
+        salida.flush()
+        i += bloque
+        espera = t0 + i / 32000.0 - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+except (BrokenPipeError, KeyboardInterrupt):
+    # Quien leía cerró el pipe (terminó o se cayó): salir sin traceback,
+    # y sin que el flush final de Python vuelva a fallar
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(0)
+"""
+
+
+class Fixtures:
+    """
+    Directorio temporal con el WAV de prueba y un `parec` falso: en modo
+    archivo lo copia y espera el SIGINT como el real; con --raw lo manda
+    por stdout en tiempo real.
+    """
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp(prefix="bench_mr_")
+        self.wav = os.path.join(self.dir, "voz.wav")
+        if WAV_GRABADO:
+            shutil.copy(WAV_GRABADO, self.wav)
+        else:
+            escribir_wav(self.wav, voz=DURACION_VOZ_FIXTURE)
+        self.wav_tts = os.path.join(self.dir, "tts.wav")
+        escribir_wav(self.wav_tts, segundos=0.5, frecuencia=22050, tono_hz=440.0)
+
+        self.bin = os.path.join(self.dir, "bin")
+        os.makedirs(self.bin)
+        parec = os.path.join(self.bin, "parec")
+        with open(parec, "w") as f:
+            f.write(PAREC_FALSO.format(python=sys.executable, wav=self.wav))
+        os.chmod(parec, 0o755)
+
+    def path_con_parec(self):
+        return self.bin + os.pathsep + os.environ.get("PATH", "")
+
+    def cerrar(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class CamaraFalsa:
+    """
+    Lo que camara_mr usa de cv2.VideoCapture.
+    """
+
+    def __init__(self, indice=0):
+        import numpy as np
+        y, x = np.mgrid[0:480, 0:640]
+        self.frame = np.dstack([(x // 3) % 256, (y // 2) % 256, ((x + y) // 5) % 256]).astype("uint8")
+
+    def isOpened(self):
+        return True
+
+    def set(self, propiedad, valor):
+        return True
+
+    def read(self):
+        time.sleep(1.0 / 30)   # 30 fps, como la webcam
+        return True, self.frame.copy()
+
+    def release(self):
+        pass
+
+
+class _ManejadorSimulado(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(largo)
+        if self.server.subida_kbps > 0:
+            time.sleep(largo * 8 / (self.server.subida_kbps * 1000.0))
+        if ":streamGenerateContent" in self.path:
+            self._responder_stream()
+            return
+        if ":generateContent" in self.path:
+            time.sleep(RETARDO_GEMINI_MS / 1000.0)
+            cuerpo = json.dumps({
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": DESCRIPCION_SIMULADA}]},
+                    "finishReason": "STOP",
+                }],
+            }).encode("utf-8")
+            tipo = "application/json"
+        elif "batchexecute" in self.path:
+            # Formato de respuesta que gTTS espera (RPC jQ1olc con el audio en base64)
+            time.sleep(RETARDO_TTS_MS / 1000.0)
+            audio = base64.b64encode(self.server.audio_tts).decode("ascii")
+            cuerpo = (
+                ")]}'\n\n"
+                f'[["wrb.fr","jQ1olc","[\\"{audio}\\"]",null,null,null,"generic"]]\n'
+            ).encode("utf-8")
+            tipo = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+    def _responder_stream(self):
+        """
+        Respuesta de streamGenerateContent (SSE): la descripción en pedazos
+        de PALABRAS_POR_PEDAZO palabras.
+        """
+        time.sleep(RETARDO_GEMINI_MS / 1000.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        palabras = DESCRIPCION_SIMULADA.split(" ")
+        for i in range(0, len(palabras), PALABRAS_POR_PEDAZO):
+            texto = " ".join(palabras[i:i + PALABRAS_POR_PEDAZO])
+            if i + PALABRAS_POR_PEDAZO < len(palabras):
+                texto += " "
+            pedazo = {"candidates": [{"content": {"role": "model", "parts": [{"text": texto}]}}]}
+            if i + PALABRAS_POR_PEDAZO >= len(palabras):
+                pedazo["candidates"][0]["finishReason"] = "STOP"
+            self.wfile.write(b"data: " + json.dumps(pedazo).encode("utf-8") + b"\r\n\r\n")
+            self.wfile.flush()
+            if i + PALABRAS_POR_PEDAZO < len(palabras):
+                time.sleep(RETARDO_PEDAZO_MS / 1000.0)
+        self.close_connection = True
+
+
+class ServidorSimulado:
+    """
+    HTTP local que responde como Gemini (generateContent) y como el
+    endpoint de Google Translate que usa gTTS.
+    """
+
+    def __init__(self, audio_tts: bytes, subida_kbps: float = SUBIDA_KBPS):
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorSimulado)
+        self.http.audio_tts = audio_tts
+        self.http.subida_kbps = subida_kbps
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}"
+        self._hilo = threading.Thread(target=self.http.serve_forever, name="BenchHTTP", daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+class Parche:
+    """
+    Reemplaza atributos y los restaura al salir (with Parche(...)).
+    """
+
+    def __init__(self, *cambios):
+        self.cambios = cambios   # (objeto, atributo, valor)
+        self.previos = []
+
+    def __enter__(self):
+        for obj, attr, valor in self.cambios:
+            self.previos.append((obj, attr, getattr(obj, attr)))
+            setattr(obj, attr, valor)
+        return self
+
+    def __exit__(self, *exc):
+        for obj, attr, valor in reversed(self.previos):
+            setattr(obj, attr, valor)
+        self.previos.clear()
+
+
+def _cliente_gemini_local(genai, url):
+    def crear(*args, **kwargs):
+        kwargs.setdefault("api_key", "bench")
+        opciones = kwargs.get("http_options") or {}
+        if isinstance(opciones, dict):
+            kwargs["http_options"] = dict(opciones, base_url=url)
+        else:
+            kwargs["http_options"] = opciones.model_copy(update={"base_url": url})
+        return crear.original(*args, **kwargs)
+    crear.original = genai.Client
+    return crear
+
+
+def _parches_vision(vision, contexto):
+    """
+    Cámara falsa, Gemini y gTTS contra el servidor local y audio sin
+    tarjeta de sonido (SDL dummy, se reproduce en tiempo real).
+    """
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    servidor = contexto["servidor"]
+    cambios = [
+        (vision.cv2, "VideoCapture", CamaraFalsa),
+        (vision.genai, "Client", _cliente_gemini_local(vision.genai, servidor.url)),
+        # Cliente compartido nuevo, creado contra el servidor local
+        (vision.gemini, "_client", None),
+        # Sin cache de audio: cada frase va a gTTS (etapa voz.tts_cache para los aciertos)
+        (vision, "tts_cache", _importar("cache_tts_mr").CacheTTS(activo=False)),
+    ]
+    # La cámara compartida se reabre sobre la cámara falsa
+    vision.camara_mr.cerrar()
+    try:
+        import gtts.tts
+        cambios.append((gtts.tts, "_translate_url", lambda *a, **k: servidor.url + "/_/TranslateWebserverUi/data/batchexecute"))
+    except ImportError:
+        pass
+    return Parche(*cambios)
+
+
+# ==========================================
+# ETAPAS
+# Cada etapa recibe el contexto compartido y devuelve la lista de
+# latencias (s). Lanza Omitida si no se puede medir aquí.
+# ==========================================
+
+class _MundoQuieto:
+    """
+    Rover detenido, para el MPU simulado de las etapas de I2C.
+    """
+    omega_dps = 0.0
+
+    def __init__(self):
+        self.azar = random.Random(0)
+
+
+def _mpu():
+    rutas = _importar("rutas_mpu_mr")
+    if HARDWARE:
+        return rutas.MPU_Gyro_X_Only(bus_num=7)
+    sim = _importar("sim_mr")
+    return rutas.MPU_Gyro_X_Only(bus=sim.SMBusSimulado(_MundoQuieto()))
+
+
+def etapa_rutas_cargar(contexto):
+    config = _importar("rutas_config_mr")
+    config.cargar_rutas()   # deja listo el cache
+    return cronometrar(lambda i: config.cargar_rutas(), REPETICIONES)
+
+
+def etapa_mapa_pasos(contexto):
+    mapa_mr = _importar("mapa_mr")
+    mapa = mapa_mr.cargar_mapa()
+    destinos = list(mapa.destinos)
+    return cronometrar(lambda i: mapa.pasos("inicio", destinos[i % len(destinos)], 0.0), REPETICIONES)
+
+
+def etapa_detectar_destino(contexto):
+    main_mr = _importar("main_mr")
+    return cronometrar(lambda i: main_mr.detectar_destino(FRASES[i % len(FRASES)]), REPETICIONES)
+
+
+def etapa_i2c_gyro(contexto):
+    mpu = _mpu()
+    return cronometrar(lambda i: mpu.read_gyro_x(), REPETICIONES)
+
+
+def etapa_i2c_bloque(contexto):
+    mpu = _mpu()
+    return cronometrar(lambda i: mpu.read_all(), REPETICIONES)
+
+
+def _etapa_serial(protocolo):
+    def etapa(contexto):
+        motores = _importar("motores_mr")
+        rutas = _importar("rutas_mpu_mr")
+        esps = []
+        if HARDWARE:
+            left, right = rutas.abrir_puertos()
+        else:
+            sim = _importar("sim_mr")
+            esps = [sim.ESP32Simulado("LEFT"), sim.ESP32Simulado("RIGHT")]
+            left, right = (rutas.serial.Serial(e.ruta, rutas.BAUDRATE, timeout=0.05) for e in esps)
+        try:
+            salida = motores.SalidaMotores(left, right, protocolo=protocolo)
+            # Con hardware solo se manda 0 (el rover no se mueve)
+            valores = (0,) if HARDWARE else (0, 500, -500, 1000)
+            return cronometrar(lambda i: salida.enviar(valores[i % len(valores)], valores[i % len(valores)], forzar=True), REPETICIONES)
+        finally:
+            for puerto in (left, right):
+                puerto.close()
+            for esp in esps:
+                esp.cerrar()
+    return etapa
+
+
+def _etapa_telemetria(binario):
+    def etapa(contexto):
+        telemetria = _importar("telemetria_mr")
+        protocolo = _importar("protocolo_mr")
+        if binario:
+            import struct
+            cuerpo = struct.pack(protocolo.FORMATO_TEL, protocolo.SYNC_TEL, protocolo.TIPO_TEL, 0, 1000, 123456, 123460, 14, 14, 0)
+            datos = cuerpo + bytes((protocolo.crc8(cuerpo[1:]),))
+        else:
+            datos = LINEA_TELEMETRIA
+        lector = telemetria.LectorTelemetria(None, "BENCH", binario=binario)
+        return cronometrar(lambda i: lector.procesar(datos, 0.0), REPETICIONES)
+    return etapa
+
+
+def _primer_comando(sim, secuencia, inicio):
+    """
+    Segundos desde `inicio` hasta que el ESP32 simulado recibe el primer PWM.
+    """
+    sim.left.t_primer_pwm = None
+    sim.ejecutar_secuencia(secuencia, "BENCH")
+    if sim.left.t_primer_pwm is None:
+        raise Omitida("la ruta no mandó ningún PWM")
+    return sim.left.t_primer_pwm - inicio
+
+
+def etapa_rutas_primer_comando(contexto):
+    """
+    Inicio de una ruta (calibración del MPU + negociación) hasta el
+    primer PWM, en tiempo real con los puertos ya abiertos.
+    """
+    sim_mr = _importar("sim_mr")
+    secuencia = [(1000, 1000, 0.1, 0, 0.0)]
+    muestras = array("d")
+    sim = sim_mr.Simulador(factor=1.0)
+    try:
+        for _ in range(REPETICIONES_LENTAS):
+            muestras.append(_primer_comando(sim, secuencia, time.perf_counter()))
+    finally:
+        sim.cerrar()
+    return muestras
+
+
+def etapa_voz_grabar(contexto):
+    mic = _importar("mic_mr")
+    previo = os.environ["PATH"]
+    os.environ["PATH"] = contexto["fixtures"].path_con_parec()
+    # La grabación va al directorio temporal, no al directorio actual
+    wav = os.path.join(contexto["fixtures"].dir, mic.FILENAME)
+    try:
+        return cronometrar(lambda i: mic.grabar_6s_con_parec(wav), REPETICIONES_LENTAS, calentamiento=0)
+    finally:
+        os.environ["PATH"] = previo
+
+
+def etapa_voz_escuchar_streaming(contexto):
+    """
+    Captura en memoria con detección de voz: desde que arranca parec
+    hasta tener la frase (tono de 1.5 s en el WAV de prueba).
+    """
+    audio_mr = _importar("audio_mr")
+    previo = os.environ["PATH"]
+    os.environ["PATH"] = contexto["fixtures"].path_con_parec()
+
+    def escuchar(i):
+        fuente = audio_mr.CapturaAudio()
+        fuente.iniciar()
+        try:
+            if audio_mr.escuchar_frase(fuente, audio_mr.DetectorVoz()) is None:
+                raise Omitida("no se detectó la frase del WAV de prueba")
+        finally:
+            fuente.detener()
+
+    try:
+        return cronometrar(escuchar, REPETICIONES_LENTAS, calentamiento=0)
+    finally:
+        os.environ["PATH"] = previo
+
+
+def etapa_voz_preparar(contexto):
+    audio_mr = _importar("audio_mr")
+    wav = contexto["fixtures"].wav
+    return cronometrar(lambda i: audio_mr.preparar(wav), REPETICIONES)
+
+
+def etapa_voz_compuerta(contexto):
+    audio_mr = _importar("audio_mr")
+    audio = audio_mr.preparar(contexto["fixtures"].wav)
+    return cronometrar(lambda i: audio_mr.compuerta_espectral(audio), REPETICIONES_LENTAS * 10)
+
+
+def etapa_voz_transcribir(contexto):
+    mic = _importar("mic_mr")
+    wav = contexto["fixtures"].wav
+    return cronometrar(lambda i: mic.motor.transcribir(wav), REPETICIONES_LENTAS)
+
+
+def etapa_vision_captura(contexto):
+    vision = _importar("vision_voz_mr")
+    path = os.path.join(contexto["fixtures"].dir, "captura.jpg")
+    with _parches_vision(vision, contexto):
+        return cronometrar(lambda i: vision.capture_and_save_image(path), REPETICIONES_LENTAS, calentamiento=0)
+
+
+def etapa_vision_gemini(contexto):
+    vision = _importar("vision_voz_mr")
+    path = os.path.join(contexto["fixtures"].dir, "gemini.jpg")
+    with _parches_vision(vision, contexto):
+        vision.capture_and_save_image(path)
+        return cronometrar(lambda i: vision.send_prompt_to_gemini_multimodal(vision.FIXED_PROMPT, path), REPETICIONES_LENTAS)
+
+
+def etapa_vision_cache(contexto):
+    """
+    Hash perceptual del frame + búsqueda con acierto (la respuesta a un "qué ves" repetido).
+    """
+    cache = _importar("cache_vision_mr")
+    frame = CamaraFalsa().frame
+    descripciones = cache.CacheDescripciones(archivo="")
+    descripciones.guardar(cache.hash_frame(frame), "prompt", DESCRIPCION_SIMULADA)
+    return cronometrar(lambda i: descripciones.buscar(cache.hash_frame(frame), "prompt"), REPETICIONES)
+
+
+def etapa_voz_tts(contexto):
+    vision = _importar("vision_voz_mr")
+    with _parches_vision(vision, contexto):
+        return cronometrar(lambda i: vision.read_text_aloud(DESCRIPCION_SIMULADA), REPETICIONES_LENTAS)
+
+
+def etapa_voz_tts_cache(contexto):
+    """
+    Audio de una frase ya dicha leído del cache en disco (sin el nivel en memoria).
+    """
+    vision = _importar("vision_voz_mr")
+    cache = _importar("cache_tts_mr").CacheTTS(directorio=os.path.join(contexto["fixtures"].dir, "tts"))
+    with _parches_vision(vision, contexto), Parche((vision, "tts_cache", cache)):
+        vision.synthesize_speech(DESCRIPCION_SIMULADA)
+
+        def leer(i):
+            cache.memoria.clear()
+            cache.bytes_memoria = 0
+            vision.synthesize_speech(DESCRIPCION_SIMULADA)
+        return cronometrar(leer, REPETICIONES)
+
+
+def etapa_voz_barge_in(contexto):
+    """
+    Desde stop_speaking() hasta que se corta el clip que está sonando.
+    """
+    vision = _importar("vision_voz_mr")
+    with _parches_vision(vision, contexto):
+        audio = vision.synthesize_speech(DESCRIPCION_SIMULADA)
+        mixer = vision.altavoz_mr.pygame.mixer
+        muestras = array("d")
+        for _ in range(REPETICIONES_LENTAS):
+            clip = vision.altavoz_mr.servicio().reproducir(audio)
+            # El mixer lo inicia el hilo del altavoz con el primer clip
+            limite = time.monotonic() + 5.0
+            while not (mixer.get_init() and mixer.music.get_busy()):
+                if clip.terminado() or time.monotonic() > limite:
+                    raise Omitida("el clip no llegó a sonar")
+                time.sleep(0.005)
+            t0 = time.perf_counter()
+            vision.stop_speaking()
+            clip.esperar(timeout=5.0)
+            t = time.perf_counter() - t0
+            if not clip.terminado():
+                raise Omitida("el clip no terminó en 5 s")
+            if not clip.interrumpido:
+                raise Omitida("el clip no se interrumpió")
+            muestras.append(t)
+    return muestras
+
+
+def etapa_camino_voz_motor(contexto):
+    """
+    Grabar + transcribir + detectar destino + iniciar la ruta hasta el
+    primer PWM. Con el WAV sintético no se reconoce destino y se usa TORRE.
+    """
+    mic = _importar("mic_mr")
+    main_mr = _importar("main_mr")
+    sim_mr = _importar("sim_mr")
+    rutas = _importar("rutas_mpu_mr")
+    previo = os.environ["PATH"]
+    os.environ["PATH"] = contexto["fixtures"].path_con_parec()
+    sim = sim_mr.Simulador(factor=1.0)
+    muestras = array("d")
+    try:
+        for _ in range(REPETICIONES_LENTAS):
+            t0 = time.perf_counter()
+            destino = main_mr.detectar_destino(mic.escuchar_y_transcribir()) or "torre"
+            # Solo el primer paso: interesa cuándo sale el primer PWM
+            pwm_l, pwm_r, _, angulo, distancia = rutas.RUTAS[destino.upper()][0]
+            muestras.append(_primer_comando(sim, [(pwm_l, pwm_r, 0.1, angulo, distancia)], t0))
+    finally:
+        sim.cerrar()
+        os.environ["PATH"] = previo
+    return muestras
+
+
+def etapa_camino_describir_audio(contexto):
+    """
+    Captura + Gemini + TTS hasta que empieza a sonar el audio.
+    """
+    vision = _importar("vision_voz_mr")
+    musica = vision.altavoz_mr.pygame.mixer.music
+    inicio_audio = []
+
+    def play(*args, **kwargs):
+        inicio_audio.append(time.perf_counter())
+        return play.original(*args, **kwargs)
+    play.original = musica.play
+
+    muestras = array("d")
+    with _parches_vision(vision, contexto), Parche((musica, "play", play)):
+        for _ in range(REPETICIONES_LENTAS):
+            inicio_audio.clear()
+            # Siempre el camino completo (la cámara falsa repite el frame)
+            vision.description_cache.limpiar()
+            t0 = time.perf_counter()
+            vision.describir_entorno_una_vez()
+            if not inicio_audio:
+                raise Omitida("no se llegó a reproducir audio")
+            muestras.append(inicio_audio[0] - t0)
+    return muestras
+
+
+ETAPAS = (
+    ("rutas.cargar", etapa_rutas_cargar),
+    ("mapa.pasos", etapa_mapa_pasos),
+    ("voz.detectar_destino", etapa_detectar_destino),
+    ("i2c.read_gyro_x", etapa_i2c_gyro),
+    ("i2c.read_all", etapa_i2c_bloque),
+    ("serial.enviar_ascii", _etapa_serial("ascii")),
+    ("serial.enviar_binario", _etapa_serial("binario")),
+    ("serial.telemetria_ascii", _etapa_telemetria(False)),
+    ("serial.telemetria_binaria", _etapa_telemetria(True)),
+    ("rutas.primer_comando", etapa_rutas_primer_comando),
+    ("voz.grabar", etapa_voz_grabar),
+    ("voz.escuchar_streaming", etapa_voz_escuchar_streaming),
+    ("voz.preparar", etapa_voz_preparar),
+    ("voz.compuerta", etapa_voz_compuerta),
+    ("voz.transcribir", etapa_voz_transcribir),
+    ("vision.captura", etapa_vision_captura),
+    ("vision.gemini", etapa_vision_gemini),
+    ("vision.cache", etapa_vision_cache),
+    ("voz.tts", etapa_voz_tts),
+    ("voz.tts_cache", etapa_voz_tts_cache),
+    ("voz.barge_in", etapa_voz_barge_in),
+    ("camino.voz_a_motor", etapa_camino_voz_motor),
+    ("camino.describir_a_audio", etapa_camino_describir_audio),
+)
+
+
+# ==========================================
+# COMPARACIÓN DE MOTORES WHISPER
+# Factor de tiempo real (RTF = tiempo de decodificación / duración del
+# audio), WER y aciertos de destino sobre los comandos grabados.
+# ==========================================
+
+def _palabras(texto: str):
+    limpio = "".join(c if c.isalnum() or c.isspace() else " " for c in texto.lower())
+    return limpio.split()
+
+
+def tasa_error_palabras(esperado: str, obtenido: str) -> float:
+    """
+    WER: distancia de edición por palabras / palabras esperadas.
+    """
+    ref, hip = _palabras(esperado), _palabras(obtenido)
+    fila = list(range(len(hip) + 1))
+    for i, r in enumerate(ref, start=1):
+        previa, fila[0] = fila[0], i
+        for j, h in enumerate(hip, start=1):
+            actual = min(fila[j] + 1, fila[j - 1] + 1, previa + (r != h))
+            previa, fila[j] = fila[j], actual
+    return fila[-1] / max(1, len(ref))
+
+
+def cargar_comandos(directorio=DIR_COMANDOS):
+    """
+    [(ruta_wav, texto_esperado, duración_s)] de comandos.tsv.
+    """
+    comandos = []
+    with open(os.path.join(directorio, "comandos.tsv"), "r", encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip() or linea.startswith("#"):
+                continue
+            archivo, texto = linea.rstrip("\n").split("\t", 1)
+            ruta = os.path.join(directorio, archivo)
+            with wave.open(ruta, "rb") as w:
+                duracion = w.getnframes() / w.getframerate()
+            comandos.append((ruta, texto, duracion))
+    return comandos
+
+
+def comparar_whisper(configs=CONFIGS_WHISPER, directorio=DIR_COMANDOS) -> None:
+    mic = _importar("mic_mr")
+    main_mr = _importar("main_mr")
+    try:
+        comandos = cargar_comandos(directorio)
+    except OSError as e:
+        print(f"[BENCH] Sin comandos grabados ({e}). Ver MR_BENCH_COMANDOS.")
+        return
+
+    print(f"\n=== WHISPER: {len(comandos)} comandos de {directorio} ===")
+    print(f"{'motor':<34}{'carga s':>9}{'RTF p50':>9}{'RTF p95':>9}{'WER':>7}{'destino':>9}")
+    for config in configs.split(","):
+        partes = config.strip().split(":")
+        motor = mic.MotorWhisper(
+            motor=partes[0],
+            modelo=partes[1] if len(partes) > 1 else mic.MODELO,
+            compute=partes[2] if len(partes) > 2 else mic.COMPUTE,
+        )
+        try:
+            motor.cargar()
+            motor.transcribir(comandos[0][0])   # calentamiento
+        except Exception as e:
+            print(f"{motor.descripcion():<34} omitido: {e}")
+            continue
+
+        rtf, wer, aciertos = [], 0.0, 0
+        for ruta, esperado, duracion in comandos:
+            t0 = time.perf_counter()
+            obtenido = motor.transcribir(ruta)
+            rtf.append((time.perf_counter() - t0) / duracion)
+            wer += tasa_error_palabras(esperado, obtenido)
+            aciertos += main_mr.detectar_destino(obtenido) == main_mr.detectar_destino(esperado)
+        rtf.sort()
+        print(
+            f"{motor.descripcion():<34}{motor.segundos_carga:>9.1f}{percentil(rtf, 50):>9.3f}"
+            f"{percentil(rtf, 95):>9.3f}{wer / len(comandos):>7.2f}{aciertos / len(comandos):>9.0%}"
+        )
+
+
+# ==========================================
+# COMPARACIÓN DE DETECCIÓN DE INTENCIONES (--intenciones)
+# Corpus con ruido de transcripción (acentos perdidos, letras cambiadas,
+# borradas o traspuestas, muletillas) generado con semilla fija; se compara
+# el motor de intenciones_mr con la cadena de `in` que había antes.
+# ==========================================
+
+PLANTILLAS_INTENCION = (
+    "{}", "quiero ir a {}", "llévame a {} por favor", "eh {}", "oye robot {}",
+    "me puedes llevar a {}", "{} gracias", "necesito {} ahora",
+)
+CLAVES_INTENCION = (
+    ("los sanitarios", "sanitarios"), ("el baño", "sanitarios"), ("los baños", "sanitarios"),
+    ("la torre", "torre"), ("meditec", "servicio_medico"), ("servicio médico", "servicio_medico"),
+    ("un doctor", "servicio_medico"), ("servicios de salud", "servicio_medico"),
+    ("la rampa", "rampa"), ("describe lo que ves", "describir"), ("qué ves", "describir"),
+    ("el entorno", "describir"), ("apágate", "terminar"), ("termina", "terminar"),
+)
+FRASES_SIN_INTENCION = (
+    "hola cómo estás", "qué hora es", "la rama del árbol", "tengo hambre",
+    "no sé", "el clima está bonito", "cuéntame un chiste",
+    # A una o dos letras de palabras de destinos y comandos
+    "corre", "el perro corre", "qué torpe soy", "borre eso", "salía de casa",
+    "las ramas", "me dio una rampla", "mi tía es médium", "el doctorado",
+    "las torres", "no sale", "sala de espera", "el viaje terminó", "ya terminé",
+    "terminó", "terminé",
+)
+SIN_ACENTO = str.maketrans("áéíóúñ", "aeioun")
+
+
+def _ensuciar(texto: str, azar) -> str:
+    """
+    Errores típicos de Whisper sobre una frase: un cambio de letra en una
+    palabra larga, acentos perdidos, mayúsculas y puntuación.
+    """
+    palabras = texto.split()
+    largas = [i for i, p in enumerate(palabras) if len(p) >= 6]
+    if largas and azar.random() < 0.6:
+        i = azar.choice(largas)
+        p = palabras[i]
+        j = azar.randrange(1, len(p) - 1)
+        tipo = azar.choice(("cambio", "borrado", "traspuesta", "extra"))
+        if tipo == "cambio":
+            p = p[:j] + azar.choice("aeiourstnkc") + p[j + 1:]
+        elif tipo == "borrado":
+            p = p[:j] + p[j + 1:]
+        elif tipo == "traspuesta":
+            p = p[:j - 1] + p[j] + p[j - 1] + p[j + 1:]
+        else:
+            p = p[:j] + p[j] + p[j:]
+        palabras[i] = p
+    texto = " ".join(palabras)
+    if azar.random() < 0.5:
+        texto = texto.translate(SIN_ACENTO)
+    if azar.random() < 0.3:
+        texto = texto.capitalize() + azar.choice((".", "?", "!", ","))
+    return texto
+
+
+def corpus_intenciones(n=1000, semilla=0):
+    """
+    [(texto, esperado)]; esperado es destino, comando o None.
+    """
+    azar = random.Random(semilla)
+    corpus = []
+    for _ in range(n):
+        if azar.random() < 0.15:
+            corpus.append((_ensuciar(azar.choice(FRASES_SIN_INTENCION), azar), None))
+            continue
+        clave, esperado = azar.choice(CLAVES_INTENCION)
+        texto = azar.choice(PLANTILLAS_INTENCION).format(clave)
+        corpus.append((_ensuciar(texto, azar), esperado))
+    return corpus
+
+
+def intencion_cadena(texto: str):
+    """
+    La detección anterior a intenciones_mr (subcadenas en cadena), como referencia.
+    """
+    t = texto.lower()
+    if "sanitario" in t or "sanitarios" in t or "baño" in t or "baños" in t:
+        return "sanitarios"
+    if "torre" in t:
+        return "torre"
+    if any(f in t for f in (
+        "meditec", "meditek", "servicio medico", "servicio médico", "servicios medicos",
+        "servicios médicos", "servicios de salud", "asistencia medica", "asistencia médica",
+        "doctor", "doctora", "medico", "médico",
+    )):
+        return "servicio_medico"
+    if "rampa" in t:
+        return "rampa"
+    if "describe" in t or "que ves" in t or "qué ves" in t or "entorno" in t or "alrededor" in t:
+        return "describir"
+    if "termina" in t or "apagate" in t or "apágate" in t or "salir" in t:
+        return "terminar"
+    return None
+
+
+def comparar_intenciones(n=2000) -> None:
+    intenciones = _importar("intenciones_mr")
+    motor = intenciones.cargar_intenciones()
+
+    def motor_compilado(texto):
+        mejores = motor.detectar(texto)
+        return mejores[0].valor if mejores else None
+
+    corpus = corpus_intenciones(n)
+    print(f"\n=== INTENCIONES: {len(corpus)} frases con ruido ===")
+    print(f"{'detector':<14}{'aciertos':>10}{'falsos +':>10}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}")
+    for nombre, detectar in (("cadena", intencion_cadena), ("compilado", motor_compilado)):
+        aciertos = falsos = 0
+        for texto, esperado in corpus:
+            obtenido = detectar(texto)
+            aciertos += obtenido == esperado
+            falsos += obtenido is not None and obtenido != esperado
+        r = resumir(cronometrar(lambda i: detectar(corpus[i % len(corpus)][0]), len(corpus)))
+        print(
+            f"{nombre:<14}{aciertos / len(corpus):>10.1%}{falsos / len(corpus):>10.1%}"
+            f"{r['p50_ms'] * 1000:>9.1f}{r['p95_ms'] * 1000:>9.1f}{r['p99_ms'] * 1000:>9.1f}"
+        )
+
+
+# ==========================================
+# TAMAÑO DE IMAGEN vs LATENCIA Y CALIDAD (--imagen)
+# Por cada configuración: bytes subidos, tiempo de prepare_image, latencia
+# preparar + Gemini (servidor local con subida limitada, o el real) y
+# calidad: PSNR de la imagen subida contra el frame original y, con
+# Gemini real, parecido de la descripción con la de la imagen completa.
+# ==========================================
+
+def psnr(original, comprimida) -> float:
+    import numpy as np
+    diferencia = original.astype(np.float32) - comprimida.astype(np.float32)
+    mse = float(np.mean(diferencia * diferencia))
+    return 99.0 if mse == 0 else 10.0 * math.log10(255.0 * 255.0 / mse)
+
+
+def parecido_palabras(a: str, b: str) -> float:
+    pa, pb = set(_palabras(a)), set(_palabras(b))
+    return len(pa & pb) / max(1, len(pa | pb))
+
+
+def comparar_imagen(configs=CONFIGS_IMAGEN) -> None:
+    vision = _importar("vision_voz_mr")
+    import numpy as np
+    cv2 = vision.cv2
+    if IMAGEN_BENCH:
+        frame = cv2.imread(IMAGEN_BENCH)
+        if frame is None:
+            print(f"[BENCH] No se pudo leer MR_BENCH_IMAGEN={IMAGEN_BENCH}")
+            return
+    else:
+        print("[BENCH] Frame sintético; para tamaños realistas usa MR_BENCH_IMAGEN=foto.jpg")
+        frame = CamaraFalsa().frame
+    alto, ancho = frame.shape[:2]
+
+    fixtures = Fixtures()
+    with open(fixtures.wav_tts, "rb") as f:
+        servidor = ServidorSimulado(f.read(), subida_kbps=SUBIDA_KBPS or SUBIDA_KBPS_IMAGEN)
+    contexto = {"fixtures": fixtures, "servidor": servidor}
+    red = "Gemini real" if GEMINI_REAL else f"servidor local a {servidor.http.subida_kbps:.0f} kbit/s"
+    print(f"\n=== IMAGEN: frame {ancho}x{alto}, {red} ===")
+    print(f"{'config':<20}{'px':>10}{'KB':>8}{'prep ms':>9}{'total ms':>10}{'PSNR dB':>9}{'descr.':>8}")
+    referencia = None
+    try:
+        with (Parche() if GEMINI_REAL else _parches_vision(vision, contexto)):
+            for config in configs.split(","):
+                lado, formato, presupuesto = config.strip().split(":")
+                preparar = lambda i: vision.prepare_image(frame, int(lado), formato, int(presupuesto), None)
+                prep = resumir(cronometrar(preparar, 20))
+                datos = preparar(0)
+                subida = cv2.imdecode(np.frombuffer(datos, dtype=np.uint8), cv2.IMREAD_COLOR)
+                calidad = psnr(frame, cv2.resize(subida, (ancho, alto), interpolation=cv2.INTER_LINEAR))
+
+                texto = ""
+                muestras = array("d")
+                for i in range(REPETICIONES_LENTAS):
+                    t0 = time.perf_counter()
+                    texto = vision.send_prompt_to_gemini_multimodal(vision.FIXED_PROMPT, preparar(i))
+                    muestras.append(time.perf_counter() - t0)
+                total = resumir(muestras)
+                if referencia is None:
+                    referencia = texto
+                parecido = f"{parecido_palabras(referencia, texto):>8.0%}" if GEMINI_REAL else f"{'-':>8}"
+                print(
+                    f"{config.strip():<20}{f'{subida.shape[1]}x{subida.shape[0]}':>10}{len(datos) / 1024:>8.1f}"
+                    f"{prep['p50_ms']:>9.1f}{total['p50_ms']:>10.0f}{calidad:>9.1f}{parecido}"
+                )
+    finally:
+        if "camara_mr" in sys.modules:
+            sys.modules["camara_mr"].cerrar()
+        servidor.cerrar()
+        fixtures.cerrar()
+
+
+# ==========================================
+# EJECUCIÓN, LÍNEA BASE Y REPORTE
+# ==========================================
+
+def ejecutar(filtros=()):
+    """
+    Corre las etapas que coinciden con algún filtro (todas si no hay).
+    Devuelve {nombre: resumen}, {nombre: motivo} de las omitidas y
+    {nombre: error} de las que fallaron.
+    """
+    fixtures = Fixtures()
+    with open(fixtures.wav_tts, "rb") as f:
+        servidor = ServidorSimulado(f.read())
+    contexto = {"fixtures": fixtures, "servidor": servidor}
+    resultados, omitidas, fallidas = {}, {}, {}
+    try:
+        for nombre, etapa in ETAPAS:
+            if filtros and not any(f in nombre for f in filtros):
+                continue
+            print(f"[BENCH] {nombre}...", flush=True)
+            try:
+                resultados[nombre] = resumir(etapa(contexto))
+            except Omitida as e:
+                omitidas[nombre] = str(e)
+            except ImportError as e:
+                omitidas[nombre] = f"falta un módulo: {e}"
+            except Exception as e:
+                # Error real (red, descarga de un modelo, bug): se reporta como falla
+                fallidas[nombre] = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+    finally:
+        if "camara_mr" in sys.modules:
+            sys.modules["camara_mr"].cerrar()
+        servidor.cerrar()
+        fixtures.cerrar()
+    return resultados, omitidas, fallidas
+
+
+def cargar_base(path=ARCHIVO_BASE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("etapas", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_base(resultados, path=ARCHIVO_BASE) -> None:
+    datos = {
+        "maquina": platform.node(),
+        "python": platform.python_version(),
+        "hardware": HARDWARE,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "etapas": resultados,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    print(f"[BENCH] Línea base guardada en {path}")
+
+
+def reporte(resultados, omitidas, fallidas, base) -> list:
+    """
+    Imprime la tabla y devuelve las etapas con regresión de p95.
+    """
+    regresiones = []
+    print("\n=== BENCHMARK MR ===")
+    print(f"{'etapa':<28}{'n':>5}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>10}   base p95")
+    for nombre, r in resultados.items():
+        linea = (
+            f"{nombre:<28}{r['n']:>5}{r['p50_ms']:>11.3f}{r['p95_ms']:>11.3f}"
+            f"{r['p99_ms']:>11.3f}{r['ops_s']:>10.1f}"
+        )
+        b = base.get(nombre)
+        if b:
+            cambio = (r["p95_ms"] / b["p95_ms"] - 1.0) * 100.0 if b["p95_ms"] > 0 else 0.0
+            linea += f"   {b['p95_ms']:.3f} ({cambio:+.0f} %)"
+            if (r["p95_ms"] > b["p95_ms"] * (1.0 + TOLERANCIA)
+                    and r["p95_ms"] - b["p95_ms"] > MINIMO_REGRESION_MS):
+                linea += "  REGRESIÓN"
+                regresiones.append(nombre)
+        print(linea)
+    for nombre, motivo in omitidas.items():
+        print(f"{nombre:<28} omitida: {motivo}")
+    for nombre, error in fallidas.items():
+        print(f"{nombre:<28} FALLÓ: {error}")
+    print("====================")
+    return regresiones
+
+
+if __name__ == "__main__":
+    if "--whisper" in sys.argv:
+        comparar_whisper()
+        sys.exit(0)
+    if "--intenciones" in sys.argv:
+        comparar_intenciones()
+        sys.exit(0)
+    if "--imagen" in sys.argv:
+        comparar_imagen()
+        sys.exit(0)
+    guardar = "--guardar" in sys.argv
+    filtros = [a for a in sys.argv[1:] if not a.startswith("--")]
+    resultados, omitidas, fallidas = ejecutar(filtros)
+    base = cargar_base()
+    regresiones = reporte(resultados, omitidas, fallidas, base)
+    if fallidas:
+        print(f"[BENCH] Etapas con error: {', '.join(fallidas)}")
+        sys.exit(1)
+    if guardar:
+        guardar_base(resultados)
+    elif regresiones:
+        print(f"[BENCH] Regresiones: {', '.join(regresiones)}")
+        sys.exit(1)
@@ -0,0 +1,192 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# ==========================================
+# CACHE DE AUDIO TTS
+# El audio de cada frase se guarda con su hash (texto, idioma, tld, motor)
+# como nombre: la misma frase nunca se vuelve a pedir a gTTS, suena de
+# inmediato y funciona sin red. Dos niveles:
+#   - memoria: los últimos MAX_BYTES_MEMORIA bytes de audio usados,
+#   - disco:   MAX_BYTES_DISCO en DIRECTORIO; al pasarse se borran los
+#              archivos usados hace más tiempo (la fecha de modificación
+#              se actualiza en cada uso).
+#   MR_CACHE_TTS=0             desactiva el cache
+#   MR_CACHE_TTS_DIR           directorio (default ~/.cache/mr_tts)
+#   MR_CACHE_TTS_MB            tamaño máximo en disco
+#   MR_CACHE_TTS_MEMORIA_MB    tamaño máximo en memoria
+# ==========================================
+
+ACTIVO = os.environ.get("MR_CACHE_TTS", "1") == "1"
+DIRECTORIO = os.environ.get("MR_CACHE_TTS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "mr_tts"))
+MAX_BYTES_DISCO = int(float(os.environ.get("MR_CACHE_TTS_MB", "50")) * 1024 * 1024)
+MAX_BYTES_MEMORIA = int(float(os.environ.get("MR_CACHE_TTS_MEMORIA_MB", "8")) * 1024 * 1024)
+EXTENSION = ".mp3"
+
+
+def llave(texto: str, lang: str, tld: str, motor: str) -> str:
+    """
+    Hash del audio: mismo texto (sin contar espacios extra), idioma, tld y
+    motor = mismo archivo.
+    """
+    datos = json.dumps([motor, lang, tld, " ".join(texto.split())], ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+class CacheTTS:
+    def __init__(self, directorio=DIRECTORIO, max_bytes_disco=MAX_BYTES_DISCO,
+                 max_bytes_memoria=MAX_BYTES_MEMORIA, activo=ACTIVO):
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self.max_bytes_memoria = max_bytes_memoria
+        self.activo = activo
+        self.memoria = OrderedDict()   # llave -> bytes; el último es el más usado
+        self.bytes_memoria = 0
+        self.disco = None              # llave -> tamaño, ordenado por último uso (se lee al primer uso)
+        self.bytes_disco = 0
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + EXTENSION)
+
+    def _indice(self):
+        """
+        Índice del disco ordenado por fecha de uso (se arma una vez).
+        """
+        if self.disco is None:
+            archivos = []
+            try:
+                with os.scandir(self.directorio) as it:
+                    for e in it:
+                        if e.name.endswith(EXTENSION) and e.is_file():
+                            st = e.stat()
+                            archivos.append((st.st_mtime, e.name[:-len(EXTENSION)], st.st_size))
+            except FileNotFoundError:
+                pass
+            self.disco = OrderedDict((clave, tam) for _, clave, tam in sorted(archivos))
+            self.bytes_disco = sum(self.disco.values())
+        return self.disco
+
+    def _a_memoria(self, clave: str, audio: bytes) -> None:
+        if len(audio) > self.max_bytes_memoria:
+            return
+        if clave in self.memoria:
+            self.memoria.move_to_end(clave)
+            return
+        self.memoria[clave] = audio
+        self.bytes_memoria += len(audio)
+        while self.bytes_memoria > self.max_bytes_memoria:
+            _, viejo = self.memoria.popitem(last=False)
+            self.bytes_memoria -= len(viejo)
+
+    def _a_disco(self, clave: str, audio: bytes) -> None:
+        disco = self._indice()
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            tmp = self._ruta(clave) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, self._ruta(clave))
+        except OSError as e:
+            print(f"[CACHE TTS] No se pudo guardar en {self.directorio}: {e}")
+            return
+        self.bytes_disco += len(audio) - disco.pop(clave, 0)
+        disco[clave] = len(audio)
+        while self.bytes_disco > self.max_bytes_disco and len(disco) > 1:
+            viejo, tam = disco.popitem(last=False)
+            self.bytes_disco -= tam
+            try:
+                os.remove(self._ruta(viejo))
+            except OSError:
+                pass
+
+    def buscar(self, texto: str, lang: str, tld: str, motor: str):
+        """
+        Audio guardado (memoria o disco) o None.
+        """
+        clave = llave(texto, lang, tld, motor)
+        with self._lock:
+            audio = self.memoria.get(clave)
+            if audio is not None:
+                self.memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return audio
+            disco = self._indice()
+            if clave in disco:
+                try:
+                    with open(self._ruta(clave), "rb") as f:
+                        audio = f.read()
+                    os.utime(self._ruta(clave))
+                except OSError:
+                    self.bytes_disco -= disco.pop(clave)
+                else:
+                    disco.move_to_end(clave)
+                    self._a_memoria(clave, audio)
+                    self.aciertos_disco += 1
+                    return audio
+            self.fallos += 1
+            return None
+
+    def guardar(self, texto: str, lang: str, tld: str, motor: str, audio: bytes) -> None:
+        clave = llave(texto, lang, tld, motor)
+        with self._lock:
+            self._a_memoria(clave, audio)
+            self._a_disco(clave, audio)
+
+    def obtener(self, texto: str, lang: str, tld: str, motor: str, sintetizar) -> bytes:
+        """
+        Audio de la frase: del cache o de sintetizar() (y se guarda).
+        """
+        if not self.activo:
+            return sintetizar()
+        audio = self.buscar(texto, lang, tld, motor)
+        if audio is None:
+            audio = sintetizar()
+            self.guardar(texto, lang, tld, motor, audio)
+        return audio
+
+    def precalentar(self, frases, lang: str, tld: str, motor: str, sintetizar) -> int:
+        """
+        Sintetiza las frases que falten (sintetizar(texto) -> bytes).
+        Devuelve cuántas se generaron.
+        """
+        nuevas = 0
+        for texto in frases:
+            with self._lock:
+                esta = llave(texto, lang, tld, motor) in self._indice()
+            if esta:
+                continue
+            try:
+                self.guardar(texto, lang, tld, motor, sintetizar(texto))
+                nuevas += 1
+            except Exception as e:
+                print(f"[CACHE TTS] No se pudo generar {texto!r}: {e}")
+        return nuevas
+
+    def reporte(self) -> str:
+        return (
+            f"[CACHE TTS] {self.aciertos_memoria} aciertos en memoria, {self.aciertos_disco} en disco, "
+            f"{self.fallos} fallos | disco {self.bytes_disco / 1024:.0f} KB"
+        )
@@ -0,0 +1,166 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ==========================================
+# CACHE DE DESCRIPCIONES POR ESCENA
+# Si el usuario pregunta "qué ves" varias veces desde el mismo lugar, la
+# respuesta sale de memoria en vez de ir otra vez a Gemini. La llave es
+# un hash perceptual (dHash de 64 bits) del frame más el prompt: dos
+# frames de la misma escena difieren en pocos bits aunque cambie el
+# ruido de la cámara o la compresión, así que se busca la entrada con
+# menor distancia de Hamming <= MAX_HAMMING.
+#   MR_CACHE_VISION=0          desactiva el cache
+#   MR_CACHE_VISION_TTL_S      segundos que vale una descripción (la
+#                              escena puede cambiar: alguien que pasa)
+#   MR_CACHE_VISION_MAX        entradas en memoria (se saca la menos usada)
+#   MR_CACHE_VISION_HAMMING    bits distintos que aún cuentan como la misma escena
+#   MR_CACHE_VISION_ARCHIVO    JSON donde persistir el cache (vacío = solo memoria)
+# ==========================================
+
+ACTIVO = os.environ.get("MR_CACHE_VISION", "1") == "1"
+TTL_S = float(os.environ.get("MR_CACHE_VISION_TTL_S", "60"))
+MAX_ENTRADAS = int(os.environ.get("MR_CACHE_VISION_MAX", "64"))
+MAX_HAMMING = int(os.environ.get("MR_CACHE_VISION_HAMMING", "6"))
+ARCHIVO = os.environ.get("MR_CACHE_VISION_ARCHIVO", "")
+
+
+def hash_frame(frame) -> int:
+    """
+    dHash de 64 bits: gris reducido a 9x8 por promedio de bloques; cada
+    bit dice si un pixel es más claro que su vecino de la derecha.
+    """
+    frame = np.asarray(frame)
+    # Con ~64 px por lado basta para 9x8 bloques: submuestrear antes de promediar
+    paso = max(1, min(frame.shape[:2]) // 64)
+    gris = frame[::paso, ::paso].astype(np.float32)
+    if gris.ndim == 3:
+        gris = gris.mean(axis=2)
+    alto, ancho = gris.shape
+    filas = np.linspace(0, alto, 9).astype(int)[:-1]
+    cols = np.linspace(0, ancho, 10).astype(int)[:-1]
+    bloques = np.add.reduceat(np.add.reduceat(gris, filas, axis=0), cols, axis=1)
+    bloques /= np.outer(np.diff(np.append(filas, alto)), np.diff(np.append(cols, ancho)))
+    bits = (bloques[:, 1:] > bloques[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _llave_prompt(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class CacheDescripciones:
+    def __init__(self, ttl_s=TTL_S, max_entradas=MAX_ENTRADAS, max_hamming=MAX_HAMMING,
+                 archivo=ARCHIVO, reloj=time.time):
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self.max_hamming = max_hamming
+        self.archivo = archivo
+        self.reloj = reloj   # de pared: las entradas del archivo sobreviven reinicios
+        self.entradas = OrderedDict()   # (hash, prompt) -> (texto, t); la última es la más usada
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        if archivo:
+            self._cargar()
+
+    def buscar(self, hash_escena: int, prompt: str):
+        """
+        Descripción guardada de una escena parecida con el mismo prompt, o None.
+        """
+        prompt = _llave_prompt(prompt)
+        ahora = self.reloj()
+        with self._lock:
+            mejor, mejor_d = None, self.max_hamming + 1
+            for llave, (texto, t) in list(self.entradas.items()):
+                if ahora - t > self.ttl_s:
+                    del self.entradas[llave]
+                    continue
+                if llave[1] != prompt:
+                    continue
+                d = hamming(llave[0], hash_escena)
+                if d < mejor_d:
+                    mejor, mejor_d = llave, d
+            if mejor is None:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            self.entradas.move_to_end(mejor)
+            return self.entradas[mejor][0]
+
+    def guardar(self, hash_escena: int, prompt: str, texto: str) -> None:
+        with self._lock:
+            llave = (hash_escena, _llave_prompt(prompt))
+            self.entradas[llave] = (texto, self.reloj())
+            self.entradas.move_to_end(llave)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+            if self.archivo:
+                self._escribir()
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self.entradas.clear()
+            if self.archivo:
+                self._escribir()
+
+    def _cargar(self) -> None:
+        try:
+            with open(self.archivo, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            ahora = self.reloj()
+            for e in datos:
+                if ahora - e["t"] <= self.ttl_s:
+                    self.entradas[(int(e["hash"], 16), e["prompt"])] = (e["texto"], e["t"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"[CACHE] No se pudo leer {self.archivo}: {e}")
+        while len(self.entradas) > self.max_entradas:
+            self.entradas.popitem(last=False)
+
+    def _escribir(self) -> None:
+        datos = [
+            {"hash": f"{h:016x}", "prompt": p, "texto": texto, "t": t}
+            for (h, p), (texto, t) in self.entradas.items()
+        ]
+        try:
+            tmp = self.archivo + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(tmp, self.archivo)
+        except OSError as e:
+            print(f"[CACHE] No se pudo guardar {self.archivo}: {e}")
+
+    def reporte(self) -> str:
+        total = self.aciertos + self.fallos
+        tasa = self.aciertos / total if total else 0.0
+        return (
+            f"[CACHE] Descripciones: {self.aciertos} aciertos, {self.fallos} fallos "
+            f"({tasa:.0%}), {len(self.entradas)} guardadas"
+        )
@@ -0,0 +1,150 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import collections
+import threading
+import time
+
+import cv2
+
+# ==========================================
+# CÁMARA SIEMPRE ABIERTA
+# Un hilo mantiene abierta la cámara y lee frames sin parar (así el
+# buffer del driver no se llena de frames viejos y la auto-exposición ya
+# está ajustada). Se guardan los últimos FRAMES_BUFFER frames en memoria,
+# sin codificar: describir el entorno toma el último frame y lo prepara
+# para Gemini solo cuando se pide, sin abrir la cámara, esperar el ajuste
+# ni pasar por disco.
+# Si la cámara se desconecta se reintenta abrirla cada REINTENTO_S.
+# ==========================================
+
+CALENTAMIENTO_S = 1.0      # frames que se descartan tras abrir (auto-exposición)
+FRAMES_BUFFER = 3
+REINTENTO_S = 1.0
+FALLOS_PARA_REABRIR = 10
+ESPERA_FRAME_S = 3.0       # cuánto esperar el primer frame útil
+
+
+class CapturaCamara:
+    def __init__(self, indice=0):
+        self.indice = indice
+        self.frames = collections.deque(maxlen=FRAMES_BUFFER)   # (t, frame BGR)
+        self.n_frames = 0
+        self.error = None
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def activa(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self) -> None:
+        if self.activa():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._run, name="CapturaCamara", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+
+    def _abrir(self):
+        cap = cv2.VideoCapture(self.indice)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Que el driver guarde un solo frame: el que se lee es el actual
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _run(self):
+        cap = None
+        t_abierta = 0.0
+        fallos = 0
+        while not self._parar.is_set():
+            if cap is None:
+                cap = self._abrir()
+                if cap is None:
+                    if self.error is None:
+                        print(f"[CAMARA] No se pudo abrir la cámara en el índice {self.indice}; reintentando.")
+                    self.error = f"no se pudo abrir la cámara {self.indice}"
+                    self._parar.wait(REINTENTO_S)
+                    continue
+                self.error = None
+                t_abierta = time.monotonic()
+                fallos = 0
+
+            ok, frame = cap.read()
+            if not ok:
+                fallos += 1
+                if fallos >= FALLOS_PARA_REABRIR:
+                    print("[CAMARA] La cámara dejó de entregar frames; reabriendo.")
+                    self.error = "la cámara dejó de entregar frames"
+                    cap.release()
+                    cap = None
+                    self._parar.wait(REINTENTO_S)
+                continue
+            fallos = 0
+
+            ahora = time.monotonic()
+            if ahora - t_abierta < CALENTAMIENTO_S:
+                continue
+            with self._cond:
+                self.frames.append((ahora, frame))
+                self.n_frames += 1
+                self._cond.notify_all()
+
+        if cap is not None:
+            cap.release()
+
+    def ultimo_frame(self, timeout: float = ESPERA_FRAME_S):
+        """
+        (t, frame BGR) más reciente, o None si no llega ninguno a tiempo.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.frames or not self.activa(), timeout)
+            return self.frames[-1] if self.frames else None
+
+
+_camara = None
+_lock = threading.Lock()
+
+
+def camara(indice: int = 0) -> CapturaCamara:
+    """
+    CapturaCamara compartida; se arranca la primera vez.
+    """
+    global _camara
+    with _lock:
+        if _camara is None or not _camara.activa():
+            _camara = CapturaCamara(indice)
+            _camara.iniciar()
+        return _camara
+
+
+def cerrar() -> None:
+    """
+    Detiene la cámara compartida (la siguiente llamada a camara() la reabre).
+    """
+    global _camara
+    with _lock:
+        if _camara is not None:
+            _camara.detener()
+            _camara = None
@@ -0,0 +1,146 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import threading
+import time
+from array import array
+
+from reloj_mr import RelojControl
+
+# ==========================================
+# MUESTREADOR DEL IMU EN SEGUNDO PLANO
+# Un hilo lee el gyro X continuamente (independiente del lazo de control),
+# guarda (t, °/s) en un buffer circular preasignado e integra el ángulo
+# con la regla del trapecio. El lazo de control solo lee `estado`, una
+# tupla que el hilo reemplaza completa en cada muestra: asignar una
+# referencia es atómico en CPython, así que no hace falta lock.
+# ==========================================
+
+MUESTREO_HZ = 500
+CAPACIDAD_BUFFER = 4096
+
+
+class MuestreadorIMU:
+    def __init__(self, mpu, hz=MUESTREO_HZ, capacidad=CAPACIDAD_BUFFER):
+        """
+        `mpu` debe estar calibrado antes de llamar a iniciar().
+        Mientras el hilo corre, nadie más debe tocar el bus I2C del mpu.
+        """
+        self.mpu = mpu
+        self.hz = hz
+        self.capacidad = capacidad
+
+        # Buffer circular: tiempo (s, monotonic) y velocidad corregida (°/s)
+        self.t = array("d", bytes(8 * capacidad))
+        self.w = array("d", bytes(8 * capacidad))
+        self.n = 0   # total de muestras escritas (índice = n % capacidad)
+
+        # (t, ángulo °, velocidad °/s) de la última muestra
+        self.estado = (time.monotonic(), mpu.angle_x, 0.0)
+
+        self._parar = threading.Event()
+        self._hilo = None
+        self.reporte_reloj = ""
+
+    # ---------- API para el lazo de control ----------
+
+    def angulo(self) -> float:
+        return self.estado[1]
+
+    def velocidad(self) -> float:
+        return self.estado[2]
+
+    def ventana(self, cuantas: int):
+        """
+        Copia de las últimas `cuantas` muestras como lista de (t, °/s).
+        """
+        cuantas = min(cuantas, self.n, self.capacidad)
+        fin = self.n
+        return [
+            (self.t[k % self.capacidad], self.w[k % self.capacidad])
+            for k in range(fin - cuantas, fin)
+        ]
+
+    # ---------- Hilo ----------
+
+    def iniciar(self) -> None:
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._run, name="MuestreadorIMU", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+
+    def _guardar(self, t, w):
+        k = self.n % self.capacidad
+        self.t[k] = t
+        self.w[k] = w
+        self.n += 1
+
+    def _corregir(self, raw):
+        corrected = raw - self.mpu.offset_x
+        if abs(corrected) < self.mpu.DEADZONE:
+            corrected = 0.0
+        return corrected
+
+    def _run(self):
+        mpu = self.mpu
+        reloj = RelojControl(self.hz)
+        reloj.iniciar()
+
+        angulo = mpu.angle_x
+        t_prev = time.monotonic()
+        w_prev = 0.0
+        if mpu.modo == "fifo":
+            mpu.reset_fifo()
+
+        while not self._parar.is_set():
+            ahora = time.monotonic()
+
+            if mpu.modo == "fifo":
+                muestras = mpu.leer_fifo()
+                if muestras is None:
+                    # Overflow: se perdió la historia de la FIFO, una lectura directa
+                    muestras = [mpu.read_gyro_x()]
+                    dt_muestra = ahora - t_prev
+                else:
+                    dt_muestra = 1.0 / mpu.fifo_hz
+                # Las muestras de la FIFO terminan "ahora", espaciadas 1/fifo_hz
+                t0 = ahora - dt_muestra * len(muestras)
+                for k, raw in enumerate(muestras):
+                    t = t0 + dt_muestra * (k + 1)
+                    w = self._corregir(raw)
+                    angulo += 0.5 * (w + w_prev) * dt_muestra
+                    w_prev = w
+                    self._guardar(t, w)
+                if muestras:
+                    t_prev = ahora
+            else:
+                w = self._corregir(mpu.read_gyro_x())
+                angulo += 0.5 * (w + w_prev) * (ahora - t_prev)
+                w_prev = w
+                t_prev = ahora
+                self._guardar(ahora, w)
+
+            mpu.angle_x = angulo
+            self.estado = (t_prev, angulo, w_prev)
+            reloj.esperar()
+
+        self.reporte_reloj = reloj.reporte()
@@ -0,0 +1,253 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import re
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+from rutas_config_mr import RUTAS_JSON, cargar_compilado
+
+# ==========================================
+# INTENCIONES DE VOZ (destinos y comandos)
+# Las frases salen de rutas_mr.json: el nombre de cada ruta ("_" = espacio),
+# sus "alias" y sus "frases", más el objeto "comandos". Todo se compila
+# una vez (cache en __pycache__ como las rutas) a:
+#   - un trie por palabras con todas las frases,
+#   - un índice de borrados (estilo SymSpell) del vocabulario, para hallar
+#     en O(1) las palabras a distancia de edición <= 2 de lo que dijo Whisper.
+# El texto se normaliza (minúsculas, sin acentos ni puntuación) y se
+# recorre UNA vez: cada palabra avanza todos los estados activos del trie
+# a la vez, así que el costo no crece con el número de frases.
+# Tolerancia por palabra según la más corta de las dos (la dicha y la del
+# vocabulario): 0 errores hasta 5 letras, 1 hasta 8, 2 después (Whisper
+# confunde "meditec"/"meditek", "sanitario"/"sanitarios"...). Las palabras
+# cortas van exactas porque un destino mueve el rover y en español sobran
+# palabras comunes a una letra de distancia: corre/torpe/borre -> torre,
+# rama -> rampa, salía -> salir. Los comandos van siempre exactos:
+# "terminar" apaga el programa y "el viaje terminó" no debe hacerlo.
+# ==========================================
+
+VERSION_INTENCIONES = 2
+
+# Prioridad al elegir entre varias coincidencias (menor = gana)
+PRIORIDAD = {"destino": 0, "comando": 1}
+
+# Tipos de frase que aceptan errores de Whisper (los demás, solo exactas)
+TOLERA_ERRORES = {"destino"}
+
+# Resultados de búsqueda de palabras que se recuerdan (las frases se repiten)
+MAX_CACHE_PALABRAS = 2048
+
+Coincidencia = namedtuple("Coincidencia", "tipo valor frase distancia posicion")
+
+
+def normalizar(texto: str) -> list:
+    """
+    Texto -> lista de palabras en minúsculas, sin acentos (ñ -> n) ni signos.
+    """
+    texto = unicodedata.normalize("NFD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", texto)
+
+
+def distancia_max(palabra: str) -> int:
+    if len(palabra) <= 5:
+        return 0
+    if len(palabra) <= 8:
+        return 1
+    return 2
+
+
+def distancia(a: str, b: str, limite: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein (transposiciones adyacentes) acotada:
+    devuelve limite + 1 en cuanto se sabe que la supera.
+    """
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    previa2 = None
+    previa = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        minimo = i
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            d = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, previa2[j - 2] + 1)
+            actual[j] = d
+            if d < minimo:
+                minimo = d
+        if minimo > limite:
+            return limite + 1
+        previa2, previa = previa, actual
+    return previa[-1]
+
+
+def _borrados(palabra: str, n: int) -> set:
+    """
+    Todas las variantes de `palabra` con hasta `n` letras borradas.
+    """
+    salida = {palabra}
+    frontera = {palabra}
+    for _ in range(n):
+        frontera = {p[:i] + p[i + 1:] for p in frontera for i in range(len(p))}
+        salida |= frontera
+    return salida
+
+
+def _frases_config(datos):
+    """
+    (tipo, valor, texto) en el orden del archivo: primero destinos, luego comandos.
+    """
+    for nombre, ruta in datos["rutas"].items():
+        yield "destino", nombre, nombre.replace("_", " ")
+        for frase in list(ruta.get("alias", [])) + list(ruta.get("frases", [])):
+            yield "destino", nombre, frase
+    comandos = datos.get("comandos", {})
+    if not isinstance(comandos, dict):
+        raise ValueError("rutas_mr.json: 'comandos' debe ser un objeto {comando: [frases]}")
+    for nombre, frases in comandos.items():
+        if not isinstance(frases, list):
+            raise ValueError(f"comando '{nombre}': se esperaba una lista de frases")
+        for frase in frases:
+            yield "comando", nombre, frase
+
+
+def compilar_intenciones(datos):
+    """
+    JSON ya parseado -> {"trie", "vocabulario", "indice"} listo para MotorIntenciones.
+    Nodo del trie: {"hijos": {palabra: nodo}, "fin": [(tipo, valor, frase, orden)]}.
+    """
+    if not isinstance(datos, dict) or not isinstance(datos.get("rutas"), dict):
+        raise ValueError("rutas_mr.json debe tener un objeto 'rutas'")
+
+    trie = {"hijos": {}, "fin": []}
+    vocabulario = {}
+    for orden, (tipo, valor, frase) in enumerate(_frases_config(datos)):
+        if not isinstance(frase, str):
+            raise ValueError(f"{tipo} '{valor}': la frase {frase!r} no es texto")
+        palabras = normalizar(frase)
+        if not palabras:
+            raise ValueError(f"{tipo} '{valor}': frase vacía {frase!r}")
+        nodo = trie
+        for palabra in palabras:
+            nodo = nodo["hijos"].setdefault(palabra, {"hijos": {}, "fin": []})
+            vocabulario[palabra] = distancia_max(palabra)
+        if all(v != valor or t != tipo for t, v, _, _ in nodo["fin"]):
+            nodo["fin"].append((tipo, valor, " ".join(palabras), orden))
+
+    indice = {}
+    for palabra, n in vocabulario.items():
+        for variante in _borrados(palabra, n):
+            indice.setdefault(variante, []).append(palabra)
+    return {"trie": trie, "vocabulario": vocabulario, "indice": indice}
+
+
+class MotorIntenciones:
+    def __init__(self, compilado):
+        self.trie = compilado["trie"]
+        self.vocabulario = compilado["vocabulario"]
+        self.indice = compilado["indice"]
+        self.n_max = max(self.vocabulario.values(), default=0)
+        self._cache = OrderedDict()
+
+    def candidatas(self, palabra: str):
+        """
+        Palabras del vocabulario a distancia tolerable de `palabra`: ((palabra, d), ...).
+        """
+        encontradas = self._cache.get(palabra)
+        if encontradas is not None:
+            self._cache.move_to_end(palabra)
+            return encontradas
+
+        if palabra in self.vocabulario and self.vocabulario[palabra] == 0:
+            encontradas = ((palabra, 0),)
+        else:
+            vistas = {}
+            for variante in _borrados(palabra, self.n_max):
+                for objetivo in self.indice.get(variante, ()):
+                    if objetivo in vistas:
+                        continue
+                    limite = min(self.vocabulario[objetivo], distancia_max(palabra))
+                    d = distancia(palabra, objetivo, limite)
+                    vistas[objetivo] = d if d <= limite else None
+            encontradas = tuple((p, d) for p, d in vistas.items() if d is not None)
+
+        self._cache[palabra] = encontradas
+        if len(self._cache) > MAX_CACHE_PALABRAS:
+            self._cache.popitem(last=False)
+        return encontradas
+
+    def detectar(self, texto: str) -> list:
+        """
+        Todas las coincidencias en `texto`, la mejor primero: destino antes
+        que comando, luego menos errores, luego el orden de rutas_mr.json.
+        """
+        activos = []   # (nodo, errores acumulados, palabra donde empezó)
+        hallados = {}
+        for pos, palabra in enumerate(normalizar(texto)):
+            cands = self.candidatas(palabra)
+            if not cands:
+                activos = []
+                continue
+            nuevos = []
+            for nodo, errores, inicio in activos + [(self.trie, 0, pos)]:
+                for objetivo, d in cands:
+                    hijo = nodo["hijos"].get(objetivo)
+                    if hijo is None:
+                        continue
+                    nuevos.append((hijo, errores + d, inicio))
+                    for tipo, valor, frase, orden in hijo["fin"]:
+                        if errores + d and tipo not in TOLERA_ERRORES:
+                            continue
+                        clave = (tipo, valor)
+                        rango = (PRIORIDAD[tipo], errores + d, orden)
+                        if clave not in hallados or rango < hallados[clave][0]:
+                            hallados[clave] = (rango, Coincidencia(tipo, valor, frase, errores + d, inicio))
+            activos = nuevos
+        return [c for _, c in sorted(hallados.values())]
+
+    def _primero(self, texto: str, tipo: str):
+        for c in self.detectar(texto):
+            if c.tipo == tipo:
+                return c.valor
+        return None
+
+    def destino(self, texto: str):
+        """
+        Nombre de la ruta (como en rutas_mr.json) o None.
+        """
+        return self._primero(texto, "destino")
+
+    def comando(self, texto: str):
+        return self._primero(texto, "comando")
+
+
+def cargar_intenciones(path=RUTAS_JSON, usar_cache=True) -> MotorIntenciones:
+    return MotorIntenciones(
+        cargar_compilado(path, compilar_intenciones, "intenciones_mr",
+                         version=VERSION_INTENCIONES, usar_cache=usar_cache)
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    motor = cargar_intenciones()
+    for texto in sys.argv[1:] or ["llévame al servicio medico", "quiero ir a los sanitarios"]:
+        print(f"{texto!r}: {motor.detectar(texto)}")
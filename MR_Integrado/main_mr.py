@@ -15,80 +15,266 @@
    See the License for the specific language governing permissions and
    limitations under the License.'''
 
+import importlib
+import os
 import subprocess
-from mic_mr import escuchar_y_transcribir
+import sys
+import threading
+import time
+from mic_mr import escuchar_y_detectar, precalentar
+
+# ==========================================
+# MODO DE EJECUCIÓN DE COMANDOS
+#   "proceso":    rutas_mpu_mr y vision_voz_mr se importan UNA vez y se
+#                 reutilizan (sin arranque en frío por comando).
+#   "subproceso": comportamiento original, un Python nuevo por comando.
+# Se puede cambiar con la variable de entorno MR_MODO.
+# ==========================================
+MODO_EJECUCION = os.environ.get("MR_MODO", "proceso")
+
+# Navegación:
+#   "rutas": cada destino es una ruta de ida y vuelta desde el inicio.
+#   "mapa":  se planea sobre el grafo de mapa_mr.json desde donde esté el
+#            rover (solo en modo "proceso", que recuerda la posición).
+NAVEGACION = os.environ.get("MR_NAVEGACION", "rutas")
+USA_MAPA = NAVEGACION == "mapa" and MODO_EJECUCION == "proceso"
+
+# En modo "proceso" la descripción del entorno se habla en segundo plano:
+# el menú vuelve de inmediato y el siguiente comando (ENTER o tecla) corta
+# lo que se esté diciendo (barge-in). MR_DESCRIBIR_FONDO=0 espera a que
+# termine de hablar, como antes.
+DESCRIBIR_EN_FONDO = os.environ.get("MR_DESCRIBIR_FONDO", "1") == "1" and MODO_EJECUCION == "proceso"
+
+PYTHON_SISTEMA = "/usr/bin/python3"
+RUTAS_SCRIPT = "/home/jesusgj/MR_Integrado/rutas_mpu_mr.py"
+
+# Módulos ya importados y cuánto tardó cada importación (s)
+_modulos = {}
+_tiempos_import = {}
+
+# Historial de comandos: (comando, modo, segundos)
+_tiempos_comando = []
+
+# Puertos y sensor de rutas que se mantienen abiertos entre comandos
+_sesion_rutas = {}
+
+# Navegación por mapa: mapa cargado y (nodo, rumbo) actual del rover
+_mapa = {}
+
+# Motor de intenciones de voz (intenciones_mr), se compila al primer uso
+_intenciones = None
+
+
+def _cargar_modulo(nombre: str):
+    """
+    Importa un módulo una sola vez y guarda el tiempo que costó.
+    """
+    mod = _modulos.get(nombre)
+    if mod is None:
+        t0 = time.perf_counter()
+        mod = importlib.import_module(nombre)
+        _tiempos_import[nombre] = time.perf_counter() - t0
+        _modulos[nombre] = mod
+    return mod
+
+
+def precargar_modulos() -> None:
+    """
+    Importa rutas y visión/voz al arrancar para que el primer comando
+    no pague el arranque en frío (cv2, pygame, genai, smbus2, pyserial).
+    """
+    if MODO_EJECUCION != "proceso":
+        return
+    print("[CORE] Precargando módulos (modo en proceso)...")
+    for nombre in ("rutas_mpu_mr", "vision_voz_mr"):
+        try:
+            _cargar_modulo(nombre)
+        except Exception as e:
+            print(f"[CORE] No se pudo precargar {nombre}: {e}")
+    for nombre, seg in _tiempos_import.items():
+        print(f"[CORE]   import {nombre}: {seg * 1000:.0f} ms")
+    # La cámara queda abierta y con la exposición ajustada
+    if "vision_voz_mr" in _modulos:
+        _modulos["vision_voz_mr"].start_camera()
+        # Audio de las frases fijas en segundo plano (necesita red la primera vez)
+        threading.Thread(target=_modulos["vision_voz_mr"].warm_tts_cache,
+                         name="PrecalentarTTS", daemon=True).start()
+
+
+def medir_arranque_subproceso(modulo: str) -> float:
+    """
+    Mide cuánto tarda un Python nuevo solo en importar `modulo`
+    (lo que pagaba cada comando en el modo subproceso).
+    """
+    t0 = time.perf_counter()
+    subprocess.run([PYTHON_SISTEMA, "-c", f"import {modulo}"], check=False)
+    return time.perf_counter() - t0
+
+
+def reporte_tiempos(medir_subproceso: bool = False) -> None:
+    """
+    Imprime el costo de arranque y de cada comando ejecutado.
+    """
+    print("\n=== REPORTE DE TIEMPOS ===")
+    print(f"Modo: {MODO_EJECUCION}")
+    for nombre, seg in _tiempos_import.items():
+        linea = f"  import {nombre} (una vez): {seg * 1000:.0f} ms"
+        if medir_subproceso:
+            sub = medir_arranque_subproceso(nombre)
+            linea += f" | subproceso por comando: {sub * 1000:.0f} ms"
+        print(linea)
+    for comando, modo, seg in _tiempos_comando:
+        print(f"  {comando:<20} [{modo}] {seg:.2f} s")
+    if "vision_voz_mr" in _modulos:
+        print("  " + _modulos["vision_voz_mr"].description_cache.reporte())
+        print("  " + _modulos["vision_voz_mr"].tts_cache.reporte())
+    print("==========================")
+
+
+def _sesion_rutas_abierta(rutas):
+    """
+    Abre (una vez) el MPU y los puertos serial y los reutiliza en
+    cada ruta. Reabrir el serial reinicia el ESP32 por DTR.
+    """
+    if not _sesion_rutas:
+        mpu = rutas.MPU_Gyro_X_Only(bus_num=7, modo=rutas.MODO_IMU, fifo_hz=rutas.IMU_FIFO_HZ)
+        esp_left, esp_right = rutas.abrir_puertos()
+        _sesion_rutas.update(mpu=mpu, esp_left=esp_left, esp_right=esp_right)
+    return _sesion_rutas
+
+
+def cerrar_sesion_rutas() -> None:
+    for clave in ("esp_left", "esp_right"):
+        puerto = _sesion_rutas.get(clave)
+        try:
+            puerto.close()
+        except Exception:
+            pass
+    _sesion_rutas.clear()
+
+
+def ir_por_mapa(rutas, destino: str, sesion) -> None:
+    """
+    Planea desde la posición actual hasta `destino` y actualiza la posición.
+    """
+    if not _mapa:
+        mapa = _cargar_modulo("mapa_mr").cargar_mapa()
+        _mapa.update(mapa=mapa, posicion=mapa.inicio)
+    nodo, rumbo = _mapa["posicion"]
+    print(f"[CORE] Posición actual: {nodo} (rumbo {rumbo:.0f}°)")
+    _mapa["posicion"] = rutas.ejecutar_mapa_mpu(_mapa["mapa"], nodo, [destino], rumbo, **sesion)
 
 
 def ejecutar_ruta_destino(destino: str) -> None:
     """
-    Lanza la ruta autónoma usando rutas_mpu_mr.py con el Python del sistema.
+    Ejecuta la ruta autónoma. En modo "proceso" llama directamente a
+    rutas_mpu_mr.ejecutar_ruta_mpu; en modo "subproceso" lanza
+    rutas_mpu_mr.py con el Python del sistema.
     """
     print(f"[CORE] Comando: IR A {destino.upper()}")
-    print("[CORE] Llamando rutas_mpu_mr.ejecutar_ruta_mpu desde /usr/bin/python3...")
-    subprocess.run(
-        ["/usr/bin/python3", "/home/jesusgj/MR_Integrado/rutas_mpu_mr.py", destino],
-        check=False,
-    )
+    t0 = time.perf_counter()
+
+    if MODO_EJECUCION == "proceso":
+        try:
+            rutas = _cargar_modulo("rutas_mpu_mr")
+            sesion = _sesion_rutas_abierta(rutas)
+        except (Exception, SystemExit) as e:
+            # MPU_Gyro_X_Only hace sys.exit si no responde el I2C
+            print(f"[CORE] No se pudo abrir IMU/puertos: {e}")
+            cerrar_sesion_rutas()
+            return
+        try:
+            if USA_MAPA:
+                ir_por_mapa(rutas, destino, sesion)
+            else:
+                rutas.ejecutar_ruta_mpu(destino, **sesion)
+        except (Exception, SystemExit) as e:
+            # Como en el modo subproceso: se informa y el robot sigue escuchando.
+            # Los puertos quedan en estado desconocido: se reabren en el siguiente comando.
+            print(f"[CORE] Error al ejecutar la ruta {destino}: {e}")
+            cerrar_sesion_rutas()
+    else:
+        print(f"[CORE] Llamando rutas_mpu_mr.ejecutar_ruta_mpu desde {PYTHON_SISTEMA}...")
+        subprocess.run([PYTHON_SISTEMA, RUTAS_SCRIPT, destino], check=False)
+
+    _tiempos_comando.append((f"ruta {destino}", MODO_EJECUCION, time.perf_counter() - t0))
 
 
 def describir_entorno_una_vez() -> None:
     """
-    Lanza la función describir_entorno_una_vez() de vision_voz_mr.py
+    Ejecuta describir_entorno_una_vez() de vision_voz_mr.py, en el mismo
+    proceso o en un Python nuevo según MODO_EJECUCION.
     """
     print("[CORE] Comando: DESCRIBIR ENTORNO")
-    subprocess.run(
-        [
-            "/usr/bin/python3",
-            "-c",
-            "from vision_voz_mr import describir_entorno_una_vez; describir_entorno_una_vez()",
-        ],
-        check=False,
-    )
+    t0 = time.perf_counter()
+
+    if MODO_EJECUCION == "proceso":
+        try:
+            vision = _cargar_modulo("vision_voz_mr")
+        except Exception as e:
+            print(f"[CORE] No se pudo cargar vision_voz_mr: {e}")
+            return
+
+        def describir():
+            try:
+                vision.describir_entorno_una_vez()
+            except Exception as e:
+                print(f"[CORE] Error al describir el entorno: {e}")
+
+        if DESCRIBIR_EN_FONDO:
+            def describir_en_fondo():
+                describir()
+                _tiempos_comando.append(("describir", "fondo", time.perf_counter() - t0))
+
+            threading.Thread(target=describir_en_fondo, name="Describir", daemon=True).start()
+            return
+        describir()
+    else:
+        subprocess.run(
+            [
+                PYTHON_SISTEMA,
+                "-c",
+                "from vision_voz_mr import describir_entorno_una_vez; describir_entorno_una_vez()",
+            ],
+            check=False,
+        )
+
+    _tiempos_comando.append(("describir", MODO_EJECUCION, time.perf_counter() - t0))
+
+
+def callar() -> None:
+    """
+    Barge-in: deja de hablar antes de atender un comando nuevo (y de
+    grabar, para que el micrófono no oiga al altavoz).
+    """
+    if "vision_voz_mr" in _modulos:
+        _modulos["vision_voz_mr"].stop_speaking()
+
+
+def _motor_intenciones():
+    """
+    Motor de intenciones compilado desde rutas_mr.json (se carga una vez).
+    """
+    global _intenciones
+    if _intenciones is None:
+        _intenciones = _cargar_modulo("intenciones_mr").cargar_intenciones()
+    return _intenciones
 
 
 def detectar_destino(texto: str) -> str | None:
     """
-    Mapea texto de Whisper a un destino lógico.
-    Implementados:
-      - 'sanitarios' / 'baños'
-      - 'torre'
-      - 'servicio médico' / 'meditec'
-      - 'rampa'
-    """
-    t = texto.lower()
-
-    # Sanitarios / baños
-    if "sanitario" in t or "sanitarios" in t or "baño" in t or "baños" in t:
-        return "sanitarios"
-
-    # Torre
-    if "torre" in t:
-        return "torre"
-
-    # Servicio médico / Meditec / salud
-    if (
-        "meditec" in t
-        or "meditek" in t
-        or "servicio medico" in t
-        or "servicio médico" in t
-        or "servicios medicos" in t
-        or "servicios médicos" in t
-        or "servicios de salud" in t
-        or "asistencia medica" in t
-        or "asistencia médica" in t
-        or "doctor" in t
-        or "doctora" in t
-        or "medico" in t
-        or "médico" in t
-    ):
-        return "servicio_medico"
-
-    # Rampa
-    if "rampa" in t:
-        return "rampa"
-
-    # Futuro: laboratorios, elevadores...
-    return None
+    Mapea texto de Whisper a un destino lógico (nombre de ruta en
+    rutas_mr.json: 'sanitarios', 'torre', 'servicio_medico', 'rampa'...).
+    Tolera acentos y errores de transcripción; ver intenciones_mr.py.
+    """
+    return _motor_intenciones().destino(texto)
+
+
+def detectar_comando(texto: str) -> str | None:
+    """
+    'describir', 'terminar' (objeto "comandos" de rutas_mr.json) o None.
+    """
+    return _motor_intenciones().comando(texto)
 
 
 def loop_principal() -> None:
@@ -103,13 +289,24 @@ def loop_principal() -> None:
     print("También puedes usar el menú por teclado.")
     print("=============================================\n")
 
+    precargar_modulos()
+    # Whisper se carga en segundo plano mientras el usuario lee el menú
+    precalentar()
+    # Frases de destinos y comandos compiladas antes del primer comando
+    try:
+        _motor_intenciones()
+    except Exception as e:
+        print(f"[CORE] No se pudieron compilar las intenciones de rutas_mr.json: {e}")
+
     while True:
         print("\n[MIC] Habla cuando estés listo.")
 
         opcion = input(
-            "[MIC] Pulsa ENTER para grabar 6s...\n"
-            "      O pulsa 1-Sanitarios 2-Torre 3-MediTec 4-Rampa 5-Describir el entorno: "
+            "[MIC] Pulsa ENTER y di tu comando (se graba hasta que dejes de hablar)...\n"
+            "      O pulsa 1-Sanitarios 2-Torre 3-MediTec 4-Rampa 5-Describir el entorno"
+            + (" 6-Regresar al inicio: " if USA_MAPA else ": ")
         ).strip()
+        callar()
 
         # =====================
         # MODO MENÚ POR TECLAS
@@ -130,6 +327,9 @@ def loop_principal() -> None:
             elif opcion == "5":
                 describir_entorno_una_vez()
                 continue
+            elif opcion == "6" and USA_MAPA:
+                ejecutar_ruta_destino("inicio")
+                continue
             else:
                 print("[CORE] Opción de menú no válida. Usa 1, 2, 3, 4 o 5, o ENTER para voz.")
                 continue
@@ -137,7 +337,13 @@ def loop_principal() -> None:
         # =====================
         # MODO VOZ (WHISPER)
         # =====================
-        texto = escuchar_y_transcribir()
+        # El destino puede llegar de una hipótesis parcial, antes de
+        # que termine la frase
+        try:
+            texto, destino = escuchar_y_detectar(detectar_destino)
+        except Exception as e:
+            print(f"[MIC] Error al escuchar o interpretar el comando: {e}")
+            continue
         if not texto:
             print("[MIC] No se reconoció nada (texto vacío).")
             continue
@@ -146,24 +352,23 @@ def loop_principal() -> None:
         print(f"[DEBUG] Texto reconocido: {t!r}")
 
         # 1) Intentar detectar destino
-        destino = detectar_destino(t)
         if destino is not None:
             ejecutar_ruta_destino(destino)
             continue
 
+        try:
+            comando = detectar_comando(t)
+        except Exception as e:
+            print(f"[CORE] Error al interpretar el comando: {e}")
+            continue
+
         # 2) Visión + descripción del entorno
-        if (
-            "describe" in t
-            or "que ves" in t
-            or "qué ves" in t
-            or "entorno" in t
-            or "alrededor" in t
-        ):
+        if comando == "describir":
             describir_entorno_una_vez()
             continue
 
         # 3) Terminar
-        if "termina" in t or "apagate" in t or "apágate" in t or "salir" in t:
+        if comando == "terminar":
             print("[CORE] Comando: TERMINAR")
             break
 
@@ -175,6 +380,9 @@ def loop_principal() -> None:
         print("     'Llévame a la rampa',")
         print("     o 'describe el entorno'.")
 
+    callar()
+    cerrar_sesion_rutas()
+    reporte_tiempos(medir_subproceso="--reporte-arranque" in sys.argv)
     print("\n[CORE] Loop principal terminado.")
 
 
@@ -23,17 +23,25 @@
 # LEFT  <- joystick izquierdo vertical (eje 1 = LY)
 # RIGHT <- joystick derecho  vertical (eje 5 = A5)
 
+import os
+import select
 import struct
 import sys
 import serial
 import time
 
+from motores_mr import SalidaMotores
+from telemetria_mr import LectorTelemetria
+
 # ================== CONFIG: PUERTOS SERIAL ==================
 LEFT_PORT  = "/dev/ttyUSB0"   # Cambia si tu LEFT es otro (ej. /dev/ttyACM0)
 RIGHT_PORT = "/dev/ttyUSB1"   # Cambia si tu RIGHT es otro
 
 BAUDRATE = 115200
 
+# "ascii" o "binario" (ver protocolo_mr.py)
+PROTOCOLO = os.environ.get("MR_PROTOCOLO", "ascii")
+
 # ================== CONFIG: INTERFAZ JOYSTICK ===============
 JS_DEV_PATH = "/dev/input/js0"   # joystick que ya probaste
 
@@ -51,6 +59,20 @@ AXIS_RIGHT_Y_INDEX = 5   # A5  (stick derecho vertical)
 
 MAX_PWM = 1000   # rango deseado -1000..1000
 
+# ================== CONFIG: SALIDA A MOTORES ================
+# Los eventos del mando se juntan y se manda el último estado a
+# frecuencia fija (no un write por cada evento de eje).
+FRECUENCIA_SALIDA_HZ = float(os.environ.get("MR_MANDO_HZ", "50"))
+
+# Hombre muerto: los motores solo se mueven mientras el botón
+# MR_MANDO_DEADMAN está presionado (4 = L1 en la interfaz js, por
+# defecto); al soltarlo se manda PWM 0. Es un botón y no un tiempo sin
+# eventos porque el driver js solo manda eventos cuando un eje cambia: un
+# stick quieto no genera nada. -1 lo desactiva (solo para pruebas con el
+# rover levantado). Si se pierde el mando, los motores se detienen
+# siempre (ver abajo).
+DEADMAN_BOTON = int(os.environ.get("MR_MANDO_DEADMAN", "4"))
+
 left_pwm  = 0
 right_pwm = 0
 
@@ -80,9 +102,35 @@ def scale_axis_to_pwm(v):
     # SIN zona muerta por software
     return pwm
 
+def leer_eventos_pendientes(fd, pendiente: bytearray):
+    """
+    Lee TODO lo que haya en el joystick sin bloquear y devuelve la lista de
+    eventos (value, type, number) completos. Los bytes de un evento
+    incompleto se quedan en `pendiente` para la siguiente lectura.
+    Lanza OSError si el mando se desconectó.
+    """
+    while True:
+        try:
+            datos = os.read(fd, JS_EVENT_SIZE * 64)
+        except BlockingIOError:
+            break
+        if not datos:
+            raise OSError("joystick cerrado")
+        pendiente += datos
+        if len(datos) < JS_EVENT_SIZE * 64:
+            break
+
+    completos = len(pendiente) - len(pendiente) % JS_EVENT_SIZE
+    eventos = [
+        (value, etype, number)
+        for _t, value, etype, number in struct.iter_unpack(JS_EVENT_FORMAT, pendiente[:completos])
+    ]
+    del pendiente[:completos]
+    return eventos
+
 # ================== ABRIR JOYSTICK ==========================
 try:
-    js = open(JS_DEV_PATH, "rb")
+    js_fd = os.open(JS_DEV_PATH, os.O_RDONLY | os.O_NONBLOCK)
 except FileNotFoundError:
     print(f"No se encontró {JS_DEV_PATH}. ¿Está el mando conectado por BT y reconocido?")
     sys.exit(1)
@@ -90,6 +138,9 @@ except FileNotFoundError:
 print(f"Usando joystick en {JS_DEV_PATH}")
 print("LEFT  <- eje 1 (LY)")
 print("RIGHT <- eje 5 (A5)")
+print(f"Salida a motores: {FRECUENCIA_SALIDA_HZ:.0f} Hz | deadman: "
+      + (f"botón {DEADMAN_BOTON} (mantenlo presionado para mover)" if DEADMAN_BOTON >= 0
+         else "DESACTIVADO (MR_MANDO_DEADMAN=-1)"))
 
 # ================== ABRIR PUERTOS SERIAL =====================
 try:
@@ -98,57 +149,94 @@ try:
 except Exception as e:
     print("Error abriendo puertos serial:")
     print(e)
-    js.close()
+    os.close(js_fd)
     sys.exit(1)
 
 print(f"Conectado a LEFT  en {LEFT_PORT}")
 print(f"Conectado a RIGHT en {RIGHT_PORT}")
 print("Ctrl+C para salir.\n")
 
-last_print = time.time()
+salida = SalidaMotores(ser_left, ser_right, protocolo=PROTOCOLO)
+if PROTOCOLO == "binario":
+    print(f"Protocolo binario: LEFT={salida.bin_left} RIGHT={salida.bin_right}")
 
-try:
-    while True:
-        evbuf = js.read(JS_EVENT_SIZE)
-        if not evbuf:
-            break
+tele_left = LectorTelemetria(ser_left, "LEFT", binario=salida.bin_left)
+tele_right = LectorTelemetria(ser_right, "RIGHT", binario=salida.bin_right)
+tele_left.iniciar()
+tele_right.iniciar()
 
-        time_ms, value, etype, number = struct.unpack(JS_EVENT_FORMAT, evbuf)
+periodo = 1.0 / FRECUENCIA_SALIDA_HZ
+siguiente_envio = time.monotonic()
+pendiente = bytearray()
+eventos_totales = 0
+boton_presionado = False
+deadman_activo = False
+last_print = time.monotonic()
 
-        # Solo nos interesan eventos de eje
-        if not (etype & JS_EVENT_AXIS):
+try:
+    while True:
+        # 1) Esperar eventos del mando como mucho hasta el siguiente envío
+        espera = max(0.0, siguiente_envio - time.monotonic())
+        listos, _, _ = select.select([js_fd], [], [], espera)
+
+        # 2) Drenar todos los eventos pendientes y quedarnos con el último valor de cada eje
+        if listos:
+            eventos = leer_eventos_pendientes(js_fd, pendiente)
+            for value, etype, number in eventos:
+                if etype & JS_EVENT_BUTTON:
+                    if number == DEADMAN_BOTON:
+                        boton_presionado = value != 0
+                    continue
+                # Del resto solo nos interesan eventos de eje
+                if not (etype & JS_EVENT_AXIS):
+                    continue
+                if number == AXIS_LEFT_Y_INDEX:
+                    left_pwm = scale_axis_to_pwm(value)
+                elif number == AXIS_RIGHT_Y_INDEX:
+                    right_pwm = scale_axis_to_pwm(value)
+            eventos_totales += len(eventos)
+
+        now = time.monotonic()
+        if now < siguiente_envio:
             continue
 
-        updated = False
-
-        if number == AXIS_LEFT_Y_INDEX:
-            left_pwm = scale_axis_to_pwm(value)
-            updated = True
+        # 3) Enviar a frecuencia fija (SalidaMotores suprime lo repetido)
+        siguiente_envio += periodo
+        if siguiente_envio < now:
+            siguiente_envio = now + periodo
 
-        elif number == AXIS_RIGHT_Y_INDEX:
-            right_pwm = scale_axis_to_pwm(value)
-            updated = True
+        deadman_activo = DEADMAN_BOTON >= 0 and not boton_presionado
+        if deadman_activo:
+            salida.enviar(0, 0)
+        else:
+            salida.enviar(left_pwm, right_pwm)
 
-        if updated:
-            try:
-                ser_left.write((str(left_pwm) + "\n").encode())
-                ser_right.write((str(right_pwm) + "\n").encode())
-            except Exception as e:
-                print("\nError escribiendo por serial:", e)
+        if now - last_print > 0.1:
+            last_print = now
+            vel_l = sum(tele_left.velocidades()) / 2
+            vel_r = sum(tele_right.velocidades()) / 2
+            estado = "  [DEADMAN]" if deadman_activo else ""
+            print(f"L_PWM={left_pwm:5d} vel={vel_l:6.2f}   R_PWM={right_pwm:5d} vel={vel_r:6.2f}{estado}", end="\r")
 
-            now = time.time()
-            if now - last_print > 0.1:
-                last_print = now
-                print(f"L_PWM={left_pwm:5d}   R_PWM={right_pwm:5d}", end="\r")
+except OSError as e:
+    print(f"\nSe perdió el joystick ({e}). Deteniendo motores...")
 
 except KeyboardInterrupt:
     print("\nSaliendo por Ctrl+C...")
 
 finally:
+    salida.detener()
+    salida.cerrar()
+    tele_left.detener()
+    tele_right.detener()
+    print(f"\nEventos del mando: {eventos_totales}")
+    print(salida.estadisticas())
+    print(tele_left.estadisticas())
+    print(tele_right.estadisticas())
     try:
         ser_left.close()
         ser_right.close()
     except:
         pass
-    js.close()
+    os.close(js_fd)
     print("\nPuertos serial cerrados.")
@@ -0,0 +1,252 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import heapq
+import itertools
+import math
+import os
+
+from rutas_config_mr import DIR_MR, PARAMETROS_DEFECTO, cargar_compilado, paso_giro, paso_recto
+
+# ==========================================
+# MAPA DEL EDIFICIO COMO GRAFO DE WAYPOINTS (mapa_mr.json)
+# Nodos con coordenadas (x, y) en metros: x hacia donde mira el rover en
+# "inicio" (rumbo 0°), y hacia su izquierda; rumbo positivo = izquierda,
+# igual que los giros de las rutas. Las aristas son tramos de pasillo.
+#
+# Costo de un camino = metros + PENALIZACION_GIRO_M por cada 90° de giro
+# en los nodos intermedios. Dijkstra sobre estados (nodo, nodo_previo)
+# para poder cobrar los giros; se precalculan TODOS los pares al compilar
+# (cache en __pycache__ como rutas_mr.json), así que planear en tiempo de
+# ejecución es una búsqueda en un diccionario.
+# ==========================================
+
+MAPA_JSON = os.path.join(DIR_MR, "mapa_mr.json")
+VERSION_MAPA = 1
+
+PENALIZACION_GIRO_M = 1.0   # metros "equivalentes" por cada 90° de giro
+UMBRAL_GIRO = 1.0           # giros menores (°) no generan paso
+MAX_PARADAS_EXACTO = 8      # más paradas que esto: vecino más cercano
+
+
+def normalizar_angulo(grados: float) -> float:
+    """
+    Lleva un ángulo a (-180, 180].
+    """
+    grados = math.fmod(grados, 360.0)
+    if grados <= -180.0:
+        grados += 360.0
+    elif grados > 180.0:
+        grados -= 360.0
+    return grados
+
+
+def _rumbo(nodos, a, b):
+    (xa, ya), (xb, yb) = nodos[a], nodos[b]
+    return math.degrees(math.atan2(yb - ya, xb - xa))
+
+
+def _largo(nodos, a, b):
+    (xa, ya), (xb, yb) = nodos[a], nodos[b]
+    return math.hypot(xb - xa, yb - ya)
+
+
+def _dijkstra(nodos, vecinos, origen, penal):
+    """
+    Caminos de menor costo desde `origen` a todos los nodos.
+    Devuelve {destino: (costo, tupla de nodos)}.
+    """
+    contador = itertools.count()  # desempate estable en el heap
+    inicio = (origen, None)
+    mejor = {inicio: 0.0}
+    previo = {inicio: None}
+    heap = [(0.0, next(contador), inicio)]
+    resultado = {origen: (0.0, (origen,))}
+
+    while heap:
+        costo, _, estado = heapq.heappop(heap)
+        if costo > mejor.get(estado, math.inf):
+            continue
+        nodo, desde = estado
+        if nodo not in resultado:
+            camino = []
+            s = estado
+            while s is not None:
+                camino.append(s[0])
+                s = previo[s]
+            resultado[nodo] = (costo, tuple(reversed(camino)))
+
+        for sig, largo in vecinos[nodo]:
+            if sig == desde:
+                continue
+            giro = 0.0
+            if desde is not None:
+                giro = abs(normalizar_angulo(_rumbo(nodos, nodo, sig) - _rumbo(nodos, desde, nodo)))
+            nuevo = costo + largo + penal * giro / 90.0
+            sig_estado = (sig, nodo)
+            if nuevo < mejor.get(sig_estado, math.inf):
+                mejor[sig_estado] = nuevo
+                previo[sig_estado] = estado
+                heapq.heappush(heap, (nuevo, next(contador), sig_estado))
+    return resultado
+
+
+def compilar_mapa(datos):
+    """
+    Valida el mapa y precalcula los caminos entre todos los pares de nodos.
+    """
+    nodos = {}
+    for nombre, xy in datos.get("nodos", {}).items():
+        if not (isinstance(xy, list) and len(xy) == 2 and all(isinstance(v, (int, float)) for v in xy)):
+            raise ValueError(f"mapa: el nodo '{nombre}' debe ser [x, y] en metros")
+        nodos[nombre] = (float(xy[0]), float(xy[1]))
+    if not nodos:
+        raise ValueError("mapa: no hay nodos")
+
+    vecinos = {n: [] for n in nodos}
+    for arista in datos.get("aristas", []):
+        if not (isinstance(arista, list) and len(arista) == 2):
+            raise ValueError(f"mapa: arista inválida {arista!r}")
+        a, b = arista
+        for n in (a, b):
+            if n not in nodos:
+                raise ValueError(f"mapa: la arista {arista!r} usa el nodo desconocido '{n}'")
+        largo = _largo(nodos, a, b)
+        if largo <= 0:
+            raise ValueError(f"mapa: la arista {arista!r} tiene largo 0")
+        vecinos[a].append((b, largo))
+        vecinos[b].append((a, largo))
+
+    destinos = {}
+    for alias, nodo in datos.get("destinos", {}).items():
+        if nodo not in nodos:
+            raise ValueError(f"mapa: el destino '{alias}' apunta al nodo desconocido '{nodo}'")
+        destinos[alias.upper()] = nodo
+
+    inicio = datos.get("inicio", {})
+    if inicio.get("nodo") not in nodos:
+        raise ValueError("mapa: 'inicio.nodo' debe ser un nodo del mapa")
+
+    par = dict(PARAMETROS_DEFECTO)
+    par["penalizacion_giro_m"] = PENALIZACION_GIRO_M
+    par.update(datos.get("parametros", {}))
+
+    tabla = {}
+    for origen in nodos:
+        for destino, camino in _dijkstra(nodos, vecinos, origen, par["penalizacion_giro_m"]).items():
+            tabla[(origen, destino)] = camino
+
+    return {
+        "nodos": nodos,
+        "destinos": destinos,
+        "inicio": (inicio["nodo"], float(inicio.get("rumbo", 0.0))),
+        "parametros": par,
+        "tabla": tabla,
+    }
+
+
+class Mapa:
+    def __init__(self, compilado):
+        self.nodos = compilado["nodos"]
+        self.destinos = compilado["destinos"]
+        self.inicio = compilado["inicio"]
+        self.par = compilado["parametros"]
+        self.tabla = compilado["tabla"]
+
+    def nodo(self, nombre: str) -> str:
+        """
+        Nombre de destino (o nodo) -> nodo del mapa. KeyError si no existe.
+        """
+        if nombre in self.nodos:
+            return nombre
+        return self.destinos[nombre.upper()]
+
+    def costo(self, origen: str, destino: str) -> float:
+        camino = self.tabla.get((self.nodo(origen), self.nodo(destino)))
+        return camino[0] if camino else math.inf
+
+    def camino(self, origen: str, destino: str):
+        """
+        Tupla de nodos del mejor camino, o None si no están conectados.
+        """
+        camino = self.tabla.get((self.nodo(origen), self.nodo(destino)))
+        return camino[1] if camino else None
+
+    def pasos(self, origen: str, destino: str, rumbo: float):
+        """
+        Pasos de ejecutar_ruta_mpu para ir de `origen` a `destino` mirando
+        inicialmente hacia `rumbo` (°). Devuelve (pasos, rumbo_final) o
+        (None, rumbo) si no hay camino.
+        """
+        camino = self.camino(origen, destino)
+        if camino is None:
+            return None, rumbo
+        pwm = self.par["pwm"]
+        # Primero como lista de ("giro", °) / ("recto", m), juntando rectas seguidas
+        movs = []
+        for a, b in zip(camino, camino[1:]):
+            nuevo_rumbo = _rumbo(self.nodos, a, b)
+            giro = normalizar_angulo(nuevo_rumbo - rumbo)
+            largo = _largo(self.nodos, a, b)
+            if abs(giro) >= UMBRAL_GIRO:
+                movs.append(["giro", giro])
+                movs.append(["recto", largo])
+            elif movs and movs[-1][0] == "recto":
+                movs[-1][1] += largo
+            else:
+                movs.append(["recto", largo])
+            rumbo = nuevo_rumbo
+
+        pasos = []
+        for tipo, valor in movs:
+            if tipo == "giro":
+                pasos.append(paso_giro(round(valor, 1), pwm, None, self.par))
+            else:
+                pasos.append(paso_recto(round(valor, 2), pwm, None, self.par))
+        return tuple(pasos), rumbo
+
+    def orden_tour(self, origen: str, paradas, regresar: bool = True):
+        """
+        Orden de visita de `paradas` que minimiza el costo total
+        (exacto hasta MAX_PARADAS_EXACTO paradas, vecino más cercano si son más).
+        """
+        origen = self.nodo(origen)
+        paradas = [self.nodo(p) for p in paradas]
+
+        def costo_total(orden):
+            total, actual = 0.0, origen
+            for p in orden:
+                total += self.costo(actual, p)
+                actual = p
+            if regresar:
+                total += self.costo(actual, origen)
+            return total
+
+        if len(paradas) <= MAX_PARADAS_EXACTO:
+            return list(min(itertools.permutations(paradas), key=costo_total))
+
+        orden, actual, pendientes = [], origen, list(paradas)
+        while pendientes:
+            sig = min(pendientes, key=lambda p: self.costo(actual, p))
+            pendientes.remove(sig)
+            orden.append(sig)
+            actual = sig
+        return orden
+
+
+def cargar_mapa(path=MAPA_JSON, usar_cache=True) -> Mapa:
+    return Mapa(cargar_compilado(path, compilar_mapa, "mapa_mr", version=VERSION_MAPA, usar_cache=usar_cache))
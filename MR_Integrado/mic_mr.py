@@ -15,18 +15,167 @@
    See the License for the specific language governing permissions and
    limitations under the License.'''
 
+import math
+import os
 import subprocess
+import threading
 import time
 import signal
-import whisper
+
+import audio_mr
 
 FILENAME = "grabacion_6s.wav"
 DURATION = 6  # segundos
 
-def grabar_6s_con_parec():
+# "streaming": captura en memoria que corta al terminar de hablar (audio_mr)
+# "archivo":   grabación fija de DURATION segundos a FILENAME (como antes)
+CAPTURA = os.environ.get("MR_CAPTURA", "streaming")
+
+# Detección anticipada de destino (solo con CAPTURA="streaming"): se
+# decodifica mientras se habla y se acepta un destino solo si aparece en
+# dos hipótesis parciales seguidas, ambas con confianza >= CONFIANZA_PARCIAL:
+# un destino mueve el rover, y una sola palabra mal oída en una ventana
+# de 0.6 s no debe bastar, por alta que sea su confianza.
+PARCIAL = os.environ.get("MR_PARCIAL", "1") == "1"
+CONFIANZA_PARCIAL = float(os.environ.get("MR_PARCIAL_CONFIANZA", "0.5"))
+
+# ==========================================
+# MOTOR DE RECONOCIMIENTO (WHISPER)
+# El modelo ya no se carga al importar: se carga la primera vez que se
+# usa, o antes en segundo plano con precalentar() (main_mr.py lo llama
+# al arrancar, mientras se muestra el menú).
+#   MR_WHISPER_MOTOR:   "faster" (faster-whisper / CTranslate2, int8 en CPU),
+#                       "whisper" (openai-whisper, PyTorch fp32) o
+#                       "auto" (faster si está instalado).
+#   MR_WHISPER_MODELO:  tiny, base, small... (default "base")
+#   MR_WHISPER_COMPUTE: tipo de cómputo de faster-whisper (default "int8")
+#   MR_WHISPER_HILOS:   hilos de CPU (0 = los que decida la librería)
+#   MR_WHISPER_BEAM:    1 = greedy (lo más rápido para comandos cortos)
+# ==========================================
+
+MOTOR = os.environ.get("MR_WHISPER_MOTOR", "auto")
+MODELO = os.environ.get("MR_WHISPER_MODELO", "base")
+COMPUTE = os.environ.get("MR_WHISPER_COMPUTE", "int8")
+HILOS = int(os.environ.get("MR_WHISPER_HILOS", "0"))
+BEAM = int(os.environ.get("MR_WHISPER_BEAM", "1"))
+IDIOMA = "es"
+
+SEGUNDOS_PRECALENTAR = 1.0
+
+
+def _elegir_motor(motor: str) -> str:
+    if motor != "auto":
+        return motor
+    try:
+        import faster_whisper  # noqa: F401
+        return "faster"
+    except ImportError:
+        return "whisper"
+
+
+class MotorWhisper:
+    """
+    Carga perezosa del modelo y una sola función transcribir() para los
+    dos motores. `audio` puede ser la ruta de un WAV o un arreglo float32;
+    al modelo siempre le llega el arreglo de audio_mr.preparar (16 kHz,
+    sin DC, normalizado), nunca la ruta: así no se lanza ffmpeg.
+    """
+
+    def __init__(self, motor=MOTOR, modelo=MODELO, compute=COMPUTE, hilos=HILOS, beam=BEAM):
+        self.motor = _elegir_motor(motor)
+        self.modelo = modelo
+        self.compute = compute
+        self.hilos = hilos
+        self.beam = beam
+        self.segundos_carga = None
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    def descripcion(self) -> str:
+        if self.motor == "faster":
+            return f"faster-whisper '{self.modelo}' {self.compute}"
+        return f"openai-whisper '{self.modelo}' fp32"
+
+    def cargar(self):
+        with self._lock:
+            if self._modelo is not None:
+                return self._modelo
+            print(f"[MIC] Cargando modelo {self.descripcion()}...")
+            t0 = time.perf_counter()
+            if self.motor == "faster":
+                from faster_whisper import WhisperModel
+                self._modelo = WhisperModel(
+                    self.modelo, device="cpu", compute_type=self.compute, cpu_threads=self.hilos
+                )
+            elif self.motor == "whisper":
+                import torch
+                import whisper
+                if self.hilos > 0:
+                    torch.set_num_threads(self.hilos)
+                self._modelo = whisper.load_model(self.modelo, device="cpu")
+            else:
+                raise ValueError(f"MR_WHISPER_MOTOR desconocido: {self.motor!r}")
+            self.segundos_carga = time.perf_counter() - t0
+            print(f"[MIC] Modelo cargado en {self.segundos_carga:.1f} s.")
+            return self._modelo
+
+    def cargado(self) -> bool:
+        return self._modelo is not None
+
+    def transcribir(self, audio) -> str:
+        return self.transcribir_con_confianza(audio)[0]
+
+    def transcribir_con_confianza(self, audio):
+        """
+        (texto, confianza en [0, 1]): exp del logprob promedio por token
+        de los segmentos.
+        """
+        modelo = self.cargar()
+        audio = audio_mr.preparar(audio)
+        if self.motor == "faster":
+            segmentos, _info = modelo.transcribe(audio, language=IDIOMA, beam_size=self.beam)
+            segmentos = list(segmentos)
+            texto = "".join(s.text for s in segmentos).strip()
+            logprobs = [s.avg_logprob for s in segmentos]
+        else:
+            opciones = {"beam_size": self.beam} if self.beam > 1 else {}
+            result = modelo.transcribe(audio, language=IDIOMA, fp16=False, **opciones)
+            texto = result.get("text", "").strip()
+            logprobs = [s["avg_logprob"] for s in result.get("segments", [])]
+        confianza = math.exp(sum(logprobs) / len(logprobs)) if logprobs else 0.0
+        return texto, confianza
+
+
+motor = MotorWhisper()
+_hilo_precalentar = None
+
+
+def precalentar() -> None:
+    """
+    Carga el modelo y hace una transcripción de silencio en segundo
+    plano (la primera inferencia reserva memoria y es la más lenta).
+    """
+    global _hilo_precalentar
+    if _hilo_precalentar is not None or motor.cargado():
+        return
+
+    def _run():
+        try:
+            import numpy as np
+            motor.transcribir(np.zeros(int(audio_mr.FRECUENCIA * SEGUNDOS_PRECALENTAR), dtype=np.float32))
+        except Exception as e:
+            print(f"[MIC] No se pudo precargar Whisper: {e}")
+
+    _hilo_precalentar = threading.Thread(target=_run, name="PrecalentarWhisper", daemon=True)
+    _hilo_precalentar.start()
+
+
+def grabar_6s_con_parec(path=None):
+    path = path or FILENAME
     print(f" Grabando {DURATION} segundos con parec... habla cerca del micrófono.")
 
-    cmd = ["parec", "--file-format=wav", FILENAME]
+    cmd = ["parec", "--file-format=wav", "--format=s16le", f"--rate={audio_mr.FRECUENCIA}",
+           "--channels=1", path]
     proc = subprocess.Popen(cmd)
 
     time.sleep(DURATION)
@@ -34,27 +183,96 @@ def grabar_6s_con_parec():
     proc.send_signal(signal.SIGINT)
     proc.wait()
 
-    print(f" Archivo guardado: {FILENAME}")
+    print(f" Archivo guardado: {path}")
 
 
 print("=== Mini-Rover · Módulo de micrófono (Whisper) ===")
-print("[MIC] Cargando modelo Whisper ('base')...")
-model = whisper.load_model("base")
-print("[MIC] Modelo Whisper cargado.\n")
+
+
+def _escuchar_streaming():
+    """
+    Frase en memoria (float32) o None si no se habló. Si la captura en
+    streaming falla, ESTE comando se graba en modo archivo; el siguiente
+    vuelve a intentar streaming (el error puede ser pasajero).
+    """
+    try:
+        print(" Escuchando... habla cerca del micrófono.")
+        audio = audio_mr.escuchar_frase()
+    except Exception as e:
+        print(f"[MIC] Captura en streaming no disponible ({e}); este comando se graba con parec a archivo.")
+        grabar_6s_con_parec()
+        return FILENAME
+    if audio is not None:
+        print(f" Frase capturada: {len(audio) / audio_mr.FRECUENCIA:.1f} s")
+    return audio
 
 
 def escuchar_y_transcribir() -> str:
     """
-    Graba 6s de audio y devuelve el texto reconocido (puede ser cadena vacía).
+    Escucha un comando y devuelve el texto reconocido (puede ser cadena vacía).
     NO pide ENTER: eso ahora lo maneja main_mr.py.
     """
-    grabar_6s_con_parec()
+    if CAPTURA == "streaming":
+        audio = _escuchar_streaming()
+        if audio is None:
+            print("[MIC] No se detectó voz.")
+            return ""
+    else:
+        grabar_6s_con_parec()
+        audio = FILENAME
 
     print("[MIC] Transcribiendo con Whisper...")
-    result = model.transcribe(FILENAME, language="es", fp16=False)
-    texto = result.get("text", "").strip()
+    texto = motor.transcribir(audio)
 
     print("[MIC] Texto reconocido:")
     print(f"» {texto if texto else '[vacío]'}\n")
 
     return texto
+
+
+def escuchar_y_detectar(detectar):
+    """
+    Como escuchar_y_transcribir, pero corre `detectar(texto)` sobre las
+    hipótesis parciales mientras se habla. Devuelve (texto, destino):
+    si el destino se reconoce antes de que termine la frase se regresa
+    de inmediato, sin esperar el resto del audio.
+    """
+    if CAPTURA != "streaming" or not PARCIAL:
+        texto = escuchar_y_transcribir()
+        return texto, detectar(texto) if texto else None
+
+    estado = {"anterior": None}
+
+    def parcial(audio):
+        texto, confianza = motor.transcribir_con_confianza(audio)
+        destino = detectar(texto) if texto else None
+        if confianza < CONFIANZA_PARCIAL:
+            destino = None
+        anterior, estado["anterior"] = estado["anterior"], destino
+        if destino is None:
+            return False
+        if destino == anterior:
+            estado["texto"], estado["destino"] = texto, destino
+            print(f"[MIC] Destino anticipado: {destino} (parcial {texto!r}, confianza {confianza:.2f})")
+            return True
+        return False
+
+    try:
+        print(" Escuchando... habla cerca del micrófono.")
+        audio = audio_mr.escuchar_frase(parcial=parcial)
+    except Exception as e:
+        print(f"[MIC] Decodificación parcial no disponible ({e}).")
+        texto = escuchar_y_transcribir()
+        return texto, detectar(texto) if texto else None
+
+    if "destino" in estado:
+        return estado["texto"], estado["destino"]
+    if audio is None:
+        print("[MIC] No se detectó voz.")
+        return "", None
+
+    print("[MIC] Transcribiendo con Whisper...")
+    texto = motor.transcribir(audio)
+    print("[MIC] Texto reconocido:")
+    print(f"» {texto if texto else '[vacío]'}\n")
+    return texto, detectar(texto) if texto else None
@@ -0,0 +1,175 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import threading
+import time
+from array import array
+
+from protocolo_mr import CodificadorPWM, negociar_binario
+
+# ==========================================
+# SALIDA A MOTORES (IZQUIERDA + DERECHA)
+# La usan rutas_mpu_mr.py y mando_bt_mr.py.
+#  - Codifica los dos comandos ANTES de escribir, para que entre la
+#    escritura izquierda y la derecha solo haya una llamada a write().
+#  - paralelo=True: el lado derecho lo escribe un hilo propio al mismo
+#    tiempo que el izquierdo.
+#  - Si el PWM no cambió, no se reenvía, salvo un keepalive cada
+#    KEEPALIVE_S para que el ESP32 siempre tenga el último valor.
+# ==========================================
+
+KEEPALIVE_S = 0.25
+ESPERA_RIGHT_S = 0.1   # máximo que se espera al hilo del lado derecho
+HISTORIAL = 1024   # últimas N escrituras para las estadísticas
+
+
+class SalidaMotores:
+    def __init__(self, esp_left, esp_right, protocolo="ascii", keepalive=KEEPALIVE_S, paralelo=False):
+        self.esp_left = esp_left
+        self.esp_right = esp_right
+        self.keepalive = keepalive
+
+        # Negociar protocolo con cada ESP32 (si falla, ASCII)
+        self.bin_left = protocolo == "binario" and negociar_binario(esp_left)
+        self.bin_right = protocolo == "binario" and negociar_binario(esp_right)
+        self.cod_left = CodificadorPWM(self.bin_left)
+        self.cod_right = CodificadorPWM(self.bin_right)
+
+        self.ultimo = None          # (pwm_l, pwm_r) enviado por última vez
+        self.t_ultimo = 0.0
+
+        # Estadísticas
+        self.escrituras = 0
+        self.suprimidas = 0
+        self.keepalives = 0
+        self.errores = 0
+        self.latencia_us = array("f", bytes(4 * HISTORIAL))
+        self.skew_us = array("f", bytes(4 * HISTORIAL))
+
+        # Hilo escritor del lado derecho (modo paralelo)
+        self.paralelo = paralelo
+        # La trama solo se cambia con el hilo libre (_hecho puesto)
+        self._trama_right = None
+        self._t_fin_right = 0
+        self._error_right = None
+        self._pedido = threading.Event()
+        self._hecho = threading.Event()
+        self._hecho.set()
+        self._activo = True
+        self._hilo = None
+        if paralelo:
+            self._hilo = threading.Thread(target=self._escritor_right, name="MotorRight", daemon=True)
+            self._hilo.start()
+
+    # ---------- API ----------
+
+    def enviar(self, pwm_l: int, pwm_r: int, forzar: bool = False) -> bool:
+        """
+        Manda (pwm_l, pwm_r). Devuelve False si se suprimió por no haber
+        cambio o si falló la escritura de alguno de los dos lados.
+        """
+        ahora = time.monotonic()
+        if not forzar and (pwm_l, pwm_r) == self.ultimo:
+            if ahora - self.t_ultimo < self.keepalive:
+                self.suprimidas += 1
+                return False
+            self.keepalives += 1
+
+        trama_l = self.cod_left.codificar(pwm_l)
+        trama_r = self.cod_right.codificar(pwm_r)
+
+        t0 = time.perf_counter_ns()
+        try:
+            if self.paralelo:
+                # Una escritura anterior que no terminó sigue usando el puerto
+                if not self._hecho.wait(timeout=ESPERA_RIGHT_S):
+                    raise TimeoutError("el lado derecho sigue ocupado con la escritura anterior")
+                self._trama_right = trama_r
+                self._hecho.clear()
+                self._pedido.set()
+                self.esp_left.write(trama_l)
+                t_fin_l = time.perf_counter_ns()
+                if not self._hecho.wait(timeout=ESPERA_RIGHT_S):
+                    raise TimeoutError(f"el lado derecho no terminó en {ESPERA_RIGHT_S * 1000:.0f} ms")
+                if self._error_right is not None:
+                    raise self._error_right
+                t_fin_r = self._t_fin_right
+            else:
+                self.esp_left.write(trama_l)
+                t_fin_l = time.perf_counter_ns()
+                self.esp_right.write(trama_r)
+                t_fin_r = time.perf_counter_ns()
+        except Exception as e:
+            self.errores += 1
+            print(f"\n[MOTORES] Error escribiendo por serial: {e}")
+            return False
+        t1 = time.perf_counter_ns()
+
+        k = self.escrituras % HISTORIAL
+        self.latencia_us[k] = (t1 - t0) / 1000.0
+        self.skew_us[k] = abs(t_fin_r - t_fin_l) / 1000.0
+        self.escrituras += 1
+
+        self.ultimo = (pwm_l, pwm_r)
+        self.t_ultimo = ahora
+        return True
+
+    def detener(self) -> None:
+        """
+        Manda PWM 0 a los dos lados (siempre, sin supresión).
+        """
+        self.enviar(0, 0, forzar=True)
+
+    def cerrar(self) -> None:
+        """
+        Termina el hilo escritor. No cierra los puertos.
+        """
+        self._activo = False
+        self._pedido.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+
+    def estadisticas(self) -> str:
+        n = min(self.escrituras, HISTORIAL)
+        if n == 0:
+            return "[MOTORES] Sin escrituras."
+        lat = sorted(self.latencia_us[:n])
+        skew = sorted(self.skew_us[:n])
+        return (
+            f"[MOTORES] escrituras {self.escrituras} | suprimidas {self.suprimidas} | "
+            f"keepalives {self.keepalives} | errores {self.errores} | "
+            f"latencia p50 {lat[n // 2]:.0f} us, max {lat[-1]:.0f} us | "
+            f"skew L/R p50 {skew[n // 2]:.0f} us, max {skew[-1]:.0f} us"
+        )
+
+    # ---------- Hilo ----------
+
+    def _escritor_right(self):
+        while True:
+            self._pedido.wait()
+            self._pedido.clear()
+            if not self._activo:
+                break
+            try:
+                self.esp_right.write(self._trama_right)
+                self._error_right = None
+            except Exception as e:
+                # Lo reporta enviar() (cuenta el error y devuelve False)
+                self._error_right = e
+            self._t_fin_right = time.perf_counter_ns()
+            self._hecho.set()
@@ -0,0 +1,92 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import math
+
+# ==========================================
+# ODOMETRÍA CON ENCODERS + GIROSCOPIO
+# Cada ESP32 cuenta los pulsos de sus dos motores (cntA, cntB) y los
+# manda en la telemetría. El avance de cada lado es el promedio de sus
+# dos motores; el avance del rover es el promedio de los dos lados.
+# Ese avance se proyecta sobre el rumbo del giroscopio para separar lo
+# que se avanzó en la dirección del tramo de lo que se desvió de lado.
+# ==========================================
+
+# El firmware calcula vel = pulsos_en_20ms * 0.0865; asumiendo que vel
+# está en m/s, cada pulso son 0.0865 * 0.02 m. Calibrar midiendo un
+# tramo conocido si el rover se pasa o se queda corto.
+METROS_POR_PULSO = 0.0865 * 0.02
+
+# Telemetría más vieja que esto se considera perdida
+EDAD_MAX_S = 0.5
+
+
+class OdometriaEncoders:
+    def __init__(self, lector_left, lector_right, metros_por_pulso=METROS_POR_PULSO):
+        self.lector_left = lector_left
+        self.lector_right = lector_right
+        self.metros_por_pulso = metros_por_pulso
+
+        self.avance = 0.0    # m en la dirección del tramo
+        self.lateral = 0.0   # m de desvío lateral
+        self._cuentas = None
+
+    def disponible(self) -> bool:
+        """
+        True si los dos lados mandan contadores de encoder recientes.
+        """
+        for lector in (self.lector_left, self.lector_right):
+            if not lector.con_encoders or lector.edad() > EDAD_MAX_S:
+                return False
+        return True
+
+    def _leer_cuentas(self):
+        return self.lector_left.ultimo[4:6], self.lector_right.ultimo[4:6]
+
+    def marcar(self) -> None:
+        """
+        Pone el avance a cero (inicio de un tramo).
+        """
+        self.avance = 0.0
+        self.lateral = 0.0
+        self._cuentas = self._leer_cuentas() if self.disponible() else None
+
+    def actualizar(self, angulo_relativo: float) -> float:
+        """
+        Suma el avance desde la última llamada, proyectado con el ángulo
+        (°) relativo al inicio del tramo. Devuelve el avance acumulado (m).
+        """
+        if not self.disponible():
+            return self.avance
+        cuentas = self._leer_cuentas()
+        if self._cuentas is None:
+            self._cuentas = cuentas
+            return self.avance
+
+        (la0, lb0), (ra0, rb0) = self._cuentas
+        (la1, lb1), (ra1, rb1) = cuentas
+        self._cuentas = cuentas
+
+        # abs(): los motores de un lado pueden estar montados invertidos
+        izq = (abs(la1 - la0) + abs(lb1 - lb0)) / 2.0
+        der = (abs(ra1 - ra0) + abs(rb1 - rb0)) / 2.0
+        ds = (izq + der) / 2.0 * self.metros_por_pulso
+
+        rad = math.radians(angulo_relativo)
+        self.avance += ds * math.cos(rad)
+        self.lateral += ds * math.sin(rad)
+        return self.avance
@@ -0,0 +1,183 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import struct
+import time
+
+# ==========================================
+# PROTOCOLO SERIAL PC <-> ESP32 (serial_minirover.ino)
+#
+# ASCII (por defecto, compatible con firmware viejo):
+#   PC -> ESP32 : "<pwm>\n"
+#   ESP32 -> PC : "A pwm:.. vel:.. cnt:..   |   B pwm:.. vel:.. cnt:.."
+#
+# BINARIO (se negocia mandando la línea "BIN\n"; el ESP32 responde
+# "BIN OK" y cambia de modo hasta que se reinicia o recibe "ASC\n",
+# que lo regresa a ASCII y responde "ASC OK"):
+#   PC -> ESP32 : 6 bytes  [0xA5, tipo, seq, pwm int16 LE, crc8]
+#   ESP32 -> PC : 22 bytes [0x5A, 0x81, seq, pwm int16, cntA int32,
+#                           cntB int32, velA*100 int16, velB*100 int16,
+#                           t_ms uint32, crc8]
+# El CRC-8 (polinomio 0x07) cubre todo menos el byte de sync y el propio CRC.
+# ==========================================
+
+SYNC_CMD = 0xA5
+SYNC_TEL = 0x5A
+
+TIPO_PWM = 0x01
+TIPO_TEL = 0x81
+
+FORMATO_CMD = "<BBBh"          # sync, tipo, seq, pwm (+ crc)
+FORMATO_TEL = "<BBBhiihhI"     # sync, tipo, seq, pwm, cntA, cntB, velA, velB, t_ms (+ crc)
+LARGO_CMD = struct.calcsize(FORMATO_CMD) + 1
+LARGO_TEL = struct.calcsize(FORMATO_TEL) + 1
+
+LINEA_NEGOCIAR = b"BIN\n"
+RESPUESTA_NEGOCIAR = b"BIN OK"
+LINEA_ASCII = b"ASC\n"
+TIMEOUT_NEGOCIAR = 0.5  # s por intento
+# Reintentos: el primero puede caer mientras el ESP32 se reinicia por DTR
+# al abrir el puerto (y ahí se pierde lo que se mande)
+INTENTOS_NEGOCIAR = 4
+
+
+def _tabla_crc8(poly=0x07):
+    tabla = []
+    for i in range(256):
+        c = i
+        for _ in range(8):
+            c = ((c << 1) ^ poly) & 0xFF if c & 0x80 else (c << 1) & 0xFF
+        tabla.append(c)
+    return bytes(tabla)
+
+
+TABLA_CRC8 = _tabla_crc8()
+
+
+def crc8(datos) -> int:
+    c = 0
+    for b in datos:
+        c = TABLA_CRC8[c ^ b]
+    return c
+
+
+def trama_pwm(seq: int, pwm: int) -> bytes:
+    cuerpo = struct.pack(FORMATO_CMD, SYNC_CMD, TIPO_PWM, seq & 0xFF, pwm)
+    return cuerpo + bytes((crc8(cuerpo[1:]),))
+
+
+def linea_pwm(pwm: int) -> bytes:
+    return (str(pwm) + "\n").encode("utf-8")
+
+
+# Líneas ASCII ya codificadas para todo el rango de PWM
+PWM_MAX = 1023
+LINEAS_PWM = tuple(linea_pwm(v) for v in range(-PWM_MAX, PWM_MAX + 1))
+
+
+class CodificadorPWM:
+    """
+    Convierte un PWM en los bytes a mandar según el modo negociado.
+    """
+
+    def __init__(self, binario=False):
+        self.binario = binario
+        self.seq = 0
+
+    def codificar(self, pwm: int) -> bytes:
+        if not self.binario:
+            if -PWM_MAX <= pwm <= PWM_MAX:
+                return LINEAS_PWM[pwm + PWM_MAX]
+            return linea_pwm(pwm)
+        trama = trama_pwm(self.seq, pwm)
+        self.seq = (self.seq + 1) & 0xFF
+        return trama
+
+
+def negociar_binario(puerto, timeout=TIMEOUT_NEGOCIAR, intentos=INTENTOS_NEGOCIAR) -> bool:
+    """
+    Pide al ESP32 cambiar a protocolo binario. Devuelve True si respondió
+    "BIN OK" en alguno de los `intentos` (cada uno espera `timeout`); si
+    no (firmware viejo), se sigue en ASCII y se manda "ASC\n" por si un
+    "BIN OK" tardío lo dejó en binario.
+    Debe llamarse antes de arrancar el lector de telemetría del puerto.
+    """
+    try:
+        puerto.reset_input_buffer()
+        for _ in range(intentos):
+            puerto.write(LINEA_NEGOCIAR)
+            recibido = bytearray()
+            limite = time.monotonic() + timeout
+            while time.monotonic() < limite:
+                recibido += puerto.read(puerto.in_waiting or 1)
+                if RESPUESTA_NEGOCIAR in recibido:
+                    return True
+        puerto.write(LINEA_ASCII)
+    except Exception:
+        pass
+    return False
+
+
+class DecodificadorTelemetria:
+    """
+    Extrae tramas binarias de telemetría de un flujo de bytes.
+    Tolera bytes basura: busca el sync y valida el CRC.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.tramas = 0
+        self.errores_crc = 0
+        self.bytes_descartados = 0
+        self.seq_perdidas = 0
+        self._seq_esperada = None
+
+    def procesar(self, datos: bytes):
+        """
+        Devuelve la lista de tramas completas como tuplas
+        (pwm, cntA, cntB, velA, velB, t_ms).
+        """
+        buf = self._buf
+        buf += datos
+        salida = []
+        while True:
+            inicio = buf.find(SYNC_TEL)
+            if inicio < 0:
+                self.bytes_descartados += len(buf)
+                buf.clear()
+                break
+            if inicio > 0:
+                self.bytes_descartados += inicio
+                del buf[:inicio]
+            if len(buf) < LARGO_TEL:
+                break
+            if buf[1] != TIPO_TEL or crc8(buf[1:LARGO_TEL - 1]) != buf[LARGO_TEL - 1]:
+                # Sync falso o trama corrupta: avanzar un byte y resincronizar
+                self.errores_crc += 1
+                self.bytes_descartados += 1
+                del buf[:1]
+                continue
+            _, _, seq, pwm, cnt_a, cnt_b, vel_a, vel_b, t_ms = struct.unpack_from(FORMATO_TEL, buf)
+            del buf[:LARGO_TEL]
+
+            if self._seq_esperada is not None:
+                self.seq_perdidas += (seq - self._seq_esperada) & 0xFF
+            self._seq_esperada = (seq + 1) & 0xFF
+
+            self.tramas += 1
+            salida.append((pwm, cnt_a, cnt_b, vel_a / 100.0, vel_b / 100.0, t_ms))
+        return salida
@@ -0,0 +1,128 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import time
+from array import array
+
+# ==========================================
+# RELOJ DE CONTROL A FRECUENCIA FIJA
+# Usa un deadline absoluto sobre time.monotonic_ns (no le afectan los
+# ajustes del reloj de pared) y compensa los retrasos: el periodo real
+# es 1/hz sin importar cuánto tarden el I2C, los prints o el serial.
+# ==========================================
+
+# Últimos N ticks que se guardan para calcular percentiles de jitter
+HISTORIAL_TICKS = 4096
+
+# Antes del deadline se duerme con time.sleep y los últimos
+# SPIN_NS se esperan activamente (time.sleep no es preciso a 500 Hz).
+# Con un reloj virtual (sim_mr.py) se usa spin_ns=0: dormir() ya llega
+# exacto al deadline y esperar activamente no avanzaría el tiempo.
+SPIN_NS = 200_000
+
+
+class RelojControl:
+    def __init__(self, hz=20.0, reloj_ns=time.monotonic_ns, dormir=time.sleep, spin_ns=SPIN_NS):
+        if hz <= 0:
+            raise ValueError("La frecuencia de control debe ser > 0 Hz")
+        self.hz = hz
+        self.periodo_ns = int(1e9 / hz)
+        self.reloj_ns = reloj_ns
+        self.dormir = dormir
+        self.spin_ns = spin_ns
+
+        self.siguiente_ns = None
+        self.ultimo_tick_ns = None
+        self.inicio_ns = None
+
+        # Estadísticas
+        self.ticks = 0
+        self.overruns = 0          # ticks que llegaron tarde más de un periodo
+        self.ticks_perdidos = 0    # deadlines que se saltaron por overrun
+        self.jitter_max_ns = 0
+        self.jitter_suma_ns = 0
+        self.jitter_ns = array("q", bytes(8 * HISTORIAL_TICKS))
+
+    def ahora(self) -> float:
+        """
+        Tiempo actual del reloj de control en segundos.
+        """
+        return self.reloj_ns() / 1e9
+
+    def iniciar(self) -> None:
+        ahora = self.reloj_ns()
+        self.inicio_ns = ahora
+        self.ultimo_tick_ns = ahora
+        self.siguiente_ns = ahora + self.periodo_ns
+
+    def esperar(self) -> float:
+        """
+        Duerme hasta el siguiente deadline y devuelve el dt real (s)
+        desde el tick anterior.
+        """
+        if self.siguiente_ns is None:
+            self.iniciar()
+
+        restante = self.siguiente_ns - self.reloj_ns()
+        if restante > self.spin_ns:
+            self.dormir((restante - self.spin_ns) / 1e9)
+        if self.spin_ns > 0:
+            while self.reloj_ns() < self.siguiente_ns:
+                pass
+
+        ahora = self.reloj_ns()
+        retraso = ahora - self.siguiente_ns
+
+        self.jitter_ns[self.ticks % HISTORIAL_TICKS] = retraso
+        self.ticks += 1
+        self.jitter_suma_ns += retraso
+        if retraso > self.jitter_max_ns:
+            self.jitter_max_ns = retraso
+
+        if retraso >= self.periodo_ns:
+            # Overrun: saltar los deadlines perdidos en vez de acumularlos
+            perdidos = retraso // self.periodo_ns
+            self.overruns += 1
+            self.ticks_perdidos += perdidos
+            self.siguiente_ns += (perdidos + 1) * self.periodo_ns
+        else:
+            self.siguiente_ns += self.periodo_ns
+
+        dt = (ahora - self.ultimo_tick_ns) / 1e9
+        self.ultimo_tick_ns = ahora
+        return dt
+
+    def percentil_jitter_us(self, p: float) -> float:
+        n = min(self.ticks, HISTORIAL_TICKS)
+        if n == 0:
+            return 0.0
+        muestras = sorted(self.jitter_ns[:n])
+        idx = min(n - 1, int(p / 100.0 * n))
+        return muestras[idx] / 1000.0
+
+    def reporte(self) -> str:
+        if self.ticks == 0 or self.inicio_ns is None:
+            return "[RELOJ] Sin ticks."
+        duracion = (self.ultimo_tick_ns - self.inicio_ns) / 1e9
+        hz_real = self.ticks / duracion if duracion > 0 else 0.0
+        media_us = self.jitter_suma_ns / self.ticks / 1000.0
+        return (
+            f"[RELOJ] {self.ticks} ticks | objetivo {self.hz:.0f} Hz, real {hz_real:.1f} Hz | "
+            f"jitter media {media_us:.0f} us, p99 {self.percentil_jitter_us(99):.0f} us, "
+            f"max {self.jitter_max_ns / 1000.0:.0f} us | "
+            f"overruns {self.overruns} ({self.ticks_perdidos} ticks perdidos)"
+        )
@@ -0,0 +1,185 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import hashlib
+import json
+import os
+import pickle
+
+# ==========================================
+# RUTAS DECLARATIVAS (rutas_mr.json)
+# Cada ruta describe solo la IDA en unidades físicas:
+#   {"recto": metros}  o  {"giro": grados}   (+90 = izquierda, -90 = derecha)
+# Opcionales por paso: "pwm", "t_max" (s).
+# El regreso se deriva solo: giro de 180° en el destino, los pasos de
+# ida al revés con los giros invertidos y un giro final de 180°.
+#
+# Se compila a tuplas (PWM_L, PWM_R, Tiempo_Max, ANGULO, DISTANCIA_M), el
+# formato que usa rutas_mpu_mr.ejecutar_ruta_mpu, y se guarda en
+# __pycache__ con el hash del archivo: mientras no cambie, no se
+# vuelve a leer ni validar el JSON.
+# ==========================================
+
+DIR_MR = os.path.dirname(os.path.abspath(__file__))
+RUTAS_JSON = os.path.join(DIR_MR, "rutas_mr.json")
+DIR_CACHE = os.path.join(DIR_MR, "__pycache__")
+
+# Subir si cambia el formato compilado (invalida los caches viejos)
+VERSION_COMPILADOR = 2
+
+PARAMETROS_DEFECTO = {
+    "pwm": 1000,
+    "segundos_por_metro": 7.0,
+    "tiempo_giro_180": 10.0,
+    "tiempo_min_giro": 6.0,
+}
+
+
+def paso_recto(metros, pwm, t_max, par):
+    if t_max is None:
+        t_max = round(metros * par["segundos_por_metro"], 2)
+    return (pwm, pwm, float(t_max), 0, float(metros))
+
+
+def paso_giro(grados, pwm, t_max, par):
+    if t_max is None:
+        t_max = max(par["tiempo_min_giro"], abs(grados) / 180.0 * par["tiempo_giro_180"])
+    # Positivo = izquierda (L atrás, R adelante); negativo = derecha
+    if grados > 0:
+        return (-pwm, pwm, float(t_max), grados, 0.0)
+    return (pwm, -pwm, float(t_max), grados, 0.0)
+
+
+def compilar_pasos(pasos, par, nombre="?"):
+    """
+    Convierte pasos {"recto"|"giro": ...} en tuplas de ejecutar_ruta_mpu.
+    Lanza ValueError con el nombre de la ruta y el número de paso si algo
+    no es válido.
+    """
+    salida = []
+    for i, paso in enumerate(pasos, start=1):
+        donde = f"ruta '{nombre}', paso {i}"
+        if not isinstance(paso, dict):
+            raise ValueError(f"{donde}: se esperaba un objeto, no {paso!r}")
+        tipos = [k for k in ("recto", "giro") if k in paso]
+        if len(tipos) != 1:
+            raise ValueError(f"{donde}: debe tener exactamente uno de 'recto' o 'giro'")
+        desconocidas = set(paso) - {"recto", "giro", "pwm", "t_max"}
+        if desconocidas:
+            raise ValueError(f"{donde}: claves desconocidas {sorted(desconocidas)}")
+
+        valor = paso[tipos[0]]
+        pwm = paso.get("pwm", par["pwm"])
+        t_max = paso.get("t_max")
+        if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+            raise ValueError(f"{donde}: '{tipos[0]}' debe ser un número")
+        if not isinstance(pwm, int) or not 0 < pwm <= 1023:
+            raise ValueError(f"{donde}: 'pwm' debe ser un entero entre 1 y 1023")
+        if t_max is not None and (not isinstance(t_max, (int, float)) or t_max <= 0):
+            raise ValueError(f"{donde}: 't_max' debe ser un número > 0")
+
+        if tipos[0] == "recto":
+            if valor <= 0:
+                raise ValueError(f"{donde}: 'recto' debe ser > 0 m")
+            salida.append(paso_recto(valor, pwm, t_max, par))
+        else:
+            if valor == 0 or abs(valor) > 360:
+                raise ValueError(f"{donde}: 'giro' debe estar entre -360 y 360, distinto de 0")
+            salida.append(paso_giro(valor, pwm, t_max, par))
+    return salida
+
+
+def derivar_regreso(ida, par):
+    """
+    Pasos compilados del regreso al punto de partida (misma orientación).
+    """
+    pwm = par["pwm"]
+    regreso = [paso_giro(180, pwm, None, par)]
+    for pwm_l, pwm_r, t_max, angulo, distancia in reversed(ida):
+        if angulo == 0:
+            regreso.append((pwm_l, pwm_r, t_max, 0, distancia))
+        else:
+            regreso.append((pwm_r, pwm_l, t_max, -angulo, 0.0))
+    regreso.append(paso_giro(180, pwm, None, par))
+    return regreso
+
+
+def compilar_rutas(datos):
+    """
+    JSON ya parseado -> {NOMBRE_EN_MAYÚSCULAS: tupla de pasos}, con los alias.
+    """
+    if not isinstance(datos, dict) or not isinstance(datos.get("rutas"), dict):
+        raise ValueError("rutas_mr.json debe tener un objeto 'rutas'")
+    par = dict(PARAMETROS_DEFECTO)
+    par.update(datos.get("parametros", {}))
+
+    rutas = {}
+    for nombre, ruta in datos["rutas"].items():
+        if not isinstance(ruta, dict) or not isinstance(ruta.get("ida"), list) or not ruta["ida"]:
+            raise ValueError(f"ruta '{nombre}': falta la lista 'ida'")
+        ida = compilar_pasos(ruta["ida"], par, nombre)
+        if "regreso" in ruta:
+            regreso = compilar_pasos(ruta["regreso"], par, nombre + " (regreso)")
+        else:
+            regreso = derivar_regreso(ida, par)
+        pasos = tuple(ida + regreso)
+
+        for clave in [nombre] + list(ruta.get("alias", [])):
+            clave = clave.upper()
+            if clave in rutas:
+                raise ValueError(f"ruta '{nombre}': el nombre o alias '{clave}' está repetido")
+            rutas[clave] = pasos
+    return rutas
+
+
+def cargar_compilado(path, compilar, prefijo, version=VERSION_COMPILADOR, usar_cache=True):
+    """
+    Lee el JSON de `path` y devuelve compilar(datos), tomándolo del cache
+    en __pycache__ si el archivo (y `version`) no cambiaron.
+    """
+    with open(path, "rb") as f:
+        contenido = f.read()
+    digest = hashlib.sha256(contenido + bytes([version])).hexdigest()
+    cache = os.path.join(DIR_CACHE, f"{prefijo}.{digest[:16]}.pickle")
+
+    if usar_cache:
+        try:
+            with open(cache, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    compilado = compilar(json.loads(contenido.decode("utf-8")))
+
+    if usar_cache:
+        try:
+            os.makedirs(DIR_CACHE, exist_ok=True)
+            tmp = cache + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(compilado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache)
+        except OSError:
+            pass  # sin cache en disco también funciona
+    return compilado
+
+
+def cargar_rutas(path=RUTAS_JSON, usar_cache=True):
+    """
+    Lee, valida y compila el archivo de rutas (o lo toma del cache si
+    el archivo no cambió).
+    """
+    return cargar_compilado(path, compilar_rutas, "rutas_mr", usar_cache=usar_cache)
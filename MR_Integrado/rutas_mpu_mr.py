@@ -14,62 +14,196 @@
    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
    See the License for the specific language governing permissions and
    limitations under the License.'''
+import os
 import serial
 import time
 import smbus2
 import sys
 
+from imu_mr import MuestreadorIMU
+from motores_mr import SalidaMotores
+from odometria_mr import OdometriaEncoders
+from reloj_mr import RelojControl
+from rutas_config_mr import cargar_rutas
+from telemetria_mr import LectorTelemetria
+
 # ==========================================
 # 1. CLASE DEL SENSOR (MPU6050, SOLO GYRO X)
 # ==========================================
 
+# Registros del MPU6050
+REG_SMPLRT_DIV   = 0x19
+REG_CONFIG       = 0x1A
+REG_FIFO_EN      = 0x23
+REG_INT_STATUS   = 0x3A
+REG_ACCEL_XOUT_H = 0x3B   # inicio del bloque accel(6) + temp(2) + gyro(6)
+REG_GYRO_XOUT_H  = 0x43
+REG_USER_CTRL    = 0x6A
+REG_PWR_MGMT_1   = 0x6B
+REG_FIFO_COUNT_H = 0x72
+REG_FIFO_R_W     = 0x74
+
+FIFO_EN_XG       = 0x40   # solo gyro X a la FIFO (2 bytes por muestra)
+USER_CTRL_FIFO   = 0x40
+USER_CTRL_RESET  = 0x04
+INT_FIFO_OFLOW   = 0x10
+FIFO_MAX_BYTES   = 1024
+I2C_BLOQUE_MAX   = 32     # límite de smbus2 por transacción de bloque
+
+GYRO_LSB_POR_DPS  = 131.0    # ±250 °/s
+ACCEL_LSB_POR_G   = 16384.0  # ±2 g
+
+
+def _int16(high, low):
+    val = (high << 8) | low
+    if val >= 32768:
+        val -= 65536
+    return val
+
+
 class MPU_Gyro_X_Only:
-    def __init__(self, bus_num=7, address=0x68):
-        self.bus = smbus2.SMBus(bus_num)
+    """
+    modo="directo": una lectura de gyro X por tick del lazo de control.
+    modo="fifo":    el MPU muestrea gyro X a `fifo_hz` en su FIFO interna y
+                    update() integra TODAS las muestras acumuladas desde el
+                    tick anterior (dt = 1/fifo_hz por muestra).
+    """
+
+    def __init__(self, bus_num=7, address=0x68, modo="directo", fifo_hz=1000,
+                 bus=None, reloj=time.monotonic, dormir=time.sleep):
+        # `bus`, `reloj` y `dormir` se reemplazan en la simulación (sim_mr.py)
+        self.bus = bus if bus is not None else smbus2.SMBus(bus_num)
+        self.reloj = reloj
+        self.dormir = dormir
         self.address = address
         self.angle_x = 0.0
         self.offset_x = 0.0
-        self.prev_time = time.time()
+        self.prev_time = self.reloj()
         self.DEADZONE = 0.8  # Ajusta si hay drift estando quieto
 
+        self.modo = modo
+        self.fifo_hz = fifo_hz
+        self.ultimo_lote = 0       # muestras integradas en el último update()
+        self.fifo_overflows = 0
+
         try:
             # Despertar el MPU6050 (quitar sleep)
-            self.bus.write_byte_data(self.address, 0x6B, 0)
+            self.bus.write_byte_data(self.address, REG_PWR_MGMT_1, 0)
+            if self.modo == "fifo":
+                self.configurar_fifo(fifo_hz)
         except Exception as e:
             print(f"Error MPU: {e}")
             sys.exit(1)
 
     def read_gyro_x(self):
         try:
-            high = self.bus.read_byte_data(self.address, 0x43)
-            low = self.bus.read_byte_data(self.address, 0x44)
-            val = (high << 8) | low
-            if val > 32768:
-                val -= 65536
+            high, low = self.bus.read_i2c_block_data(self.address, REG_GYRO_XOUT_H, 2)
             # Escala típica MPU6050 → 131 LSB/(°/s)
-            return val / 131.0  # °/s
+            return _int16(high, low) / GYRO_LSB_POR_DPS  # °/s
         except Exception:
             return 0.0
 
+    def read_all(self):
+        """
+        Lee accel, temperatura y gyro en UNA transacción de 14 bytes.
+        Devuelve (ax, ay, az [g], temp [°C], gx, gy, gz [°/s]) o None si falla.
+        """
+        try:
+            d = self.bus.read_i2c_block_data(self.address, REG_ACCEL_XOUT_H, 14)
+        except Exception:
+            return None
+        ax = _int16(d[0], d[1]) / ACCEL_LSB_POR_G
+        ay = _int16(d[2], d[3]) / ACCEL_LSB_POR_G
+        az = _int16(d[4], d[5]) / ACCEL_LSB_POR_G
+        temp = _int16(d[6], d[7]) / 340.0 + 36.53
+        gx = _int16(d[8], d[9]) / GYRO_LSB_POR_DPS
+        gy = _int16(d[10], d[11]) / GYRO_LSB_POR_DPS
+        gz = _int16(d[12], d[13]) / GYRO_LSB_POR_DPS
+        return ax, ay, az, temp, gx, gy, gz
+
+    # ---------- FIFO ----------
+
+    def configurar_fifo(self, fifo_hz):
+        """
+        DLPF a 188 Hz (frecuencia interna 1 kHz) y divisor para fifo_hz.
+        """
+        divisor = max(0, min(255, int(round(1000.0 / fifo_hz)) - 1))
+        self.fifo_hz = 1000.0 / (divisor + 1)
+        self.bus.write_byte_data(self.address, REG_CONFIG, 0x01)
+        self.bus.write_byte_data(self.address, REG_SMPLRT_DIV, divisor)
+        self.bus.write_byte_data(self.address, REG_FIFO_EN, FIFO_EN_XG)
+        self.reset_fifo()
+
+    def reset_fifo(self):
+        self.bus.write_byte_data(self.address, REG_USER_CTRL, USER_CTRL_RESET)
+        self.bus.write_byte_data(self.address, REG_USER_CTRL, USER_CTRL_FIFO)
+        # INT_STATUS se borra al leerlo: sin esto, un overflow anterior al
+        # reset (p. ej. durante calibrate) se contaría en el siguiente update()
+        self.bus.read_byte_data(self.address, REG_INT_STATUS)
+
+    def leer_fifo(self):
+        """
+        Vacía la FIFO y devuelve la lista de muestras de gyro X en °/s
+        (sin offset). Si hubo overflow, resetea la FIFO y devuelve None.
+        """
+        try:
+            estado = self.bus.read_byte_data(self.address, REG_INT_STATUS)
+            if estado & INT_FIFO_OFLOW:
+                self.fifo_overflows += 1
+                self.reset_fifo()
+                return None
+
+            high, low = self.bus.read_i2c_block_data(self.address, REG_FIFO_COUNT_H, 2)
+            pendientes = ((high << 8) | low) & ~1  # solo muestras completas
+
+            muestras = []
+            while pendientes > 0:
+                n = min(pendientes, I2C_BLOQUE_MAX)
+                d = self.bus.read_i2c_block_data(self.address, REG_FIFO_R_W, n)
+                for k in range(0, n, 2):
+                    muestras.append(_int16(d[k], d[k + 1]) / GYRO_LSB_POR_DPS)
+                pendientes -= n
+            return muestras
+        except Exception:
+            return []
+
     def calibrate(self):
         print(">>> CALIBRANDO GIROSCOPIO (NO MOVER EL MR)...")
-        time.sleep(1)
+        self.dormir(1)
         suma = 0.0
         for _ in range(100):
             suma += self.read_gyro_x()
-            time.sleep(0.01)
+            self.dormir(0.01)
         self.offset_x = suma / 100.0
-        self.prev_time = time.time()
+        if self.modo == "fifo":
+            # La FIFO se llenó mientras se calibraba: vaciarla y borrar el overflow
+            try:
+                self.reset_fifo()
+            except Exception as e:
+                print(f"Error MPU al reiniciar la FIFO: {e}")
+        self.prev_time = self.reloj()
         print(f"Calibrado. Offset X: {self.offset_x:.2f} °/s")
 
     def update(self):
         """
         Integra gyro X para obtener ángulo en grados.
         """
-        now = time.time()
+        now = self.reloj()
         dt = now - self.prev_time
         self.prev_time = now
 
+        if self.modo == "fifo":
+            muestras = self.leer_fifo()
+            if muestras is not None:
+                dt_muestra = 1.0 / self.fifo_hz
+                for raw in muestras:
+                    corrected = raw - self.offset_x
+                    if abs(corrected) >= self.DEADZONE:
+                        self.angle_x += corrected * dt_muestra
+                self.ultimo_lote = len(muestras)
+                return self.angle_x
+            # Overflow: se perdieron muestras, integrar este tick como en modo directo
+
         raw = self.read_gyro_x()
         corrected = raw - self.offset_x
 
@@ -77,6 +211,7 @@ class MPU_Gyro_X_Only:
             corrected = 0.0
 
         self.angle_x += corrected * dt
+        self.ultimo_lote = 1
         return self.angle_x
 
 
@@ -88,145 +223,213 @@ PUERTO_LEFT = "/dev/ttyUSB0"   # Lado IZQUIERDO
 PUERTO_RIGHT = "/dev/ttyUSB1"  # Lado DERECHO
 BAUDRATE = 115200
 
+# Protocolo con los ESP32: "ascii" (líneas de texto) o "binario"
+# (tramas con CRC, se negocia al inicio; si el firmware no responde
+# se sigue en ASCII). Ver protocolo_mr.py.
+PROTOCOLO = os.environ.get("MR_PROTOCOLO", "ascii")
+
+# MR_ESCRITURA_PARALELA=1: izquierda y derecha se escriben en paralelo
+ESCRITURA_PARALELA = os.environ.get("MR_ESCRITURA_PARALELA", "0") == "1"
+
 # Control proporcional para mantener recta la ruta
 KP = 15.0  # Si oscila mucho, bájalo; si corrige lento, súbelo.
 
+# Frecuencia del lazo de control (Hz). Configurable, p. ej. 100 a 500 Hz.
+FRECUENCIA_CONTROL_HZ = float(os.environ.get("MR_CONTROL_HZ", "20"))
+
+# Adquisición del IMU: "directo" (una lectura por tick) o "fifo"
+# (todas las muestras a IMU_FIFO_HZ se integran en cada tick)
+MODO_IMU = os.environ.get("MR_IMU_MODO", "directo")
+IMU_FIFO_HZ = 1000
+
+# MR_IMU_HILO=1: el IMU se muestrea en un hilo propio (imu_mr.MuestreadorIMU)
+# a IMU_HILO_HZ y el lazo de control solo lee el último ángulo.
+IMU_EN_HILO = os.environ.get("MR_IMU_HILO", "0") == "1"
+IMU_HILO_HZ = 500
+
+# Con odometría, una recta puede tardar hasta Tiempo_Max * este margen
+# (batería baja) antes de darse por terminada.
+MARGEN_TIEMPO_ODOMETRIA = 1.5
+
+# Al arrancar la ruta se espera hasta esto a la primera telemetría con
+# encoders (el ESP32 manda cada 20 ms); sin ella el primer tramo, que
+# suele ser el más largo, se haría por tiempo.
+ESPERA_TELEMETRIA_S = 0.5
+
+# Zona muerta del giroscopio (°/s) mientras el rover avanza. La DEADZONE
+# del MPU es para que el ángulo no derive estando quieto; en marcha
+# esconde giros lentos reales: la corrección P deja un error pequeño cuya
+# diferencia de PWM (< ~12) gira al rover a menos de 0.8 °/s, el
+# giroscopio no lo ve y el error nunca se corrige (decenas de metros de
+# desvío en las rutas largas en sim_mr). El offset ya se calibró al inicio
+# de la ruta, así que en marcha basta cubrir el ruido del sensor.
+# Opcional (MR_DEADZONE_MARCHA=<°/s>, p. ej. 0) hasta probarlo en el
+# rover real; sin la variable se usa la DEADZONE de siempre.
+_deadzone_marcha = os.environ.get("MR_DEADZONE_MARCHA", "")
+DEADZONE_EN_MARCHA = float(_deadzone_marcha) if _deadzone_marcha else None
+
+# Frecuencia de los prints de estado dentro del lazo (Hz)
+FRECUENCIA_PRINT_HZ = 10.0
+
 
 # ==========================================
-# 3. DEFINICIÓN DE RUTAS (LISTAS DE PASOS)
-# Formato: [PWM_Base_L, PWM_Base_R, Tiempo_Max, ANGULO_OBJETIVO]
+# 3. RUTAS (se definen en rutas_mr.json, ver rutas_config_mr.py)
+# Cada ruta compilada es una tupla de pasos:
+#   (PWM_Base_L, PWM_Base_R, Tiempo_Max, ANGULO_OBJETIVO, DISTANCIA_M)
 #   ANGULO_OBJETIVO:
 #     0   -> RECTO con corrección (PID sobre ángulo)
 #     !=0 -> GIRO hasta alcanzar ese ángulo relativo (o agotar tiempo_max)
+#   DISTANCIA_M (solo rectas):
+#     Si los ESP32 mandan contadores de encoder, la recta termina al
+#     avanzar esa distancia y Tiempo_Max * MARGEN_TIEMPO_ODOMETRIA queda
+#     como tope de seguridad. Sin encoders se usa Tiempo_Max (1 m ≈ 7 s).
+# Para agregar un destino basta editar rutas_mr.json.
 # ==========================================
 
-# Ruta SANITARIOS: la que ya probaron con IMU
-SANITARIOS = [
-    [1000, 1000, 19.3, 0],     # Recto
-    [-1000, 1000, 6.0, 90],    # Giro Izquierda 90
-    [1000, 1000, 67.46, 0],    # Recto largo
-    [-1000, 1000, 6.0, 90],    # Giro Izquierda 90
-    [1000, 1000, 19.3, 0],     # Recto corto
-    [-1000, 1000, 10.0, 180],  # U de 180°
-
-    # Regreso
-    [1000, 1000, 19.3, 0],
-    [1000, -1000, 6.0, -90],   # Giro Derecha 90
-    [1000, 1000, 67.46, 0],
-    [1000, -1000, 6.0, -90],   # Giro Derecha 90
-    [1000, 1000, 19.3, 0],
-    [-1000, 1000, 10.0, 180]   # Giro final 180
-]
-
-# Ruta TORRE (distancias ya convertidas):
-#   Tramo 1: 30.4 m → 30.4 * 7 ≈ 212.8 s
-#   Tramo 2:  9.5 m →  9.5 * 7 = 66.5 s
-TORRE = [
-    [1000, 1000, 212.8, 0],   # Tramo largo recto
-    [1000, -1000, 6.0, -90],  # Giro derecha 90°
-    [1000, 1000, 66.5, 0],    # Tramo corto recto (llegada a torre)
-
-    [-1000, 1000, 10.0, 180], # Giro 180° en la torre
-    [1000, 1000, 66.5, 0],    # Tramo corto de regreso
-    [-1000, 1000, 6.0, 90],   # Giro izquierda 90°
-    [1000, 1000, 212.8, 0],   # Tramo largo de regreso
-    [-1000, 1000, 10.0, 180], # Giro final 180°
-]
-
-# Ruta SERVICIO MÉDICO:
-#  40 m recto → giro izquierda → 6 m recto → giro y regreso
-#  Distancias convertidas con 1 m ≈ 7 s:
-#    40 m → 280 s
-#     6 m →  42 s
-SERVICIO_MEDICO = [
-    # Ida
-    [1000, 1000, 280.0, 0],    # 40 m recto
-    [-1000, 1000, 6.0, 90],    # Giro izquierda 90°
-    [1000, 1000, 42.0, 0],     # 6 m recto (llegada a servicio médico)
-
-    # Giro ahí y regreso
-    [-1000, 1000, 10.0, 180],  # Giro 180° en servicio médico
-    [1000, 1000, 42.0, 0],     # 6 m de regreso
-    [1000, -1000, 6.0, -90],   # Giro derecha 90°
-    [1000, 1000, 280.0, 0],    # 40 m de regreso
-    [-1000, 1000, 10.0, 180],  # Giro final 180° (misma orientación que al inicio)
-]
-
-# Ruta RAMPA:
-#  40 m recto → giro izquierda → 2 m recto → giro y regreso
-#  Distancias convertidas con 1 m ≈ 7 s:
-#    40 m → 280 s
-#     2 m →  14 s
-RAMPA = [
-    # Ida
-    [1000, 1000, 280.0, 0],    # 40 m recto
-    [-1000, 1000, 6.0, 90],    # Giro izquierda 90°
-    [1000, 1000, 14.0, 0],     # 2 m recto (llegada a la rampa)
-
-    # Giro ahí y regreso
-    [-1000, 1000, 10.0, 180],  # Giro 180° en la rampa
-    [1000, 1000, 14.0, 0],     # 2 m de regreso
-    [1000, -1000, 6.0, -90],   # Giro derecha 90°
-    [1000, 1000, 280.0, 0],    # 40 m de regreso
-    [-1000, 1000, 10.0, 180],  # Giro final 180°
-]
-
-RUTAS = {
-    "SANITARIOS": SANITARIOS,
-    "BANOS": SANITARIOS,
-    "BAÑOS": SANITARIOS,
-    "TORRE": TORRE,
-    "SERVICIO_MEDICO": SERVICIO_MEDICO,
-    "SERVICIO MÉDICO": SERVICIO_MEDICO,
-    "RAMPA": RAMPA,
-}
+RUTAS = cargar_rutas()
 
 
 # ==========================================
 # 4. EJECUCIÓN GENÉRICA DE UNA RUTA CON IMU
 # ==========================================
 
-def ejecutar_ruta_mpu(nombre_ruta: str) -> None:
+def abrir_puertos():
+    """
+    Abre los dos puertos serial (IZQUIERDA, DERECHA).
+    Lanza serial.SerialException si alguno falla.
+    """
+    esp_left  = serial.Serial(port=PUERTO_LEFT,  baudrate=BAUDRATE, timeout=0.1)
+    try:
+        esp_right = serial.Serial(port=PUERTO_RIGHT, baudrate=BAUDRATE, timeout=0.1)
+    except Exception:
+        # Sin cerrar el izquierdo quedaría ocupado en cada reintento
+        esp_left.close()
+        raise
+    return esp_left, esp_right
+
+
+def ejecutar_ruta_mpu(nombre_ruta: str, **kwargs) -> bool:
+    """
+    Ejecuta una ruta de RUTAS (ida y vuelta). Ver ejecutar_secuencia_mpu.
+    """
     nombre_upper = nombre_ruta.upper()
     secuencia = RUTAS.get(nombre_upper)
 
     if secuencia is None:
         print(f"[RUTAS_MPU] Ruta '{nombre_ruta}' no definida.")
-        return
-
-    print(f"\n=== INICIANDO RUTA '{nombre_upper}' CON CORRECCIÓN DE GIROSCOPIO ===\n")
-
-    # 1) Inicializar IMU
-    mpu = MPU_Gyro_X_Only(bus_num=7)
+        return False
+
+    return ejecutar_secuencia_mpu(secuencia, nombre_upper, **kwargs)
+
+
+def ejecutar_secuencia_mpu(secuencia, nombre: str, mpu=None, esp_left=None, esp_right=None,
+                           hz: float = FRECUENCIA_CONTROL_HZ, imu_en_hilo: bool = IMU_EN_HILO,
+                           reloj=None) -> bool:
+    """
+    Ejecuta una lista de pasos (de RUTAS o del planificador de mapa_mr).
+    Si se pasan `mpu` y/o los puertos (modo en proceso de main_mr.py),
+    se reutilizan y NO se cierran al terminar.
+    `reloj` (con monotonic_ns() y sleep()) reemplaza al reloj del sistema;
+    lo usa sim_mr.py para correr las rutas más rápido que en tiempo real.
+    Devuelve True si se completaron todos los pasos.
+    """
+    print(f"\n=== INICIANDO RUTA '{nombre}' CON CORRECCIÓN DE GIROSCOPIO ===\n")
+    completada = False
+
+    # 1) Inicializar IMU (se recalibra en cada ruta: el offset deriva)
+    if mpu is None:
+        mpu = MPU_Gyro_X_Only(bus_num=7, modo=MODO_IMU, fifo_hz=IMU_FIFO_HZ)
     mpu.calibrate()
 
     # 2) Inicializar serial
+    cerrar_puertos = esp_left is None or esp_right is None
+    if cerrar_puertos:
+        try:
+            esp_left, esp_right = abrir_puertos()
+        except serial.SerialException as e:
+            print(f"Error puertos: {e}")
+            return False
+
+    # Si algo de la preparación falla (p. ej. la negociación del protocolo
+    # lanza SerialException) se deshace lo ya iniciado y se cierran los
+    # puertos abiertos aquí antes de propagar el error.
+    salida = None
+    lectores = []
+    muestreador = None
     try:
-        esp_left  = serial.Serial(port=PUERTO_LEFT,  baudrate=BAUDRATE, timeout=0.1)
-        esp_right = serial.Serial(port=PUERTO_RIGHT, baudrate=BAUDRATE, timeout=0.1)
-    except serial.SerialException as e:
-        print(f"Error puertos: {e}")
-        return
+        # 3) Protocolo, salida a motores y telemetría de los ESP32
+        #    (leer la telemetría evita que se acumule en el buffer)
+        salida = SalidaMotores(esp_left, esp_right, protocolo=PROTOCOLO, paralelo=ESCRITURA_PARALELA)
+        if PROTOCOLO == "binario":
+            print(f"[RUTAS_MPU] Protocolo binario: LEFT={salida.bin_left} RIGHT={salida.bin_right}")
+        for lado, puerto, binario in (("LEFT", esp_left, salida.bin_left),
+                                      ("RIGHT", esp_right, salida.bin_right)):
+            lector = LectorTelemetria(puerto, lado, binario=binario)
+            lectores.append(lector)
+            lector.iniciar()
+        odometria = OdometriaEncoders(*lectores)
+        dormir = reloj.sleep if reloj is not None else time.sleep
+        for _ in range(int(ESPERA_TELEMETRIA_S / 0.01)):
+            if odometria.disponible():
+                break
+            dormir(0.01)
+
+        # 4) Fuente del ángulo: hilo de muestreo o lectura en cada tick
+        if imu_en_hilo:
+            muestreador = MuestreadorIMU(mpu, hz=IMU_HILO_HZ)
+            muestreador.iniciar()
+            leer_angulo = muestreador.angulo
+        else:
+            leer_angulo = mpu.update
+
+        if reloj is None:
+            reloj = RelojControl(hz)
+        else:
+            reloj = RelojControl(hz, reloj_ns=reloj.monotonic_ns, dormir=reloj.sleep, spin_ns=0)
+        ticks_por_print = max(1, int(hz / FRECUENCIA_PRINT_HZ))
+        reloj.iniciar()
+    except BaseException:
+        if muestreador is not None:
+            muestreador.detener()
+        for lector in lectores:
+            lector.detener()
+        if salida is not None:
+            salida.cerrar()
+        if cerrar_puertos:
+            esp_left.close()
+            esp_right.close()
+        raise
 
+    deadzone_quieto = mpu.DEADZONE
+    if DEADZONE_EN_MARCHA is not None:
+        mpu.DEADZONE = DEADZONE_EN_MARCHA
     try:
         for i, paso in enumerate(secuencia):
             pwm_base_L = paso[0]
             pwm_base_R = paso[1]
             tiempo_max = paso[2]
             target_delta_angle = paso[3]
+            distancia_m = paso[4] if len(paso) > 4 else 0.0
 
             # Para cada paso, tomamos el ángulo actual como "cero"
-            start_angle = mpu.angle_x
+            start_angle = muestreador.angulo() if muestreador else mpu.angle_x
 
             es_recta = (target_delta_angle == 0)
             modo_str = "RECTA (Corrigiendo)" if es_recta else f"GIRO ({target_delta_angle}°)"
+
+            # Recta por distancia si hay encoders; si no, por tiempo
+            por_distancia = es_recta and distancia_m > 0 and odometria.disponible()
+            if por_distancia:
+                tiempo_max = tiempo_max * MARGEN_TIEMPO_ODOMETRIA
+                modo_str += f" {distancia_m:.2f} m por encoders"
+                odometria.marcar()
             print(f"\n>> PASO {i+1}: {modo_str} | PWM_Base: L={pwm_base_L}, R={pwm_base_R} | t_max={tiempo_max:.1f}s")
 
-            start_time = time.time()
+            start_time = reloj.ahora()
 
-            while (time.time() - start_time) < tiempo_max:
+            while (reloj.ahora() - start_time) < tiempo_max:
                 # 1. Actualizar sensor
-                current_total_angle = mpu.update()
+                current_total_angle = leer_angulo()
                 # Ángulo relativo desde que empezó este paso
                 angle_recorrido = current_total_angle - start_angle
 
@@ -244,40 +447,91 @@ def ejecutar_ruta_mpu(nombre_ruta: str) -> None:
                     final_R = int(pwm_base_R - correccion)
                     # Si ves que corrige al revés, invierte los signos arriba.
 
+                    if por_distancia and odometria.actualizar(angle_recorrido) >= distancia_m:
+                        print(
+                            f"   -> Recta completada: {odometria.avance:.2f} m "
+                            f"(desvío lateral {odometria.lateral:+.2f} m)"
+                        )
+                        break
+
                 else:
                     # MODO GIRO: parar cuando lleguemos al ángulo requerido
                     if abs(angle_recorrido) >= abs(target_delta_angle):
                         print(f"   -> Giro completado a {angle_recorrido:.1f}° (target {target_delta_angle}°)")
                         break
-                    print(f"   -> Girando... Actual: {angle_recorrido:.1f}° / Meta: {target_delta_angle}°", end="\r")
+                    if reloj.ticks % ticks_por_print == 0:
+                        print(f"   -> Girando... Actual: {angle_recorrido:.1f}° / Meta: {target_delta_angle}°", end="\r")
 
                 # 2. Saturar PWM (asumo rango -1023 a 1023)
                 final_L = max(min(final_L, 1023), -1023)
                 final_R = max(min(final_R, 1023), -1023)
 
                 # 3. Enviar a motores (orden: IZQUIERDA, DERECHA)
-                esp_left.write((str(final_L) + "\n").encode("utf-8"))
-                esp_right.write((str(final_R) + "\n").encode("utf-8"))
+                salida.enviar(final_L, final_R)
 
-                time.sleep(0.05)  # ~20 Hz
+                reloj.esperar()  # periodo fijo 1/hz, compensa el tiempo de I2C y serial
 
         print("\n=== RUTA TERMINADA ===")
+        completada = True
 
     except KeyboardInterrupt:
         print("\nSTOP DE EMERGENCIA (Ctrl+C)")
 
     finally:
+        if muestreador is not None:
+            muestreador.detener()
+        mpu.DEADZONE = deadzone_quieto
+        salida.detener()
+        salida.cerrar()
+        for lector in lectores:
+            lector.detener()
+        if cerrar_puertos:
+            try:
+                esp_left.close()
+                esp_right.close()
+            except Exception:
+                pass
+            print("[RUTAS_MPU] Motores detenidos y puertos cerrados.")
+        else:
+            print("[RUTAS_MPU] Motores detenidos.")
+        print(reloj.reporte())
+        print(salida.estadisticas())
+        for lector in lectores:
+            print(lector.estadisticas())
+        if muestreador is not None:
+            print(f"[RUTAS_MPU] Muestreador IMU: {muestreador.n} muestras | {muestreador.reporte_reloj}")
+        if mpu.modo == "fifo":
+            print(f"[RUTAS_MPU] IMU FIFO a {mpu.fifo_hz:.0f} Hz | overflows: {mpu.fifo_overflows}")
+
+    return completada
+
+
+def ejecutar_mapa_mpu(mapa, origen: str, destinos, rumbo: float, **kwargs):
+    """
+    Recorre `destinos` en orden sobre el grafo de mapa_mr partiendo de
+    `origen` con rumbo `rumbo` (°). Devuelve (nodo, rumbo) donde quedó
+    el rover; si una ruta se interrumpe, se devuelve la última parada
+    completada (la posición real ya no es confiable).
+    """
+    actual = mapa.nodo(origen)
+    for destino in destinos:
         try:
-            esp_left.write("0\n".encode("utf-8"))
-            esp_right.write("0\n".encode("utf-8"))
-        except Exception:
-            pass
-        try:
-            esp_left.close()
-            esp_right.close()
-        except Exception:
-            pass
-        print("[RUTAS_MPU] Motores detenidos y puertos cerrados.")
+            pasos, rumbo_final = mapa.pasos(actual, destino, rumbo)
+        except KeyError:
+            print(f"[RUTAS_MPU] Destino '{destino}' no está en el mapa.")
+            break
+        if pasos is None:
+            print(f"[RUTAS_MPU] No hay camino de '{actual}' a '{destino}' en el mapa.")
+            break
+        if not pasos:
+            print(f"[RUTAS_MPU] Ya estamos en '{destino}'.")
+            continue
+        camino = " -> ".join(mapa.camino(actual, destino))
+        print(f"[RUTAS_MPU] Camino: {camino}")
+        if not ejecutar_secuencia_mpu(pasos, f"{actual} -> {mapa.nodo(destino)}", **kwargs):
+            break
+        actual, rumbo = mapa.nodo(destino), rumbo_final
+    return actual, rumbo
 
 
 # ==========================================
@@ -285,10 +539,24 @@ def ejecutar_ruta_mpu(nombre_ruta: str) -> None:
 # ==========================================
 
 if __name__ == "__main__":
-    if len(sys.argv) >= 2:
-        destino_cli = sys.argv[1]
+    # python rutas_mpu_mr.py TORRE                 -> ruta de ida y vuelta
+    # python rutas_mpu_mr.py --mapa TORRE RAMPA    -> desde el inicio, por el mapa
+    # python rutas_mpu_mr.py --tour TORRE RAMPA    -> orden óptimo y regreso al inicio
+    if len(sys.argv) >= 3 and sys.argv[1] in ("--mapa", "--tour"):
+        from mapa_mr import cargar_mapa
+
+        mapa = cargar_mapa()
+        nodo_inicio, rumbo_inicio = mapa.inicio
+        paradas = sys.argv[2:]
+        if sys.argv[1] == "--tour":
+            paradas = mapa.orden_tour(nodo_inicio, paradas) + [nodo_inicio]
+        print(f"[RUTAS_MPU] Recorrido por mapa desde CLI: {' -> '.join(paradas)}")
+        ejecutar_mapa_mpu(mapa, nodo_inicio, paradas, rumbo_inicio)
     else:
-        destino_cli = "SANITARIOS"
+        if len(sys.argv) >= 2:
+            destino_cli = sys.argv[1]
+        else:
+            destino_cli = "SANITARIOS"
 
-    print(f"[RUTAS_MPU] Ejecutando ruta desde CLI: {destino_cli}")
-    ejecutar_ruta_mpu(destino_cli)
+        print(f"[RUTAS_MPU] Ejecutando ruta desde CLI: {destino_cli}")
+        ejecutar_ruta_mpu(destino_cli)
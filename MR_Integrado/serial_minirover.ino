@@ -40,6 +40,49 @@ long lastCountB = 0;
 
 int pwmCommand = 0;   // valor recibido de -1023 a 1023
 
+// ====== Protocolo (ver protocolo_mr.py) ======
+// ASCII por defecto. Al recibir la línea "BIN" responde "BIN OK" y pasa a
+// tramas binarias con CRC-8 (poly 0x07) hasta el siguiente reinicio o
+// hasta recibir "ASC\n" (el PC no logró negociar y sigue en ASCII).
+const uint8_t SYNC_CMD = 0xA5;
+const uint8_t SYNC_TEL = 0x5A;
+const uint8_t TIPO_PWM = 0x01;
+const uint8_t TIPO_TEL = 0x81;
+const int LARGO_CMD = 6;    // sync, tipo, seq, pwm(2), crc
+const int LARGO_TEL = 22;   // sync, tipo, seq, pwm(2), cntA(4), cntB(4), velA(2), velB(2), t_ms(4), crc
+const uint32_t PALABRA_BIN = 0x42494E0A;  // "BIN\n"
+const uint32_t PALABRA_ASC = 0x4153430A;  // "ASC\n"
+
+bool modoBinario = false;
+uint8_t rxTrama[LARGO_CMD];
+int rxLargo = 0;
+uint32_t ultimos4 = 0;
+uint8_t seqTel = 0;
+unsigned long erroresCRC = 0;
+
+uint8_t crc8(const uint8_t *d, int n) {
+  uint8_t c = 0;
+  for (int i = 0; i < n; i++) {
+    c ^= d[i];
+    for (int b = 0; b < 8; b++) {
+      c = (c & 0x80) ? (uint8_t)((c << 1) ^ 0x07) : (uint8_t)(c << 1);
+    }
+  }
+  return c;
+}
+
+void put16(uint8_t *p, int16_t v) {
+  p[0] = v & 0xFF;
+  p[1] = (v >> 8) & 0xFF;
+}
+
+void put32(uint8_t *p, uint32_t v) {
+  p[0] = v & 0xFF;
+  p[1] = (v >> 8) & 0xFF;
+  p[2] = (v >> 16) & 0xFF;
+  p[3] = (v >> 24) & 0xFF;
+}
+
 // ISR encoder A
 void IRAM_ATTR isr_encA_A() {
   unsigned long now = micros();
@@ -85,6 +128,93 @@ void setMotor(int AIN1, int AIN2, int channel, int val) {
   }
 }
 
+// ===== Lectura de comandos =====
+void leerComandoAscii() {
+  String s = Serial.readStringUntil('\n');
+  s.trim();
+  if (s == "BIN") {
+    modoBinario = true;
+    rxLargo = 0;
+    Serial.println("BIN OK");
+    return;
+  }
+  if (s == "ASC") {
+    Serial.println("ASC OK");
+    return;
+  }
+  pwmCommand = s.toInt();
+  pwmCommand = constrain(pwmCommand, -1023, 1023);
+}
+
+void leerComandosBinarios() {
+  while (Serial.available()) {
+    uint8_t b = Serial.read();
+
+    // Renegociación (p. ej. el PC reabre la sesión sin reiniciar el ESP32)
+    ultimos4 = (ultimos4 << 8) | b;
+    if (ultimos4 == PALABRA_BIN) {
+      rxLargo = 0;
+      Serial.println("BIN OK");
+      continue;
+    }
+    if (ultimos4 == PALABRA_ASC) {
+      modoBinario = false;
+      rxLargo = 0;
+      Serial.println("ASC OK");
+      return;
+    }
+
+    if (rxLargo == 0 && b != SYNC_CMD) continue;
+    rxTrama[rxLargo++] = b;
+    if (rxLargo < LARGO_CMD) continue;
+
+    rxLargo = 0;
+    if (crc8(rxTrama + 1, LARGO_CMD - 2) != rxTrama[LARGO_CMD - 1]) {
+      erroresCRC++;
+      continue;
+    }
+    if (rxTrama[1] == TIPO_PWM) {
+      int16_t v = (int16_t)(rxTrama[3] | (rxTrama[4] << 8));
+      pwmCommand = constrain((int)v, -1023, 1023);
+    }
+  }
+}
+
+// ===== Telemetría =====
+void enviarTelemetriaAscii() {
+  noInterrupts();
+  long a = cntA;
+  long b = cntB;
+  interrupts();
+
+  Serial.print("A pwm:"); Serial.print(pwmCommand);
+  Serial.print(" vel:"); Serial.print(avgA);
+  Serial.print(" cnt:"); Serial.print(a);
+  Serial.print("   |   B pwm:"); Serial.print(pwmCommand);
+  Serial.print(" vel:"); Serial.print(avgB);
+  Serial.print(" cnt:"); Serial.println(b);
+}
+
+void enviarTelemetriaBinaria() {
+  noInterrupts();
+  long a = cntA;
+  long b = cntB;
+  interrupts();
+
+  uint8_t f[LARGO_TEL];
+  f[0] = SYNC_TEL;
+  f[1] = TIPO_TEL;
+  f[2] = seqTel++;
+  put16(f + 3, (int16_t)pwmCommand);
+  put32(f + 5, (uint32_t)a);
+  put32(f + 9, (uint32_t)b);
+  put16(f + 13, (int16_t)(avgA * 100));
+  put16(f + 15, (int16_t)(avgB * 100));
+  put32(f + 17, (uint32_t)millis());
+  f[LARGO_TEL - 1] = crc8(f + 1, LARGO_TEL - 2);
+  Serial.write(f, LARGO_TEL);
+}
+
 // ===== SETUP =====
 void setup() {
   Serial.begin(115200);
@@ -121,10 +251,10 @@ const unsigned long PERIOD = 20;
 void loop() {
 
   // ----- Lectura de PWM por serial -----
-  if (Serial.available()) {
-    String s = Serial.readStringUntil('\n');
-    pwmCommand = s.toInt();
-    pwmCommand = constrain(pwmCommand, -1023, 1023);
+  if (modoBinario) {
+    leerComandosBinarios();
+  } else if (Serial.available()) {
+    leerComandoAscii();
   }
 
   // ----- Cada 20 ms calcula velocidad -----
@@ -159,10 +289,11 @@ void loop() {
     setMotor(A_AIN1, A_AIN2, CH_A, pwmCommand);
     setMotor(B_AIN1, B_AIN2, CH_B, pwmCommand);
 
-    // ----- Print -----
-    Serial.print("A pwm:"); Serial.print(pwmCommand);
-    Serial.print(" vel:"); Serial.print(avgA);
-    Serial.print("   |   B pwm:"); Serial.print(pwmCommand);
-    Serial.print(" vel:"); Serial.println(avgB);
+    // ----- Telemetría -----
+    if (modoBinario) {
+      enviarTelemetriaBinaria();
+    } else {
+      enviarTelemetriaAscii();
+    }
   }
 }
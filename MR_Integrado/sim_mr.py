@@ -0,0 +1,480 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import fcntl
+import math
+import os
+import random
+import select
+import struct
+import sys
+import termios
+import threading
+import time
+import tty
+from collections import deque
+
+import serial
+
+import rutas_mpu_mr as rutas
+from mapa_mr import normalizar_angulo
+from odometria_mr import METROS_POR_PULSO
+from protocolo_mr import FORMATO_CMD, FORMATO_TEL, LARGO_CMD, SYNC_CMD, SYNC_TEL, TIPO_PWM, TIPO_TEL, crc8
+
+# ==========================================
+# SIMULACIÓN SIN HARDWARE
+# Corre ejecutar_secuencia_mpu tal cual, pero contra:
+#  - SMBusSimulado: MPU6050 con gyro X = velocidad de giro del modelo
+#    + bias + ruido.
+#  - ESP32Simulado: un pty por lado que se comporta como
+#    serial_minirover.ino (ASCII o binario, telemetría cada 20 ms).
+#  - Modelo cinemático de tracción diferencial con retardo de motor y
+#    asimetría opcional entre lados.
+#  - RelojVirtual: el tiempo avanza solo cuando el lazo duerme, así
+#    que una ruta de 10 minutos se corre en segundos.
+#
+# Uso:  python sim_mr.py TORRE [RAMPA ...]
+#   MR_SIM_FACTOR=0   lo más rápido posible (o N = N veces tiempo real)
+#   MR_SIM_ASIMETRIA  p. ej. 0.03 = el lado derecho avanza 3 % menos
+#   MR_SIM_TOLERANCIA error máximo de posición final (m); si se pasa,
+#                     el proceso sale con código 1.
+# ==========================================
+
+FACTOR = float(os.environ.get("MR_SIM_FACTOR", "0"))
+TOLERANCIA_M = float(os.environ.get("MR_SIM_TOLERANCIA", "1.0"))
+SEMILLA = int(os.environ.get("MR_SIM_SEMILLA", "0"))
+# Fracción que el lado derecho avanza de menos. Ojo: con la vía del
+# modelo, 5 % de asimetría son ~0.8 °/s de deriva, justo la DEADZONE
+# del MPU; una deriva menor no la ve el giroscopio y no se corrige.
+ASIMETRIA = float(os.environ.get("MR_SIM_ASIMETRIA", "0"))
+
+PASO_FISICA_NS = 1_000_000          # 1 ms de mundo por paso
+PERIODO_ESP_NS = 20_000_000         # loop del firmware (PERIOD = 20 ms)
+VENTANA_VEL = 10                    # WIN_SIZE del firmware
+TIMEOUT_SINCRONIZAR = 0.1           # s reales esperando a que se lea la telemetría
+
+# Modelo del rover (aproximado; ajustar contra mediciones reales)
+VEL_POR_PWM = 1.0 / (7.0 * 1000.0)  # m/s por unidad de PWM (7 s/m a PWM 1000)
+PWM_MUERTO = 80                     # por debajo de esto los motores no se mueven
+CONSTANTE_MOTOR_S = 0.08            # retardo de primer orden de cada lado
+ANCHO_EFECTIVO_M = 0.25             # vía efectiva entre las orugas
+
+GYRO_BIAS_DPS = 0.6
+GYRO_RUIDO_DPS = 0.05
+
+
+class SMBusSimulado:
+    """
+    Lo que MPU_Gyro_X_Only usa de smbus2.SMBus. Solo modo directo
+    (la FIFO siempre reporta 0 bytes).
+    """
+
+    def __init__(self, mundo, bias_dps=GYRO_BIAS_DPS, ruido_dps=GYRO_RUIDO_DPS):
+        self.mundo = mundo
+        self.bias_dps = bias_dps
+        self.ruido_dps = ruido_dps
+        self.registros = {}
+
+    def _gyro_x(self):
+        dps = self.mundo.omega_dps + self.bias_dps + self.mundo.azar.gauss(0.0, self.ruido_dps)
+        raw = int(round(dps * rutas.GYRO_LSB_POR_DPS))
+        return max(-32768, min(32767, raw))
+
+    def write_byte_data(self, address, registro, valor):
+        self.registros[registro] = valor
+
+    def read_byte_data(self, address, registro):
+        return self.registros.get(registro, 0) if registro != rutas.REG_INT_STATUS else 0
+
+    def read_i2c_block_data(self, address, registro, n):
+        # Bloque 0x3B..0x48: accel (0, 0, 1 g), temperatura 25 °C, gyro (x, 0, 0)
+        temp = int(round((25.0 - 36.53) * 340.0))
+        bloque = struct.pack(">hhhhhhh", 0, 0, int(rutas.ACCEL_LSB_POR_G), temp, self._gyro_x(), 0, 0)
+        inicio = registro - rutas.REG_ACCEL_XOUT_H
+        if 0 <= inicio < len(bloque):
+            datos = bloque[inicio:inicio + n]
+            return list(datos) + [0] * (n - len(datos))
+        return [0] * n
+
+    def close(self):
+        pass
+
+
+class ESP32Simulado:
+    """
+    Un lado del rover: serial_minirover.ino detrás de un pty. `ruta` es
+    el dispositivo que se abre con serial.Serial como si fuera /dev/ttyUSBx.
+    """
+
+    def __init__(self, nombre, ganancia=1.0):
+        self.nombre = nombre
+        self.ganancia = ganancia
+
+        self.maestro, self.esclavo = os.openpty()
+        tty.setraw(self.esclavo)
+        os.set_blocking(self.maestro, False)
+        self.ruta = os.ttyname(self.esclavo)
+
+        # Estado del firmware
+        self.modo_binario = False
+        self.pwm_comando = 0
+        self.pwm_aplicado = 0
+        self.cnt = 0.0              # pulsos (los dos motores del lado van juntos)
+        self.cnt_ultimo = 0
+        self.vel = deque([0.0] * VENTANA_VEL, maxlen=VENTANA_VEL)
+        self.seq_tel = 0
+        self.t_ns = 0
+        self.siguiente_ns = PERIODO_ESP_NS
+        self.conectado = False      # ya llegó algo del PC
+        self.t_primer_pwm = None    # perf_counter() del primer PWM != 0 (bench_mr)
+
+        self._rx = bytearray()
+        self._ultimos4 = b""
+        self.errores_crc = 0
+        self.bytes_perdidos = 0
+
+        # Física del lado
+        self.vel_ms = 0.0
+
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        # El hilo atiende al PC aunque el reloj virtual no avance
+        # (p. ej. durante negociar_binario, que espera en tiempo real)
+        self._hilo = threading.Thread(target=self._run, name=f"ESP32Sim-{nombre}", daemon=True)
+        self._hilo.start()
+
+    # ---------- Serial ----------
+
+    def _escribir(self, datos):
+        try:
+            n = os.write(self.maestro, datos)
+        except (BlockingIOError, OSError):
+            n = 0
+        # Como el UART real: si nadie lee, se pierde
+        self.bytes_perdidos += len(datos) - n
+
+    def pendientes(self) -> int:
+        """
+        Bytes escritos por el ESP32 que el PC aún no leyó.
+        """
+        try:
+            return struct.unpack("i", fcntl.ioctl(self.esclavo, termios.FIONREAD, b"\0\0\0\0"))[0]
+        except OSError:
+            return 0
+
+    def atender(self) -> None:
+        """
+        Procesa los bytes que mandó el PC.
+        """
+        with self._lock:
+            try:
+                datos = os.read(self.maestro, 4096)
+            except (BlockingIOError, OSError):
+                return
+            if not datos:
+                return
+            self.conectado = True
+            for b in datos:
+                if self.modo_binario:
+                    self._byte_binario(b)
+                else:
+                    self._byte_ascii(b)
+            if self.pwm_comando != 0 and self.t_primer_pwm is None:
+                self.t_primer_pwm = time.perf_counter()
+
+    def _byte_ascii(self, b):
+        if b != 0x0A:
+            self._rx.append(b)
+            return
+        linea = self._rx.decode("ascii", "replace").strip()
+        self._rx.clear()
+        if linea == "BIN":
+            self.modo_binario = True
+            self._escribir(b"BIN OK\r\n")
+            return
+        if linea == "ASC":
+            self._escribir(b"ASC OK\r\n")
+            return
+        # String.toInt(): número inicial o 0
+        numero = ""
+        for i, c in enumerate(linea):
+            if c.isdigit() or (i == 0 and c in "+-"):
+                numero += c
+            else:
+                break
+        try:
+            valor = int(numero)
+        except ValueError:
+            valor = 0
+        self.pwm_comando = max(-1023, min(1023, valor))
+
+    def _byte_binario(self, b):
+        self._ultimos4 = (self._ultimos4 + bytes((b,)))[-4:]
+        if self._ultimos4 == b"BIN\n":
+            self._rx.clear()
+            self._escribir(b"BIN OK\r\n")
+            return
+        if self._ultimos4 == b"ASC\n":
+            self._rx.clear()
+            self.modo_binario = False
+            self._escribir(b"ASC OK\r\n")
+            return
+        if not self._rx and b != SYNC_CMD:
+            return
+        self._rx.append(b)
+        if len(self._rx) < LARGO_CMD:
+            return
+        trama = bytes(self._rx)
+        self._rx.clear()
+        if crc8(trama[1:-1]) != trama[-1]:
+            self.errores_crc += 1
+            return
+        _, tipo, _, pwm = struct.unpack_from(FORMATO_CMD, trama)
+        if tipo == TIPO_PWM:
+            self.pwm_comando = max(-1023, min(1023, pwm))
+
+    def _run(self):
+        while not self._parar.is_set():
+            try:
+                listo, _, _ = select.select([self.maestro], [], [], 0.01)
+            except (OSError, ValueError):
+                break
+            if listo:
+                self.atender()
+
+    # ---------- Firmware + física ----------
+
+    def avanzar(self, dt_ns: int) -> float:
+        """
+        Avanza dt_ns: motor, encoders y el loop de 20 ms del firmware.
+        Devuelve la velocidad del lado (m/s).
+        """
+        dt = dt_ns / 1e9
+        pwm = self.pwm_aplicado
+        objetivo = 0.0 if abs(pwm) < PWM_MUERTO else pwm * VEL_POR_PWM * self.ganancia
+        self.vel_ms += (objetivo - self.vel_ms) * min(1.0, dt / CONSTANTE_MOTOR_S)
+        self.cnt += self.vel_ms * dt / METROS_POR_PULSO
+
+        self.t_ns += dt_ns
+        if self.t_ns >= self.siguiente_ns:
+            self.siguiente_ns += PERIODO_ESP_NS
+            self._loop_firmware()
+        return self.vel_ms
+
+    def _loop_firmware(self):
+        cnt = int(self.cnt)
+        self.vel.append((cnt - self.cnt_ultimo) * 0.0865)
+        self.cnt_ultimo = cnt
+        vel = sum(self.vel) / VENTANA_VEL
+        with self._lock:
+            self.pwm_aplicado = self.pwm_comando
+            pwm = self.pwm_comando
+            binario = self.modo_binario
+        if binario:
+            cuerpo = struct.pack(
+                FORMATO_TEL, SYNC_TEL, TIPO_TEL, self.seq_tel, pwm, cnt, cnt,
+                int(vel * 100), int(vel * 100), (self.t_ns // 1_000_000) & 0xFFFFFFFF,
+            )
+            self.seq_tel = (self.seq_tel + 1) & 0xFF
+            self._escribir(cuerpo + bytes((crc8(cuerpo[1:]),)))
+        else:
+            self._escribir(
+                f"A pwm:{pwm} vel:{vel:.2f} cnt:{cnt}   |   B pwm:{pwm} vel:{vel:.2f} cnt:{cnt}\r\n".encode()
+            )
+
+    def cerrar(self) -> None:
+        self._parar.set()
+        self._hilo.join(timeout=1.0)
+        for fd in (self.maestro, self.esclavo):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class RelojVirtual:
+    """
+    Reloj que se pasa a ejecutar_secuencia_mpu y a MPU_Gyro_X_Only.
+    sleep() avanza el mundo en pasos de 1 ms en vez de dormir; con
+    factor > 0 además duerme lo necesario para ir a `factor` x tiempo real.
+    """
+
+    def __init__(self, mundo, factor=FACTOR):
+        self.mundo = mundo
+        self.factor = factor
+        self.t_ns = 0
+
+    def monotonic_ns(self) -> int:
+        return self.t_ns
+
+    def monotonic(self) -> float:
+        return self.t_ns / 1e9
+
+    def sleep(self, segundos: float) -> None:
+        t0 = time.perf_counter()
+        fin = self.t_ns + max(0, math.ceil(segundos * 1e9))
+        while self.t_ns < fin:
+            paso = min(PASO_FISICA_NS, fin - self.t_ns)
+            self.mundo.avanzar(paso)
+            self.t_ns += paso
+        self.mundo.sincronizar()
+        if self.factor > 0:
+            restante = segundos / self.factor - (time.perf_counter() - t0)
+            if restante > 0:
+                time.sleep(restante)
+
+
+class Simulador:
+    """
+    Mundo completo: pose del rover, los dos ESP32 y el MPU.
+    x hacia donde mira al inicio, y a su izquierda, rumbo + = izquierda
+    (mismas convenciones que mapa_mr).
+    """
+
+    def __init__(self, factor=FACTOR, semilla=SEMILLA, asimetria=ASIMETRIA):
+        self.azar = random.Random(semilla)
+        self.x = 0.0
+        self.y = 0.0
+        self.rumbo = 0.0            # rad
+        self.omega_dps = 0.0
+
+        self.left = ESP32Simulado("LEFT")
+        self.right = ESP32Simulado("RIGHT", 1.0 - asimetria)
+        self.reloj = RelojVirtual(self, factor)
+        self.bus = SMBusSimulado(self)
+
+        self.esp_left = serial.Serial(self.left.ruta, rutas.BAUDRATE, timeout=0.05)
+        self.esp_right = serial.Serial(self.right.ruta, rutas.BAUDRATE, timeout=0.05)
+        self.mpu = rutas.MPU_Gyro_X_Only(
+            modo="directo", bus=self.bus, reloj=self.reloj.monotonic, dormir=self.reloj.sleep
+        )
+
+    def avanzar(self, dt_ns: int) -> None:
+        for esp in (self.left, self.right):
+            esp.atender()
+        vl = self.left.avanzar(dt_ns)
+        vr = self.right.avanzar(dt_ns)
+        dt = dt_ns / 1e9
+        omega = (vr - vl) / ANCHO_EFECTIVO_M
+        v = (vl + vr) / 2.0
+        self.rumbo += omega * dt
+        self.x += v * math.cos(self.rumbo) * dt
+        self.y += v * math.sin(self.rumbo) * dt
+        self.omega_dps = math.degrees(omega)
+
+    def sincronizar(self) -> None:
+        """
+        Espera (en tiempo real) a que los lectores de telemetría lean lo
+        que mandaron los ESP32, para que el lazo no vea datos atrasados.
+        """
+        limite = time.monotonic() + TIMEOUT_SINCRONIZAR
+        for esp in (self.left, self.right):
+            if not esp.conectado:
+                continue
+            previo = esp.pendientes()
+            while previo > 0 and time.monotonic() < limite:
+                time.sleep(0.0005)
+                ahora = esp.pendientes()
+                if ahora == previo:
+                    break   # nadie está leyendo (p. ej. entre rutas)
+                previo = ahora
+
+    def pose(self):
+        """
+        (x [m], y [m], rumbo [°]).
+        """
+        return self.x, self.y, normalizar_angulo(math.degrees(self.rumbo))
+
+    def ejecutar_secuencia(self, secuencia, nombre, hz=rutas.FRECUENCIA_CONTROL_HZ) -> bool:
+        # El muestreador en hilo usa su propio reloj real: en simulación
+        # el ángulo se lee en cada tick del lazo.
+        return rutas.ejecutar_secuencia_mpu(
+            secuencia, nombre, mpu=self.mpu, esp_left=self.esp_left, esp_right=self.esp_right,
+            hz=hz, imu_en_hilo=False, reloj=self.reloj,
+        )
+
+    def cerrar(self) -> None:
+        for puerto in (self.esp_left, self.esp_right):
+            try:
+                puerto.close()
+            except Exception:
+                pass
+        self.left.cerrar()
+        self.right.cerrar()
+
+
+def pose_esperada(secuencia, x=0.0, y=0.0, rumbo=0.0):
+    """
+    Pose final ideal (x, y, rumbo °) de una secuencia de pasos.
+    """
+    for paso in secuencia:
+        if paso[3] == 0:
+            distancia = paso[4] if len(paso) > 4 else 0.0
+            x += distancia * math.cos(math.radians(rumbo))
+            y += distancia * math.sin(math.radians(rumbo))
+        else:
+            rumbo = normalizar_angulo(rumbo + paso[3])
+    return x, y, rumbo
+
+
+def simular_ruta(nombre_ruta: str, hz=rutas.FRECUENCIA_CONTROL_HZ, factor=FACTOR, semilla=SEMILLA):
+    """
+    Corre una ruta de RUTAS en un mundo nuevo. Devuelve
+    (completada, error_posición_m, error_rumbo_°, segundos_virtuales, segundos_reales).
+    """
+    secuencia = rutas.RUTAS.get(nombre_ruta.upper())
+    if secuencia is None:
+        raise KeyError(nombre_ruta)
+    sim = Simulador(factor=factor, semilla=semilla)
+    t0 = time.perf_counter()
+    try:
+        completada = sim.ejecutar_secuencia(secuencia, nombre_ruta.upper(), hz=hz)
+    finally:
+        sim.cerrar()
+    real = time.perf_counter() - t0
+    x, y, rumbo = sim.pose()
+    ex, ey, erumbo = pose_esperada(secuencia)
+    return (
+        completada,
+        math.hypot(x - ex, y - ey),
+        abs(normalizar_angulo(rumbo - erumbo)),
+        sim.reloj.monotonic(),
+        real,
+    )
+
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or ["TORRE"]
+    fallas = 0
+    resumen = []
+    for nombre in nombres:
+        try:
+            completada, error_m, error_grados, t_virtual, t_real = simular_ruta(nombre)
+        except KeyError:
+            print(f"[SIM] Ruta '{nombre}' no definida.")
+            fallas += 1
+            continue
+        ok = completada and error_m <= TOLERANCIA_M
+        fallas += not ok
+        resumen.append(
+            f"[SIM] {nombre.upper()}: {'OK' if ok else 'FALLA'} | error final {error_m:.2f} m, "
+            f"{error_grados:.1f}° | {t_virtual:.0f} s simulados en {t_real:.1f} s reales"
+        )
+    print()
+    for linea in resumen:
+        print(linea)
+    sys.exit(1 if fallas else 0)
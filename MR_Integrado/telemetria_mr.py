@@ -0,0 +1,198 @@
+'''Copyright 2025 Jesús Emiliano García Jiménez
+             2025 Héctor Castillo Guerra
+             2025 Andrés Méndez Cortez
+             2025 Nabor Sebastían Toro García
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.'''
+
+import re
+import threading
+import time
+from array import array
+
+from protocolo_mr import DecodificadorTelemetria
+
+# ==========================================
+# LECTOR DE TELEMETRÍA DEL ESP32
+# serial_minirover.ino imprime cada 20 ms:
+#   "A pwm:<int> vel:<float> cnt:<int>   |   B pwm:<int> vel:<float> cnt:<int>"
+# (el firmware viejo no manda "cnt:", en ese caso los contadores quedan en 0)
+# Un hilo por puerto lee lo que haya llegado, separa líneas y guarda
+# (t, pwm, velA, velB, cntA, cntB) en un buffer circular. El lazo de
+# control solo lee `ultimo` (tupla reemplazada completa, sin lock).
+# Con binario=True se decodifican las tramas de protocolo_mr.
+# ==========================================
+
+CAPACIDAD_BUFFER = 1024
+MAX_LINEA = 128   # una línea más larga que esto es basura (se descarta)
+
+PATRON_TELEMETRIA = re.compile(
+    rb"A pwm:(-?\d+) vel:(-?[\d.]+)(?: cnt:(-?\d+))?"
+    rb"\s*\|\s*B pwm:(-?\d+) vel:(-?[\d.]+)(?: cnt:(-?\d+))?"
+)
+
+# Líneas del firmware que no son telemetría pero tampoco son error
+LINEAS_CONOCIDAS = (b"PWM DIRECTO READY",)
+
+
+class LectorTelemetria:
+    def __init__(self, puerto, nombre="ESP32", capacidad=CAPACIDAD_BUFFER, binario=False):
+        """
+        `puerto` es un serial.Serial ya abierto (con timeout > 0).
+        Se puede seguir escribiendo en él desde otro hilo.
+        """
+        self.puerto = puerto
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.binario = binario
+        self.decodificador = DecodificadorTelemetria() if binario else None
+
+        # Buffer circular
+        self.t = array("d", bytes(8 * capacidad))
+        self.pwm = array("l", bytes(array("l").itemsize * capacidad))
+        self.vel_a = array("f", bytes(4 * capacidad))
+        self.vel_b = array("f", bytes(4 * capacidad))
+        self.cnt_a = array("l", bytes(array("l").itemsize * capacidad))
+        self.cnt_b = array("l", bytes(array("l").itemsize * capacidad))
+        self.n = 0
+
+        # (t, pwm, velA, velB, cntA, cntB) de la última muestra válida, o None
+        self.ultimo = None
+        # True si el firmware manda los contadores de encoder
+        self.con_encoders = binario
+
+        # Contadores
+        self.lineas = 0
+        self.errores_parseo = 0
+        self.descartadas = 0
+        self.bytes_leidos = 0
+
+        self._pendiente = bytearray()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    # ---------- API ----------
+
+    def velocidades(self):
+        """
+        (velA, velB) de la última muestra, o (0.0, 0.0) si aún no hay.
+        """
+        u = self.ultimo
+        if u is None:
+            return 0.0, 0.0
+        return u[2], u[3]
+
+    def edad(self) -> float:
+        """
+        Segundos desde la última muestra válida (inf si no hay).
+        """
+        u = self.ultimo
+        return time.monotonic() - u[0] if u is not None else float("inf")
+
+    def estadisticas(self) -> str:
+        if self.binario:
+            d = self.decodificador
+            return (
+                f"[TELEMETRIA {self.nombre}] tramas {d.tramas} | errores CRC {d.errores_crc} | "
+                f"perdidas (seq) {d.seq_perdidas} | bytes {self.bytes_leidos}"
+            )
+        return (
+            f"[TELEMETRIA {self.nombre}] líneas {self.lineas} | errores {self.errores_parseo} | "
+            f"descartadas {self.descartadas} | bytes {self.bytes_leidos}"
+        )
+
+    # ---------- Hilo ----------
+
+    def iniciar(self) -> None:
+        try:
+            # Lo acumulado antes de empezar ya no sirve
+            self.puerto.reset_input_buffer()
+        except Exception:
+            pass
+        self._parar.clear()
+        self._hilo = threading.Thread(
+            target=self._run, name=f"Telemetria-{self.nombre}", daemon=True
+        )
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1.0)
+            self._hilo = None
+
+    def _run(self):
+        while not self._parar.is_set():
+            try:
+                datos = self.puerto.read(self.puerto.in_waiting or 1)
+            except Exception:
+                # Puerto cerrado o desconectado
+                break
+            if datos:
+                self.bytes_leidos += len(datos)
+                self.procesar(datos, time.monotonic())
+
+    def procesar(self, datos: bytes, t: float) -> None:
+        """
+        Agrega bytes recibidos y procesa las líneas/tramas completas.
+        """
+        if self.binario:
+            for pwm, cnt_a, cnt_b, vel_a, vel_b, _t_ms in self.decodificador.procesar(datos):
+                self._guardar(t, pwm, vel_a, vel_b, cnt_a, cnt_b)
+            return
+
+        self._pendiente += datos
+        *lineas, resto = self._pendiente.split(b"\n")
+        if len(resto) > MAX_LINEA:
+            self.descartadas += 1
+            resto = b""
+        self._pendiente = bytearray(resto)
+
+        for linea in lineas:
+            self._procesar_linea(linea.strip(), t)
+
+    def _procesar_linea(self, linea: bytes, t: float) -> None:
+        if not linea:
+            return
+        if len(linea) > MAX_LINEA:
+            self.descartadas += 1
+            return
+        m = PATRON_TELEMETRIA.search(linea)
+        if m is None:
+            if linea not in LINEAS_CONOCIDAS:
+                self.errores_parseo += 1
+            return
+        try:
+            pwm = int(m.group(1))
+            vel_a = float(m.group(2))
+            vel_b = float(m.group(5))
+            cnt_a = int(m.group(3) or 0)
+            cnt_b = int(m.group(6) or 0)
+        except ValueError:
+            self.errores_parseo += 1
+            return
+        if m.group(3) is not None and m.group(6) is not None:
+            self.con_encoders = True
+        self._guardar(t, pwm, vel_a, vel_b, cnt_a, cnt_b)
+
+    def _guardar(self, t, pwm, vel_a, vel_b, cnt_a=0, cnt_b=0):
+        k = self.n % self.capacidad
+        self.t[k] = t
+        self.pwm[k] = pwm
+        self.vel_a[k] = vel_a
+        self.vel_b[k] = vel_b
+        self.cnt_a[k] = cnt_a
+        self.cnt_b[k] = cnt_b
+        self.n += 1
+        self.lineas += 1
+        self.ultimo = (t, pwm, vel_a, vel_b, cnt_a, cnt_b)
@@ -15,22 +15,40 @@
    See the License for the specific language governing permissions and
    limitations under the License.'''
 
+import io
 import os
+import re
 import sys
 import cv2
+import math
 import time
-import pygame  # Para reproducir el audio
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from gtts import gTTS  # Librería de voz (Google Text-to-Speech)
 
 from google import genai
 from google.genai import types
 from google.genai.errors import APIError
 
+import altavoz_mr
+import cache_tts_mr
+import cache_vision_mr
+import camara_mr
+
+try:
+    import httpx  # lo usa google-genai por dentro
+    NETWORK_ERRORS = (httpx.TransportError, OSError)
+except ImportError:
+    NETWORK_ERRORS = (OSError,)
+
 # =================================================================
 # CONFIGURACIÓN Y PARÁMETROS FIJOS
 # =================================================================
 
-# Directorio donde se guardará la imagen.
+# Dónde guarda capture_and_save_image la imagen (para revisarla; describir
+# el entorno ya no pasa por disco).
 IMAGE_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "test")
 IMAGE_FILENAME = "captured_image.jpg"
 IMAGE_PATH = os.path.join(IMAGE_DIR, IMAGE_FILENAME)
@@ -39,6 +57,49 @@ IMAGE_PATH = os.path.join(IMAGE_DIR, IMAGE_FILENAME)
 MODEL_NAME = "gemini-2.5-flash"
 CAMERA_INDEX = 0
 
+# Cliente de Gemini (ver GeminiClientManager):
+#   MR_GEMINI_TIMEOUT_S: límite por intento
+#   MR_GEMINI_REINTENTOS: reintentos ante errores de red, 429 o 5xx
+GEMINI_TIMEOUT_S = float(os.environ.get("MR_GEMINI_TIMEOUT_S", "15"))
+GEMINI_RETRIES = int(os.environ.get("MR_GEMINI_REINTENTOS", "2"))
+GEMINI_BACKOFF_S = 0.5
+RETRYABLE_CODES = (408, 429, 500, 502, 503, 504)
+
+# Respuesta en streaming: cada oración se sintetiza y se reproduce en
+# cuanto llega, sin esperar el resto del texto (MR_VISION_STREAMING=0
+# vuelve a esperar la respuesta completa). Oraciones más cortas que
+# MIN_SENTENCE_CHARS se juntan con la siguiente para no cortar el audio.
+STREAMING = os.environ.get("MR_VISION_STREAMING", "1") == "1"
+MIN_SENTENCE_CHARS = 25
+SENTENCE_END = re.compile(r"[.!?…]+[\"»)\]]*\s+")
+
+# Si Gemini tarda más que esto se avisa al usuario mientras se espera
+WAIT_NOTICE_S = float(os.environ.get("MR_AVISO_ESPERA_S", "1.5"))
+WAIT_NOTICE_TEXT = "Un momento, estoy mirando."
+
+# Voz de gTTS (también forma parte de la llave del cache de audio)
+TTS_ENGINE = "gtts"
+TTS_LANG = "es"
+TTS_TLD = "com.mx"   # acento de México
+
+# Frases fijas del sistema: su audio se genera al arrancar (warm_tts_cache)
+# para que suenen al instante y sin red
+SYSTEM_PHRASES = (WAIT_NOTICE_TEXT,)
+
+# Imagen que se sube a Gemini (ver prepare_image):
+#   MR_VISION_LADO:    lado mayor en px (0 = resolución de la cámara)
+#   MR_VISION_FORMATO: "jpeg" o "webp"
+#   MR_VISION_BYTES:   tamaño máximo del archivo (0 = sin límite)
+#   MR_VISION_ROI:     "x0,y0,x1,y1" en fracciones del frame (vacío = todo)
+UPLOAD_MAX_SIDE = int(os.environ.get("MR_VISION_LADO", "768"))
+UPLOAD_FORMAT = os.environ.get("MR_VISION_FORMATO", "jpeg")
+UPLOAD_MAX_BYTES = int(os.environ.get("MR_VISION_BYTES", "60000"))
+UPLOAD_ROI = os.environ.get("MR_VISION_ROI", "")
+QUALITY_MAX = 85
+QUALITY_MIN = 35
+SHRINK_STEP = 0.75
+MAX_SHRINKS = 3
+
 # Prompt fijo
 FIXED_PROMPT = (
     "Describe detalladamente qué ves en la imagen y el entorno que está en la imagen, "
@@ -48,90 +109,271 @@ FIXED_PROMPT = (
 
 # =================================================================
 # FUNCIÓN DE SÍNTESIS DE VOZ (gTTS + PYGAME)
+# El audio sale por el servicio de altavoz_mr: el mixer se inicia una
+# sola vez y un comando nuevo puede cortar lo que se está diciendo
+# (stop_speaking). Las funciones que hablan aceptan `turn`
+# (altavoz_mr.ServicioAudio.turno()): si hubo un barge-in desde
+# entonces, ya no suenan.
 # =================================================================
 
-def read_text_aloud(text_to_speak: str) -> None:
+def read_text_aloud(text_to_speak: str, turn=None) -> None:
     """
     Convierte texto a audio usando Google TTS (gTTS) y lo reproduce
     con acento de México (tld='com.mx') para mayor naturalidad.
+    Las frases ya dichas salen del cache de audio.
     """
     print("\n[TTS] Generando audio con Google TTS...")
-    output_file = "temp_gtts_audio.mp3"
 
     try:
-        # 1. Generar el objeto de audio con gTTS
-        tts = gTTS(text=text_to_speak, lang='es', tld='com.mx')
+        play_audio_bytes(synthesize_speech(text_to_speak), turn=turn)
+    except Exception as e:
+        print(f"[ERROR TTS] No se pudo generar o reproducir el audio. Error: {e}")
 
-        # 2. Guardar el archivo mp3
-        tts.save(output_file)
+def _gtts_bytes(text: str) -> bytes:
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=TTS_LANG, tld=TTS_TLD).write_to_fp(buffer)
+    return buffer.getvalue()
 
-        # 3. Reproducir con Pygame
-        pygame.mixer.init()
-        pygame.mixer.music.load(output_file)
-        pygame.mixer.music.play()
 
-        # Esperar a que termine de hablar
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+def synthesize_speech(text: str) -> bytes:
+    """
+    MP3 de gTTS en memoria (sin archivo temporal), del cache si la frase
+    ya se había generado.
+    """
+    return tts_cache.obtener(text, TTS_LANG, TTS_TLD, TTS_ENGINE, lambda: _gtts_bytes(text))
 
-        pygame.mixer.quit()
 
-    except Exception as e:
-        print(f"[ERROR TTS] No se pudo generar o reproducir el audio. Error: {e}")
+def warm_tts_cache(phrases=SYSTEM_PHRASES) -> int:
+    """
+    Genera el audio de las frases que aún no estén en el cache.
+    Devuelve cuántas se generaron.
+    """
+    if not tts_cache.activo:
+        return 0
+    return tts_cache.precalentar(phrases, TTS_LANG, TTS_TLD, TTS_ENGINE, _gtts_bytes)
+
+
+def play_audio_bytes(data: bytes, priority=altavoz_mr.PRIORIDAD_NORMAL, turn=None) -> bool:
+    """
+    Reproduce un MP3 en memoria y espera a que termine.
+    Devuelve False si se interrumpió.
+    """
+    return altavoz_mr.servicio().reproducir(data, priority, turno=turn).esperar()
+
+
+def current_turn() -> int:
+    return altavoz_mr.servicio().turno()
 
-    finally:
-        # 4. Limpieza del archivo temporal
-        if os.path.exists(output_file):
+
+def stop_speaking() -> None:
+    """
+    Barge-in: corta lo que se esté diciendo y lo que falte por decir.
+    """
+    altavoz_mr.callar()
+
+
+def speak_sentences(sentences, notice_after_s=None, turn=None) -> bool:
+    """
+    Habla oraciones conforme llegan: un hilo sintetiza la siguiente
+    mientras suena la actual. `sentences` puede ser un iterable o una
+    queue.Queue terminada en None. Si la primera tarda más de
+    `notice_after_s`, se dice WAIT_NOTICE_TEXT mientras tanto.
+    Devuelve False si se interrumpió (barge-in).
+    """
+    if not isinstance(sentences, queue.Queue):
+        pending = queue.Queue()
+        for sentence in sentences:
+            pending.put(sentence)
+        pending.put(None)
+        sentences = pending
+
+    speaker = altavoz_mr.servicio()
+    if turn is None:
+        turn = speaker.turno()
+    clips = queue.Queue()
+    stopped = threading.Event()
+
+    def synthesize():
+        try:
+            while not stopped.is_set():
+                sentence = sentences.get()
+                if sentence is None:
+                    break
+                try:
+                    clips.put(speaker.reproducir(synthesize_speech(sentence), turno=turn))
+                except Exception as e:
+                    print(f"[ERROR TTS] No se pudo generar el audio de {sentence!r}. Error: {e}")
+        finally:
+            clips.put(None)
+
+    threading.Thread(target=synthesize, name="TTS", daemon=True).start()
+
+    first = True
+    while True:
+        try:
+            clip = clips.get(timeout=notice_after_s if first else None)
+        except queue.Empty:
             try:
-                os.remove(output_file)
-            except Exception:
-                pass  # Ignorar errores al borrar
+                speaker.reproducir(synthesize_speech(WAIT_NOTICE_TEXT), altavoz_mr.PRIORIDAD_AVISO, turno=turn)
+            except Exception as e:
+                print(f"[ERROR TTS] No se pudo generar el aviso. Error: {e}")
+            clip = clips.get()
+        first = False
+        if clip is None:
+            return speaker.turno() == turn
+        if not clip.esperar() and clip.error is None:
+            stopped.set()
+            return False
+
+# =================================================================
+# CLIENTE DE GEMINI PERSISTENTE
+# Un solo genai.Client para todo el proceso: su cliente HTTP mantiene
+# las conexiones abiertas (keep-alive), así que solo la primera
+# descripción paga la configuración y el handshake TLS. Las llamadas
+# pueden ir a un hilo (send_prompt_to_gemini_async) para que quien llama
+# siga trabajando, por ejemplo avisando "un momento" por voz.
+# =================================================================
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIError):
+        return getattr(error, "code", None) in RETRYABLE_CODES
+    return isinstance(error, NETWORK_ERRORS)
+
+
+class GeminiClientManager:
+    def __init__(self, timeout_s=GEMINI_TIMEOUT_S, retries=GEMINI_RETRIES, backoff_s=GEMINI_BACKOFF_S):
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._client = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """
+        El cliente compartido; se crea la primera vez (busca GOOGLE_API_KEY).
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = genai.Client(
+                    http_options=types.HttpOptions(timeout=int(self.timeout_s * 1000))
+                )
+            return self._client
+
+    def reset(self) -> None:
+        """
+        Descarta el cliente (p. ej. tras un error de conexión); el siguiente
+        uso crea uno nuevo.
+        """
+        with self._lock:
+            self._client = None
+
+    def generate_content(self, contents):
+        """
+        generate_content con reintentos y espera exponencial (con jitter)
+        ante errores de red, 429 y 5xx. Los demás errores se lanzan igual.
+        """
+        return self._with_retries(
+            lambda: self.client().models.generate_content(model=MODEL_NAME, contents=contents)
+        )
+
+    def generate_content_stream(self, contents):
+        """
+        Genera los pedazos de texto de la respuesta conforme llegan. Solo se
+        reintenta hasta recibir el primero (después ya se habló parte).
+        """
+        def open_stream():
+            stream = iter(self.client().models.generate_content_stream(model=MODEL_NAME, contents=contents))
+            return next(stream, None), stream
+
+        first, stream = self._with_retries(open_stream)
+        for chunk in ([first] if first is not None else []):
+            if chunk.text:
+                yield chunk.text
+        for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    def _with_retries(self, call):
+        backoff = self.backoff_s
+        for attempt in range(self.retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    raise
+                print(f"[GEMINI] Intento {attempt + 1} falló ({e}); reintentando en {backoff:.1f} s")
+                if not isinstance(e, APIError):
+                    self.reset()
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+                backoff *= 2
+
+    def submit(self, function, *args):
+        """
+        Corre function(*args) en el hilo de Gemini y devuelve un Future.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Gemini")
+        return self._executor.submit(function, *args)
+
+
+gemini = GeminiClientManager()
+
+# Descripciones recientes por escena (ver cache_vision_mr)
+description_cache = cache_vision_mr.CacheDescripciones()
+
+# Audio ya sintetizado por frase (ver cache_tts_mr)
+tts_cache = cache_tts_mr.CacheTTS()
 
 # =================================================================
 # FUNCIÓN DE LLAMADA A LA API DE GEMINI
 # =================================================================
 
-def send_prompt_to_gemini_multimodal(prompt_text: str, image_path: str) -> str:
+def _build_messages(prompt_text: str, image):
+    parts = []
+
+    # 1. Procesar la imagen y construir la parte binaria
+    if isinstance(image, bytes):
+        image_data = image
+    else:
+        with open(image, "rb") as f:
+            image_data = f.read()
+    mime_type = _mime_type(image_data)
+
+    parts.append(
+        types.Part.from_bytes(
+            data=image_data,
+            mime_type=mime_type,
+        )
+    )
+
+    # 2. Construir la parte del texto
+    parts.append(types.Part(text=prompt_text))
+
+    return [types.Content(role="user", parts=parts)]
+
+
+def send_prompt_to_gemini_multimodal(prompt_text: str, image) -> str:
     """
     Envía texto y una imagen al modelo Gemini y devuelve el texto de respuesta.
+    `image` son los bytes JPEG/WebP (de capture_jpeg) o la ruta de un archivo.
     """
-    if not os.path.exists(image_path):
-        return f"Error: Archivo de imagen no encontrado en {image_path}"
+    if not isinstance(image, bytes) and not os.path.exists(image):
+        return f"Error: Archivo de imagen no encontrado en {image}"
 
     try:
         # El cliente busca automáticamente la variable GOOGLE_API_KEY
-        client = genai.Client()
+        gemini.client()
     except Exception as e:
         return (
             f"Error de configuración de API: {e}. "
             "Asegúrate de que GOOGLE_API_KEY esté exportada."
         )
 
-    parts = []
-
     try:
-        # 1. Procesar la imagen y construir la parte binaria
-        with open(image_path, "rb") as f:
-            image_data = f.read()
-            mime_type = "image/jpeg"
-
-        parts.append(
-            types.Part.from_bytes(
-                data=image_data,
-                mime_type=mime_type,
-            )
-        )
-
-        # 2. Construir la parte del texto
-        parts.append(types.Part(text=prompt_text))
-
-        # 3. Llamar a la API
-        messages = [types.Content(role="user", parts=parts)]
-
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=messages,
-        )
+        # Llamar a la API (cliente compartido, con reintentos)
+        response = gemini.generate_content(_build_messages(prompt_text, image))
         return response.text
 
     except APIError as e:
@@ -139,34 +381,176 @@ def send_prompt_to_gemini_multimodal(prompt_text: str, image_path: str) -> str:
     except Exception as e:
         return f"Error desconocido: {e}"
 
+
+def send_prompt_to_gemini_stream(prompt_text: str, image):
+    """
+    Pedazos de texto de la respuesta conforme los manda Gemini. A
+    diferencia de send_prompt_to_gemini_multimodal, los errores se lanzan.
+    """
+    return gemini.generate_content_stream(_build_messages(prompt_text, image))
+
+
+def split_sentences(chunks):
+    """
+    Junta los pedazos de texto y genera oraciones completas en cuanto
+    termina cada una (lo que quede al final sale como última oración).
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        for match in SENTENCE_END.finditer(pending):
+            if match.end() - start >= MIN_SENTENCE_CHARS:
+                yield pending[start:match.end()].strip()
+                start = match.end()
+        pending = pending[start:]
+    if pending.strip():
+        yield pending.strip()
+
+
+def _is_error_text(text) -> bool:
+    """
+    send_prompt_to_gemini_multimodal devuelve los errores como texto; esos no se guardan.
+    """
+    return not text or text.startswith("Error")
+
+
+def send_prompt_to_gemini_async(prompt_text: str, image):
+    """
+    Igual que send_prompt_to_gemini_multimodal pero sin bloquear: devuelve
+    un Future cuyo result() es el texto de respuesta (o el mensaje de error).
+    """
+    return gemini.submit(send_prompt_to_gemini_multimodal, prompt_text, image)
+
+# =================================================================
+# PREPARACIÓN DE LA IMAGEN ANTES DE SUBIRLA
+# Por Wi-Fi débil lo que más tarda es subir la imagen. Se recorta a la
+# región de interés, se reduce a UPLOAD_MAX_SIDE (Gemini no aprovecha
+# mucho más de 768 px) y se busca por bisección la calidad más alta que
+# cabe en UPLOAD_MAX_BYTES; si ni con QUALITY_MIN cabe, se reduce más la
+# imagen en proporción a lo que sobró. Se hace al pedir la descripción
+# (capture_image), sobre el último frame que guarda camara_mr.
+# =================================================================
+
+def parse_roi(text: str):
+    """
+    "x0,y0,x1,y1" (fracciones) -> tupla, o None si está vacío o no es válido.
+    """
+    if not text.strip():
+        return None
+    try:
+        x0, y0, x1, y1 = (float(v) for v in text.split(","))
+    except ValueError:
+        print(f"[VISION] MR_VISION_ROI inválida ({text!r}); se usa el frame completo.")
+        return None
+    if not (0.0 <= x0 < x1 <= 1.0 and 0.0 <= y0 < y1 <= 1.0):
+        print(f"[VISION] MR_VISION_ROI fuera de rango ({text!r}); se usa el frame completo.")
+        return None
+    return x0, y0, x1, y1
+
+
+def _encode(image, image_format: str, quality: int):
+    if image_format == "webp":
+        ok, buf = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    else:
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes() if ok else None
+
+
+def prepare_image(frame, max_side=UPLOAD_MAX_SIDE, image_format=UPLOAD_FORMAT,
+                  max_bytes=UPLOAD_MAX_BYTES, roi=parse_roi(UPLOAD_ROI)) -> bytes:
+    """
+    Frame BGR -> bytes JPEG/WebP recortados, reducidos y dentro del presupuesto.
+    """
+    h, w = frame.shape[:2]
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        frame = frame[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+        h, w = frame.shape[:2]
+
+    scale = min(1.0, max_side / max(h, w)) if max_side > 0 else 1.0
+    for _ in range(MAX_SHRINKS + 1):
+        if scale < 1.0:
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            image = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            image = frame
+        data = _encode(image, image_format, QUALITY_MAX)
+        if max_bytes <= 0 or len(data) <= max_bytes:
+            return data
+        smallest = _encode(image, image_format, QUALITY_MIN)
+        if len(smallest) > max_bytes:
+            # Ni con la calidad mínima cabe: reducir (los bytes van ~ con el área)
+            scale *= min(SHRINK_STEP, math.sqrt(max_bytes / len(smallest)))
+            continue
+
+        best = smallest
+        low, high = QUALITY_MIN + 1, QUALITY_MAX - 1
+        while low <= high:
+            quality = (low + high) // 2
+            candidate = _encode(image, image_format, quality)
+            if len(candidate) <= max_bytes:
+                best, low = candidate, quality + 1
+            else:
+                high = quality - 1
+        return best
+    # No cupo ni reduciendo: se manda la versión más chica
+    return smallest
+
+
+def _mime_type(data: bytes) -> str:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
 # =================================================================
 # FUNCIÓN DE CAPTURA DE WEBCAM
 # =================================================================
 
-def capture_and_save_image(path: str) -> bool:
+def start_camera() -> None:
     """
-    Captura una imagen de la webcam y la guarda en la ruta especificada.
-    Devuelve True si salió bien, False en caso contrario.
+    Abre la cámara en segundo plano (main_mr.py lo llama al arrancar) para
+    que la primera descripción ya tenga frames listos.
     """
-    print("\n[CAMARA] Iniciando captura...")
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    if not cap.isOpened():
-        print(f"Error: No se pudo abrir la cámara en el índice {CAMERA_INDEX}.")
-        return False
+    camara_mr.camara(CAMERA_INDEX)
 
-    time.sleep(1)  # Esperar un segundo para el ajuste automático
 
-    ret, frame = cap.read()
+def capture_image():
+    """
+    (bytes, frame) del frame más reciente de la cámara (camara_mr la
+    mantiene abierta). prepare_image se corre aquí, solo cuando se pide
+    una descripción, y no en el hilo de la cámara. (None, None) si no hay
+    cámara.
+    """
+    print("\n[CAMARA] Tomando el último frame...")
+    ultimo = camara_mr.camara(CAMERA_INDEX).ultimo_frame()
+    if ultimo is None:
+        print(f"Error: No se pudo leer la cámara en el índice {CAMERA_INDEX}.")
+        return None, None
+    frame = ultimo[1]
+    return prepare_image(frame), frame
 
-    if ret:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        print(f"[INFO] Imagen capturada y guardada en: {path}")
-    else:
-        print("Error: No se pudo leer el frame de la cámara.")
 
-    cap.release()
-    return ret
+def capture_jpeg():
+    """
+    Solo los bytes de capture_image(), o None si no hay cámara.
+    """
+    return capture_image()[0]
+
+
+def capture_and_save_image(path: str) -> bool:
+    """
+    Guarda el frame más reciente de la cámara en la ruta especificada.
+    Devuelve True si salió bien, False en caso contrario.
+    """
+    jpeg = capture_jpeg()
+    if jpeg is None:
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(jpeg)
+    print(f"[INFO] Imagen capturada y guardada en: {path}")
+    return True
 
 # =================================================================
 # FUNCIÓN PRINCIPAL REUTILIZABLE PARA EL MR INTEGRADO
@@ -176,7 +560,10 @@ def describir_entorno_una_vez() -> None:
     """
     Captura una imagen, la manda a Gemini, imprime la descripción
     y la lee en voz alta. Esta es la función que luego llamará main_mr.py
+    Si mientras tanto alguien llama a stop_speaking() ya no se habla más.
     """
+    turn = current_turn()
+
     # 0. Verificar la configuración de la API
     if not os.environ.get("GOOGLE_API_KEY"):
         print("\n--- ERROR DE CONFIGURACIÓN ---")
@@ -184,26 +571,92 @@ def describir_entorno_una_vez() -> None:
         print("Por favor, ejecuta: export GOOGLE_API_KEY='TuClave'")
         return
 
-    # 1. Capturar la imagen
-    if not capture_and_save_image(IMAGE_PATH):
+    # 1. Tomar la imagen (ya en memoria, sin pasar por disco)
+    image, frame = capture_image()
+    if image is None:
         print("[VISION] No se pudo capturar la imagen. Deteniendo función.")
         return
 
-    # 2. Llamar a la API de Gemini
+    # 2. Misma escena hace poco: responder del cache
+    scene_hash = cache_vision_mr.hash_frame(frame) if cache_vision_mr.ACTIVO else None
+    if scene_hash is not None:
+        response_text = description_cache.buscar(scene_hash, FIXED_PROMPT)
+        if response_text is not None:
+            print(f"[CACHE] Misma escena (hash {scene_hash:016x}): descripción guardada.")
+            _show_description(response_text)
+            if STREAMING:
+                speak_sentences(split_sentences([response_text]), turn=turn)
+            else:
+                read_text_aloud(response_text, turn=turn)
+            return
+
+    # 3. Llamar a la API de Gemini
     print(f"[PROMPT] Enviando prompt fijo: '{FIXED_PROMPT}'")
     print("[CONSULTANDO] Esperando respuesta de Gemini...")
 
-    response_text = send_prompt_to_gemini_multimodal(FIXED_PROMPT, IMAGE_PATH)
+    if STREAMING:
+        # Cada oración se habla en cuanto llega
+        response_text, ok = _describe_streaming(image, turn)
+        _show_description(response_text)
+    else:
+        future = send_prompt_to_gemini_async(FIXED_PROMPT, image)
+        try:
+            response_text = future.result(timeout=WAIT_NOTICE_S)
+        except FutureTimeoutError:
+            # Sigue en curso: avisar mientras tanto
+            read_text_aloud(WAIT_NOTICE_TEXT, turn=turn)
+            response_text = future.result()
+        ok = not _is_error_text(response_text)
+
+        # 4. Mostrar la respuesta y leerla en voz alta
+        _show_description(response_text)
+        read_text_aloud(response_text, turn=turn)
 
-    # 3. Mostrar la respuesta
+    if scene_hash is not None and ok:
+        description_cache.guardar(scene_hash, FIXED_PROMPT, response_text)
+
+
+def _show_description(text: str) -> None:
     print("\n=============================================")
     print("Descripción de Gemini:")
     print("=============================================")
-    print(response_text)
+    print(text)
     print("=============================================")
 
-    # 4. Leer la respuesta en voz alta
-    read_text_aloud(response_text)
+
+def _describe_streaming(image, turn=None):
+    """
+    Pide la descripción en streaming y la va hablando por oraciones.
+    Devuelve (texto dicho, True si no hubo error ni interrupción). Si
+    falla antes de la primera oración se dice el error, como en el modo
+    sin streaming.
+    """
+    sentences = queue.Queue()
+    spoken = []
+    errors = []
+
+    def produce():
+        try:
+            for sentence in split_sentences(send_prompt_to_gemini_stream(FIXED_PROMPT, image)):
+                print(f"[GEMINI] {sentence}")
+                spoken.append(sentence)
+                sentences.put(sentence)
+        except APIError as e:
+            errors.append(f"Error de la API de Gemini: {e}")
+        except Exception as e:
+            errors.append(f"Error desconocido: {e}")
+        finally:
+            if errors:
+                print(f"[GEMINI] {errors[0]}")
+                if not spoken:
+                    sentences.put(errors[0])
+            sentences.put(None)
+
+    gemini.submit(produce)
+    completed = speak_sentences(sentences, notice_after_s=WAIT_NOTICE_S, turn=turn)
+    if errors and not spoken:
+        return errors[0], False
+    return " ".join(spoken), completed and not errors
 
 # =================================================================
 # MODO PRUEBA (para usar este archivo solo)
@@ -225,4 +678,9 @@ def main():
         execute_count += 1
 
 if __name__ == "__main__":
-    main()
+    if "--precalentar-tts" in sys.argv:
+        # Deja listo el audio de las frases fijas (p. ej. al instalar)
+        print(f"[CACHE TTS] {warm_tts_cache()} frases nuevas en {tts_cache.directorio}")
+        print(tts_cache.reporte())
+    else:
+        main()